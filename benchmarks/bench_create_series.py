@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+"""Time create_series() on a synthetic patch queue with 1..N workers.
+
+usage: python3 benchmarks/bench_create_series.py [PATCHES] [MAX_JOBS]
+
+Builds a throw-away repository with PATCHES linear commits (default 300)
+touching a kernel sized set of files, exports the series once per job
+count and checks the output is identical to the single run.
+"""
+
+import filecmp
+import os
+import random
+import sys
+import tempfile
+import time
+
+from stable_rt_tools.srt_create import create_series
+from stable_rt_tools.srt_util import cmd
+
+
+def make_queue(path, patches):
+    rnd = random.Random(1)
+    cmd(['git', 'init', '-q', path])
+    cmd(['git', '-C', path, 'config', 'user.name', 'Mighty Eagle'])
+    cmd(['git', '-C', path, 'config', 'user.email', 'me@incredible.com'])
+    files = [os.path.join(path, 'f{0}.c'.format(i)) for i in range(200)]
+    for fname in files:
+        with open(fname, 'w') as f:
+            f.writelines('line {0} {1}\n'.format(i, rnd.random())
+                         for i in range(3000))
+    cmd(['git', '-C', path, 'add', '.'])
+    cmd(['git', '-C', path, 'commit', '-q', '-m', 'base'])
+    cmd(['git', '-C', path, 'tag', 'base'])
+    for n in range(patches):
+        for fname in rnd.sample(files, 5):
+            with open(fname, 'r') as f:
+                lines = f.readlines()
+            for _ in range(40):
+                lines[rnd.randrange(len(lines))] = \
+                    'change {0} {1}\n'.format(n, rnd.random())
+            with open(fname, 'w') as f:
+                f.writelines(lines)
+        cmd(['git', '-C', path, 'commit', '-q', '-a', '-m',
+             'sched: Change number {0} of the queue'.format(n)])
+    cmd(['git', '-C', path, 'tag', 'top'])
+
+
+def run(jobs, outdir):
+    os.makedirs(outdir)
+    start = time.monotonic()
+    create_series('base', 'top', outdir, jobs)
+    return time.monotonic() - start
+
+
+def main():
+    patches = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    max_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else \
+        (os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as tdir:
+        repo = os.path.join(tdir, 'linux')
+        make_queue(repo, patches)
+        os.chdir(repo)
+        ref = os.path.join(tdir, 'jobs-1')
+        base = run(1, ref)
+        print('jobs  seconds  speedup')
+        print('{0:4}  {1:7.2f}  {2:7.2f}'.format(1, base, 1.0))
+        jobs = 2
+        while jobs <= max_jobs:
+            out = os.path.join(tdir, 'jobs-{0}'.format(jobs))
+            secs = run(jobs, out)
+            files = sorted(os.listdir(ref))
+            _, mismatch, errors = filecmp.cmpfiles(ref, out, files,
+                                                   shallow=False)
+            if mismatch or errors or files != sorted(os.listdir(out)):
+                sys.exit('jobs={0}: output differs'.format(jobs))
+            print('{0:4}  {1:7.2f}  {2:7.2f}'.format(jobs, secs,
+                                                     base / secs))
+            jobs *= 2
+
+
+if __name__ == '__main__':
+    main()
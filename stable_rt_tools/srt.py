@@ -26,9 +26,10 @@ import argparse
 import logging
 import sys
 
-from stable_rt_tools import (srt_announce, srt_commit, srt_create, srt_push,
-                             srt_sign, srt_tag, srt_upload, srt_patches,
-                             srt_prep, about)
+from stable_rt_tools import (srt_announce, srt_check, srt_commit, srt_create,
+                             srt_import, srt_lint, srt_push, srt_sign,
+                             srt_tag, srt_upload, srt_patches, srt_prep,
+                             srt_review, srt_upstreamed, srt_verify, about)
 
 sub_cmd = {
     'prep': srt_prep,
@@ -40,6 +41,12 @@ sub_cmd = {
     'push': srt_push,
     'announce': srt_announce,
     'patches': srt_patches,
+    'verify-upstream': srt_verify,
+    'review-status': srt_review,
+    'check-series': srt_check,
+    'import-patches': srt_import,
+    'lint-series': srt_lint,
+    'upstreamed': srt_upstreamed,
 }
 
 
@@ -23,57 +23,304 @@
 # SOFTWARE
 
 
+import codecs
+import hashlib
+import lzma
 import os
+import sys
+import tempfile
+import zlib
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from datetime import date, timedelta
-from email.utils import make_msgid
-from time import gmtime, strftime
+from email.utils import make_msgid, parseaddr
+from functools import lru_cache
+from logging import debug
+from subprocess import DEVNULL, PIPE, CalledProcessError, Popen, run
+from time import gmtime, sleep, strftime
 
 try:
     import importlib.resources as pkg_resources
 except ImportError:
     import importlib_resources as pkg_resources
 
-from stable_rt_tools.srt_util import (check_context, cmd, confirm, get_config,
-                                      get_gpg_fingerprint,
-                                      get_local_branch_name,
-                                      get_remote_branch_name)
+from stable_rt_tools.srt_git_filter import review_message
+from stable_rt_tools.srt_util import (Speculation, check_context, cmd,
+                                      confirm, get_config, get_config_size,
+                                      get_gnupghome, get_gpg_fingerprint,
+                                      get_remote_branch_name,
+                                      get_remote_repo_name, is_ancestor,
+                                      print_table, read_config)
 from stable_rt_tools.srt_util_context import SrtContext
+from stable_rt_tools.srt_util_mail import (Journal, get_smtp_config,
+                                           prepare_series, read_series,
+                                           send_series, smtp_connect)
+from stable_rt_tools.srt_util_tag import Tag
 
 
-def find_starting_ref(ctx):
+@lru_cache(maxsize=None)
+def resolve_starting_ref(head, old_tag):
     # find starting point. first check for stable update only
-    ref = cmd(['git', 'log', '--pretty=format:%H', '--merges', '-n', '1'])
+    ref = cmd(['git', 'log', '--pretty=format:%H', '--merges', '-n', '1',
+               head])
 
-    # if patches have been added, we find the old tag and should start there
-    # and not the last merge
-    commits = cmd(['git', 'log', '--simplify-by-decoration',
-                   '--oneline', str(ref) + '..'])
-    if ' '.join(commits.split('\n')).find(str(ctx.old_short_tag)) != -1:
-        ref = str(ctx.old_tag)
+    # if patches have been added on top of the old tag, we should start
+    # there and not at the last merge
+    if is_ancestor(old_tag, head) and \
+            not (ref and is_ancestor(old_tag, ref)):
+        return old_tag
 
     return ref
 
 
-def create_rc_patches(config, ctx):
-    branch_name = get_local_branch_name()
-    cmd(['git', 'checkout', '-b', 'next-tmp'])
+def find_starting_ref(ctx, head='HEAD'):
+    """Return the commit the release's changes start from.
+
+    The result is memoized per (HEAD, old tag) pair.
+    """
+    head = cmd(['git', 'rev-parse', head])
+    ref = resolve_starting_ref(head, str(ctx.old_tag))
+    debug('starting ref for {0}: {1}'.format(ctx.old_tag, ref))
+    return ref
+
+
+def read_commits(revs):
+    """Return {sha: raw commit object} for revs read in one batch."""
+    p = run(['git', 'cat-file', '--batch'], input='\n'.join(revs).encode(),
+            stdout=PIPE, check=True)
+    out = p.stdout
+    commits = {}
+    pos = 0
+    for sha in revs:
+        nl = out.index(b'\n', pos)
+        _, _, size = out[pos:nl].split()
+        pos = nl + 1
+        commits[sha] = out[pos:pos + int(size)]
+        pos += int(size) + 1
+    return commits
+
+
+def get_object_format():
+    """Return the hash algorithm of the repository, sha1 or sha256."""
+    try:
+        return cmd(['git', 'rev-parse', '--show-object-format']) or 'sha1'
+    except CalledProcessError:
+        return 'sha1'
+
+
+def write_object(objdir, objtype, data, algo='sha1'):
+    """Write a loose object to objdir and return its id.
+
+    algo is the repository's object format, see get_object_format().
+    """
+    obj = '{0} {1}\0'.format(objtype, len(data)).encode() + data
+    sha = hashlib.new(algo, obj).hexdigest()
+    path = os.path.join(objdir, sha[:2], sha[2:])
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(zlib.compress(obj))
+    return sha
+
+
+def rewrite_commit(raw, parents, review_tag):
+    """Recreate the commit the former filter-branch run produced."""
+    header, _, message = raw.partition(b'\n\n')
+    lines = []
+    for line in header.split(b'\n'):
+        key = line.split(b' ', 1)[0]
+        if key == b'parent':
+            sha = line[7:].decode()
+            lines.append(b'parent ' + parents.get(sha, sha).encode())
+        elif key in (b'tree', b'author', b'committer'):
+            lines.append(line)
+    message = review_message(message.decode('utf-8', 'surrogateescape'),
+                             review_tag)
+    return b'\n'.join(lines) + b'\n\n' + \
+        message.encode('utf-8', 'surrogateescape')
 
-    srt_env = os.environ.copy()
-    srt_env['SRT_REVIEW_TAG'] = str(ctx.new_tag)
-    srt_env['FILTER_BRANCH_SQUELCH_WARNING'] = str(1)
-    srt_path = os.path.dirname(os.path.realpath(__file__))
 
+def create_rc_patches(config, ctx):
+    """Write the RC series with the review preamble to ctx.new_dir_mails.
+
+    The rewritten commits are only written to a temporary object
+    directory, which format-patch sees together with the repository's
+    objects. No ref, object or file of the repository is touched.
+    """
     ref = find_starting_ref(ctx)
-    cmd(['git', 'filter-branch', '-f', '--msg-filter',
-         srt_path + '/srt_git_filter.py', str(ref) + '..'],
-        env=srt_env)
+    revs = cmd(['git', 'rev-list', '--reverse', '--topo-order',
+                str(ref) + '..HEAD']).split()
+    commits = read_commits(revs)
+    objects = os.path.abspath(cmd(['git', 'rev-parse', '--git-path',
+                                   'objects']))
+
+    algo = get_object_format()
+
+    with tempfile.TemporaryDirectory() as objdir:
+        parents = {}
+        for sha in revs:
+            raw = rewrite_commit(commits[sha], parents, str(ctx.new_tag))
+            parents[sha] = write_object(objdir, 'commit', raw, algo)
+
+        env = os.environ.copy()
+        env['GIT_OBJECT_DIRECTORY'] = objdir
+        env['GIT_ALTERNATE_OBJECT_DIRECTORIES'] = objects
+        head = parents[revs[-1]] if revs else 'HEAD'
+        cmd(['git', 'format-patch', '{0}..{1}'.format(ref, head),
+             '-o', ctx.new_dir_mails, '--subject-prefix', 'PATCH RT',
+             '--cover-letter'], env=env)
+
+
+def start_queries(cmds):
+    """Start cmds concurrently, each writing to its own spool file."""
+    queries = []
+    for c in cmds:
+        debug('run: ' + ' '.join(c))
+        f = tempfile.TemporaryFile()
+        queries.append((Popen(c, stdin=DEVNULL, stdout=f, stderr=DEVNULL),
+                        f, c))
+    return queries
+
+
+def stop_queries(queries):
+    """Kill the queries still running and release their spool files."""
+    for proc, f, _ in queries:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        f.close()
+
+
+def stream_query(proc, f, args):
+    """Yield the output of a query started by start_queries.
+
+    The output is yielded while the command is still running.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pos = 0
+    with f:
+        while True:
+            done = proc.poll() is not None
+            f.seek(pos)
+            data = f.read(1024 * 1024)
+            pos += len(data)
+            if data:
+                yield decoder.decode(data)
+            elif done:
+                break
+            else:
+                sleep(0.01)
+    yield decoder.decode(b'', final=True)
+    if proc.returncode:
+        raise CalledProcessError(proc.returncode, args)
+
+
+def print_stripped(chunks):
+    """Same as print(''.join(chunks).strip()) without joining."""
+    pending = ''
+    started = False
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip()
+            started = chunk != ''
+        text = pending + chunk
+        body = text.rstrip()
+        pending = text[len(body):]
+        sys.stdout.write(body)
+    sys.stdout.write('\n')
+
+
+def spool_diff(chunks, limit, fname):
+    """Return the chunks of the diff if it is at most limit bytes.
+
+    Otherwise the complete diff is written xz compressed to fname
+    while streaming and None is returned. With fname None nothing is
+    written.
+    """
+    buf = []
+    size = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        size += len(chunk.encode('utf-8'))
+        if size > limit:
+            break
+    else:
+        return buf
+
+    if not fname:
+        return None
+    with lzma.open(fname + '.tmp', 'wt', encoding='utf-8', preset=9) as f:
+        f.writelines(buf)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(fname + '.tmp', fname)
+    return None
+
+
+def write_incr_diff(config, ctx, head='HEAD'):
+    """Write the diff of the release to ctx.new_fln_incr if it exceeds
+    ANNOUNCE_DIFF_LIMIT and remove a stale one otherwise.
+
+    Called by 'srt create', so the file is signed and uploaded along
+    with the release. Returns True if the file was written.
+    """
+    limit = get_config_size(config, 'ANNOUNCE_DIFF_LIMIT')
+    if limit:
+        rng = '{0}..{1}'.format(find_starting_ref(ctx, head), ctx.new_tag)
+        queries = start_queries([['git', '--no-pager', 'diff', rng]])
+        try:
+            if spool_diff(stream_query(*queries[0]), limit,
+                          ctx.new_fln_incr) is None:
+                return True
+        finally:
+            stop_queries(queries)
+    if os.path.isfile(ctx.new_fln_incr):
+        os.unlink(ctx.new_fln_incr)
+    return False
+
+
+def print_diff(config, ctx, chunks):
+    limit = get_config_size(config, 'ANNOUNCE_DIFF_LIMIT')
+    # normally written by 'srt create'
+    created = os.path.isfile(ctx.new_fln_incr)
+    if limit:
+        chunks = spool_diff(chunks, limit,
+                            None if created else ctx.new_fln_incr)
+    if chunks is not None:
+        # don't let 'srt sign' and 'srt upload' pick up a stale file
+        if created:
+            os.unlink(ctx.new_fln_incr)
+        print_stripped(chunks)
+        return
+
+    print('The diff exceeds {0} bytes and is available at:\n'.format(limit))
+    print('  {0}{1}/older/{2}'.format(
+        config.get('PRJ_URL', 'https://www.kernel.org'), config['PRJ_DIR'],
+        os.path.basename(ctx.new_fln_incr)))
+    if not created:
+        print('Wrote {0} after srt create, sign and upload it as well'.format(
+            ctx.new_fln_incr), file=sys.stderr)
+
+
+# Shared between the branches of 'srt announce --all'
+fingerprints = {}
+templates = {}
+
 
-    cmd(['git', 'format-patch', str(ref) + '..',
-         '-o', ctx.new_dir_mails, '--subject-prefix', 'PATCH RT',
-         '--cover-letter'])
+def gpg_fingerprint(config):
+    """get_gpg_fingerprint() memoized per GPG home and key."""
+    key = (get_gnupghome(config), config['GPG_KEY_ID'])
+    if key not in fingerprints:
+        fingerprints[key] = get_gpg_fingerprint(config)
+    return fingerprints[key]
 
-    cmd(['git', 'checkout', branch_name])
-    cmd(['git', 'branch', '-D', 'next-tmp'])
+
+def read_template(path):
+    if path not in templates:
+        with open(path, 'r') as f:
+            templates[path] = f.read()
+    return templates[path]
 
 
 def cover_letter_replacements(config, ctx):
@@ -89,7 +336,7 @@ def cover_letter_replacements(config, ctx):
         "sender": config['SENDER'],
         "name": config['NAME'],
         "new_tag_rt": ctx.new_tag.rt,
-        "gpg_key_fingerprint": get_gpg_fingerprint(config),
+        "gpg_key_fingerprint": gpg_fingerprint(config),
     }
     if ctx.is_rc:
         r["new_tag_rc"] = ctx.new_tag.rc
@@ -122,7 +369,32 @@ def write_rc_cover_letter(config, ctx):
         f.write(coverletter)
 
 
+def send_rc_patches_smtp(config, ctx, args):
+    journal = Journal(ctx.new_dir_mails)
+    series = prepare_series(config, read_series(ctx.new_dir_mails),
+                            journal, args.suppress_cc)
+    smtp = get_smtp_config(config)
+
+    print('Dry run')
+    print('Server: {0}:{1}'.format(smtp['SMTP_SERVER'], smtp['SMTP_PORT']))
+    for m, rcpts, _ in series:
+        state = 'sent' if journal.is_sent(m) else 'send'
+        print('{0}: {1}'.format(state, m.subject))
+        print('    to: {0}'.format(', '.join(rcpts)))
+    # connect and authenticate while the operator reads
+    speculation = Speculation(smtp_connect, smtp,
+                              discard=lambda conn: conn.quit())
+    if confirm('OK to send patches?', speculation):
+        sender = parseaddr(config['SENDER'])[1]
+        conn = speculation.value if speculation.result() else None
+        send_series(smtp, sender, series, journal, conn)
+
+
 def send_rc_patches(config, ctx, args):
+    if getattr(args, 'smtp', False):
+        send_rc_patches_smtp(config, ctx, args)
+        return
+
     gmd = ['git', 'send-email', '--confirm=never']
     if args.suppress_cc:
         gmd += ['--suppress-cc=all']
@@ -162,7 +434,12 @@ def get_rc_templ_path(config):
     )
 
 
-def announce(config, ctx, args):
+def announce(config, ctx, args, branch=None):
+    """Print the announcement of ctx.new_tag.
+
+    branch is the (name, head) of the release branch. It defaults to
+    the upstream branch of the checkout and HEAD.
+    """
     from stable_rt_tools.srt_util import is_quilt_workflow
     if ctx.is_rc:
         announce_rc(config, ctx, args)
@@ -197,31 +474,137 @@ def announce(config, ctx, args):
     # 3.3. Date and Time Specification
     timestamp = strftime('%a, %d %b %Y %H:%M:%S -0000', gmtime())
 
-    stable_rt_text = ''
-    with open(get_announce_tmpl_path(config), 'r') as f:
-        stable_rt_text = f.read()
-
-    r = cover_letter_replacements(config, ctx)
-
-    r["date"] = timestamp
-    r["branch_name"] = get_remote_branch_name()
-    r["branch_head"] = cmd(['git', 'rev-parse', 'HEAD'])
-
-    print(stable_rt_text.format(**r))
-
-    ref = find_starting_ref(ctx)
-    print(cmd(['git', '--no-pager', 'shortlog', '{0}..{1}'.
-               format(ref, ctx.new_tag)]))
-
-    print('---')
-
-    print(cmd(['git', '--no-pager', 'diff', '--stat', '{0}..{1}'.
-               format(ref, ctx.new_tag)]))
+    stable_rt_text = read_template(get_announce_tmpl_path(config))
+    branch_name, head = branch or (get_remote_branch_name(), 'HEAD')
+
+    # The queries are independent of each other, start them before
+    # rendering the template.
+    ref = find_starting_ref(ctx, head)
+    rng = '{0}..{1}'.format(ref, ctx.new_tag)
+    queries = start_queries([['git', '--no-pager', 'shortlog', rng],
+                             ['git', '--no-pager', 'diff', '--stat', rng],
+                             ['git', '--no-pager', 'diff', rng]])
+    try:
+        r = cover_letter_replacements(config, ctx)
+
+        r["date"] = timestamp
+        r["branch_name"] = branch_name
+        r["branch_head"] = cmd(['git', 'rev-parse', head])
+
+        print(stable_rt_text.format(**r))
+
+        # shortlog and diffstat are always inline
+        for q in queries[:2]:
+            print_stripped(stream_query(*q))
+            print('---')
+        print_diff(config, ctx, stream_query(*queries[2]))
+    finally:
+        stop_queries(queries)
+
+
+def get_release_branches(config):
+    """Return [(section, branch name, head)] for the srt.conf sections
+    of this repository.
+
+    The local branch is used if it exists, the remote tracking branch
+    otherwise.
+    """
+    repo = get_remote_repo_name()
+    branches = []
+    for section in config.sections():
+        if not section.startswith(repo + '/'):
+            continue
+        remote_branch = section[len(repo) + 1:]
+        name = remote_branch.split('/', 1)[-1]
+        for head in ['refs/heads/' + name, 'refs/remotes/' + remote_branch]:
+            if ref_exists(head):
+                branches.append((section, name, head))
+                break
+        else:
+            debug('no branch for section {0}'.format(section))
+    return branches
+
+
+def ref_exists(ref):
+    try:
+        cmd(['git', 'rev-parse', '--verify', '--quiet', ref])
+    except CalledProcessError:
+        return False
+    return True
+
+
+def get_release_tags(head):
+    """Return (old tag, new tag) of the last release on head.
+
+    Only -rt tags are considered, the stable tag merged last is often
+    closer to the release than the previous -rt tag.
+    """
+    describe = ['git', 'describe', '--abbrev=0', '--tags',
+                '--match', 'v*-rt*', '--exclude', '*-patches']
+    new = cmd(describe + [head])
+    old = cmd(describe + ['--exclude', '*-rc*', new + '^'])
+    return old, new
+
+
+def init_worker(fps, tmpls):
+    fingerprints.update(fps)
+    templates.update(tmpls)
+
+
+def announce_branch(config, branch, head, old, new, fname):
+    args = Namespace(OLD_TAG=old, NEW_TAG=new, suppress_cc=False,
+                     smtp=False)
+    ctx = SrtContext(args)
+    with open(fname, 'w') as f, redirect_stdout(f):
+        announce(config, ctx, args, (branch, head))
 
-    print('---')
 
-    print(cmd(['git', '--no-pager', 'diff', '{0}..{1}'.
-               format(ref, ctx.new_tag)]))
+def prepare_jobs(config, outdir):
+    """Return the announce jobs and the summary rows of the skipped
+    branches. Fingerprints and templates are loaded once here."""
+    from stable_rt_tools.srt_util import is_quilt_workflow
+    jobs, skipped = [], []
+    for section, branch, head in get_release_branches(config):
+        cfg = config[section]
+        try:
+            old, new = get_release_tags(head)
+        except CalledProcessError:
+            skipped.append((branch, '-', '-', 'skipped, no release tag'))
+            continue
+        if Tag(new).is_rc:
+            skipped.append((branch, old, new, 'skipped, release candidate'))
+            continue
+        if not is_quilt_workflow(cfg):
+            gpg_fingerprint(cfg)
+            read_template(get_announce_tmpl_path(cfg))
+        fname = os.path.join(outdir, 'announce-{0}.txt'.format(new[1:]))
+        jobs.append((cfg, branch, head, old, new, fname))
+    return jobs, skipped
+
+
+def announce_all(config, outdir):
+    """Write the announcements of all branches configured in srt.conf
+    to outdir. The branches are processed in parallel."""
+    os.makedirs(outdir, exist_ok=True)
+    jobs, rows = prepare_jobs(config, outdir)
+
+    with ProcessPoolExecutor(initializer=init_worker,
+                             initargs=(fingerprints, templates)) as pool:
+        futures = [pool.submit(announce_branch, *job) for job in jobs]
+        for job, future in zip(jobs, futures):
+            try:
+                future.result()
+                result = job[5]
+            except (CalledProcessError, OSError, KeyError) as e:
+                result = 'failed: {0}'.format(e)
+            rows.append((job[1], job[3], job[4], result))
+
+    table = [('branch', 'old', 'new', 'announcement')] + rows
+    with open(os.path.join(outdir, 'summary.txt'), 'w') as f, \
+            redirect_stdout(f):
+        print_table(table)
+    print_table(table)
+    return rows
 
 
 def add_argparser(parser):
@@ -230,11 +613,28 @@ def add_argparser(parser):
     prs.add_argument('NEW_TAG', nargs='?')
     prs.add_argument('--suppress-cc', '-s', action="store_true", default=False,
                      help='Don''t auto-cc anyone (for testing)')
+    prs.add_argument('--output', '-o', default=None, metavar='FILE',
+                     help='Write the announcement to FILE, with --all '
+                          'the directory for all announcements')
+    prs.add_argument('--all', '-a', action="store_true", default=False,
+                     help='Announce the last release of all branches '
+                          'configured in srt.conf')
+    prs.add_argument('--smtp', action="store_true", default=False,
+                     help='Send RC mails directly over SMTP instead of '
+                          'git send-email')
     return prs
 
 
 def execute(args):
+    if args.all:
+        announce_all(read_config(), args.output or 'announce')
+        return
+
     ctx = SrtContext(args)
     check_context(ctx)
 
-    announce(get_config(), ctx, args)
+    if args.output:
+        with open(args.output, 'w') as f, redirect_stdout(f):
+            announce(get_config(), ctx, args)
+    else:
+        announce(get_config(), ctx, args)
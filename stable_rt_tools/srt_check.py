@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import os
+import sys
+import tempfile
+from subprocess import PIPE, run
+
+from stable_rt_tools.srt_util import cmd
+from stable_rt_tools.srt_util_tag import Tag
+
+# quilt applies patches with up to two lines of fuzz by default
+MAX_FUZZ = 2
+
+
+def read_series(patches_dir):
+    """Return [(patch, strip level)] from the quilt series file."""
+    series = []
+    with open(os.path.join(patches_dir, 'series'), 'r') as f:
+        for line in f:
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            strip = 1
+            for opt in fields[1:]:
+                if opt.startswith('-p'):
+                    strip = int(opt[2:])
+            series.append((fields[0], strip))
+    return series
+
+
+def apply_patch(env, path, strip):
+    """Apply path to the index in env.
+
+    Returns (fuzz, output), fuzz is None if the patch does not apply.
+    """
+    args = ['git', 'apply', '--cached', '--verbose', '--whitespace=nowarn',
+            '-p{0}'.format(strip)]
+    failure = None
+    for fuzz in range(MAX_FUZZ + 1):
+        context = ['-C{0}'.format(3 - fuzz)] if fuzz else []
+        p = run(args + context + [path], env=env, stdout=PIPE, stderr=PIPE)
+        output = (p.stdout + p.stderr).decode('utf-8', 'replace')
+        if p.returncode == 0:
+            return fuzz, output
+        failure = failure or output
+    return None, failure
+
+
+def report(name, fuzz, output):
+    notes = [line.strip() for line in output.splitlines()
+             if line.startswith(('Hunk #', 'error:'))]
+    if fuzz is None:
+        print('{0} does not apply:'.format(name))
+    elif fuzz:
+        print('{0} applies with fuzz {1}:'.format(name, fuzz))
+    elif notes:
+        print('{0} applies with offset:'.format(name))
+    for line in notes:
+        print('    ' + line)
+
+
+def check_series(patches_dir, tag):
+    """Apply the quilt series in patches_dir to tag in a temporary index.
+
+    The rewritten blobs go to a temporary object directory, neither the
+    worktree, the index nor the object store of the repository are
+    touched. Stops at the first patch which does not apply. Returns the
+    number of applied patches or None.
+    """
+    series = read_series(patches_dir)
+    objects = os.path.abspath(cmd(['git', 'rev-parse', '--git-path',
+                                   'objects']))
+    with tempfile.TemporaryDirectory() as tmp:
+        env = os.environ.copy()
+        env['GIT_INDEX_FILE'] = os.path.join(tmp, 'index')
+        env['GIT_OBJECT_DIRECTORY'] = os.path.join(tmp, 'objects')
+        env['GIT_ALTERNATE_OBJECT_DIRECTORIES'] = objects
+        os.mkdir(env['GIT_OBJECT_DIRECTORY'])
+        cmd(['git', 'read-tree', tag], env=env)
+
+        for n, (name, strip) in enumerate(series):
+            fuzz, output = apply_patch(env, os.path.join(patches_dir, name),
+                                       strip)
+            report(name, fuzz, output)
+            if fuzz is None:
+                print('{0} of {1} patches applied to {2}'.format(
+                    n, len(series), tag))
+                return None
+    print('All {0} patches apply to {1}'.format(len(series), tag))
+    return len(series)
+
+
+def get_patches_dir():
+    if 'QUILT_PATCHES' in os.environ:
+        return os.environ['QUILT_PATCHES']
+    current_dir = os.path.basename(os.getcwd())
+    return os.path.abspath(os.path.join('..', current_dir + '-patches',
+                                        'patches'))
+
+
+def add_argparser(parser):
+    prs = parser.add_parser('check-series')
+    prs.add_argument('TAG', nargs='?',
+                     help='Stable tag to apply to (default: base of '
+                          'NEW_TAG)')
+    prs.add_argument('--patches', '-p', default=None, metavar='DIR',
+                     help='quilt patches directory (default: '
+                          'QUILT_PATCHES)')
+    return prs
+
+
+def execute(args):
+    tag = args.TAG
+    if not tag:
+        if 'NEW_TAG' not in os.environ:
+            print('No TAG given and NEW_TAG is not set', file=sys.stderr)
+            sys.exit(1)
+        tag = str(Tag(os.environ['NEW_TAG']).base)
+    if check_series(args.patches or get_patches_dir(), tag) is None:
+        sys.exit(1)
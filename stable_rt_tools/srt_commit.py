@@ -23,14 +23,14 @@
 # SOFTWARE
 
 
+import os
 import re
-import shutil
 import sys
-import tempfile
 
 from stable_rt_tools.srt_util import (cmd, confirm, get_config, get_gnupghome,
                                       get_last_rt_tag, get_remote_branch_name,
                                       is_dirty)
+from stable_rt_tools.srt_util_kernel import get_kernel_version
 
 
 def localversion_set(filename, version):
@@ -39,6 +39,22 @@ def localversion_set(filename, version):
         f.write('\n')
 
 
+def localversion_get(filename):
+    try:
+        with open(filename, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def localversion_restore(filename, content):
+    if content is None:
+        os.remove(filename)
+        return
+    with open(filename, 'w') as f:
+        f.write(content)
+
+
 def localversion_inc(filename):
     with open(filename, 'r+') as f:
         line = f.readline()
@@ -48,14 +64,6 @@ def localversion_inc(filename):
         f.truncate()
 
 
-def get_kernel_version():
-    tmp = tempfile.mkdtemp()
-    cmd(['make', 'O=%s' % tmp, 'defconfig'])
-    line = cmd(['make', '-s', 'O=%s' % tmp, 'kernelrelease'])
-    shutil.rmtree(tmp)
-    return line.strip()[:-1]
-
-
 def last_commit_was_release_commit():
     p = re.compile(r'^.*Linux ([0-9\.]+[-a-z0-9]+)( REBASE)*')
     lines = cmd(['git', 'log', '-1', '--pretty=%B'])
@@ -76,12 +84,14 @@ def commit(config, rc):
     post_fix = branch_name.split('-')[-1]
     branch_rebase = True if post_fix == 'rebase' else False
 
-    old_head = cmd(['git', 'rev-parse', 'HEAD'])
+    # Only the localversion file is touched until the commit is
+    # confirmed, HEAD and the index are left alone.
+    old_localversion = localversion_get(config['LOCALVERSION'])
+    drop_release_commit = False
 
     if branch_rebase:
         rt = get_last_rt_tag(branch_name, '-rebase')
-        if last_commit_was_release_commit():
-            cmd(['git', 'reset', 'HEAD~'])
+        drop_release_commit = last_commit_was_release_commit()
         localversion_set(config['LOCALVERSION'], rt)
     elif rc:
         rt = get_last_rt_tag(branch_name, '-next')
@@ -98,11 +108,13 @@ def commit(config, rc):
 
     print('git commit -m {0}'.format(msg))
     if confirm('OK to commit?'):
+        if drop_release_commit:
+            cmd(['git', 'reset', 'HEAD~'])
         cmd(['git', 'add', config['LOCALVERSION']])
         cmd(['git', 'commit', '-s', '-m', msg],
             env={'GNUPGHOME': get_gnupghome(config)})
     else:
-        cmd(['git', 'reset', '--hard', old_head])
+        localversion_restore(config['LOCALVERSION'], old_localversion)
 
 
 def add_argparser(parser):
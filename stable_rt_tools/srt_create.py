@@ -24,10 +24,16 @@
 
 
 import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from logging import debug
-from subprocess import PIPE, Popen
+from subprocess import PIPE, CalledProcessError, Popen, run
 
-from stable_rt_tools.srt_util import check_context, cmd, get_config
+from stable_rt_tools.srt_announce import write_incr_diff
+from stable_rt_tools.srt_lint import lint_series
+from stable_rt_tools.srt_util import (check_context, cmd, get_config,
+                                      get_config_bool, tag_exists)
 from stable_rt_tools.srt_util_context import SrtContext
 
 
@@ -44,22 +50,132 @@ def create_patch_file(old_tag, new_tag, filename):
         p2.wait()
 
 
-def create_series(old_tag, new_tag, dirname):
-    cmd(['git', 'format-patch', '-q', '-o', dirname,
-         '{0}..{1}'.format(old_tag, new_tag)])
+chunk_subject_re = re.compile(rb'^Subject: \[PATCH#* [0-9]+/[0-9]+\]',
+                              re.MULTILINE)
+
+
+def get_linear_commits(old_tag, new_tag):
+    """Return the commits of old_tag..new_tag oldest first.
+
+    Returns None if the range is not a linear history.
+    """
+    commits = []
+    for line in cmd(['git', 'rev-list', '--reverse', '--parents',
+                     '{0}..{1}'.format(old_tag, new_tag)]).splitlines():
+        commit, *parents = line.split()
+        if len(parents) != 1 or (commits and parents[0] != commits[-1]):
+            return None
+        commits.append(commit)
+    return commits
+
+
+def has_series_config():
+    """Return True if format.* settings make a patch depend on the series.
+
+    Threading, cover letters, auto base and custom numbering can't be
+    reproduced one patch at a time.
+    """
+    p = run(['git', 'config', '--get-regexp',
+             r'^format\.(numbered|thread|coverletter|subjectprefix|'
+             r'useautobase)$'], stdout=PIPE)
+    return p.returncode == 0
+
+
+def format_patches(base, commits, start, total, dirname):
+    """Export the linear commits base..commits[-1] numbered from start as
+    part of a series of total patches.
+
+    format-patch numbers the chunk up to its own last patch. The subject
+    prefix is padded to the length of the final prefix, so the subjects
+    are folded the same way, and the numbers are fixed up afterwards.
+    The files are the same as from a single run over the whole series.
+    """
+    width = len(str(total))
+    pad = 2 * (width - len(str(start + len(commits) - 1)))
+    files = cmd(['git', 'format-patch', '-n', '-o', dirname,
+                 '--subject-prefix', 'PATCH' + '#' * pad,
+                 '--start-number', str(start),
+                 '{0}..{1}'.format(base, commits[-1])]).splitlines()
+    for nr, fname in enumerate(files, start):
+        with open(fname, 'rb') as f:
+            data = f.read()
+        subject = b'Subject: [PATCH %0*d/%d]' % (width, nr, total)
+        data = chunk_subject_re.sub(subject, data, count=1)
+        with open(fname, 'wb') as f:
+            f.write(data)
+
+
+def format_patches_parallel(old_tag, commits, dirname, jobs):
+    size = -(-len(commits) // jobs)
+    chunks = [(commits[i - 1] if i else old_tag, commits[i:i + size], i + 1)
+              for i in range(0, len(commits), size)]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        futures = [executor.submit(format_patches, base, chunk, start,
+                                   len(commits), dirname)
+                   for base, chunk, start in chunks]
+        for f in futures:
+            f.result()
+
+
+def create_series(old_tag, new_tag, dirname, jobs=None):
+    jobs = jobs or os.cpu_count() or 1
+    commits = None
+    if jobs > 1 and not has_series_config():
+        commits = get_linear_commits(old_tag, new_tag)
+    if commits and len(commits) > 1:
+        format_patches_parallel(old_tag, commits, dirname, jobs)
+    else:
+        cmd(['git', 'format-patch', '-q', '-o', dirname,
+             '{0}..{1}'.format(old_tag, new_tag)])
 
     patches = [f for f in sorted(os.listdir(dirname))
-               if os.path.isfile(os.path.join(dirname, f))]
+               if os.path.isfile(os.path.join(dirname, f)) and f != 'series']
     with open(dirname + '/series', 'w') as file:
         for p in patches:
             file.write('{0}\n'.format(p))
 
 
+def create_bundle_file(refs, prerequisites, filename):
+    with open(filename, 'w') as file:
+        c1 = ['git', 'bundle', 'create', '-'] + refs + \
+            ['^' + p for p in prerequisites]
+        c2 = ['xz', '-9']
+
+        debug('run: ' + ' '.join(c1) + ' | ' + ' '.join(c2))
+
+        p1 = Popen(c1, stdout=PIPE)
+        p2 = Popen(c2, stdin=p1.stdout, stdout=file)
+        p1.stdout.close()
+        p2.wait()
+        if p1.wait():
+            raise CalledProcessError(p1.returncode, c1)
+
+
+def bundle_refs(ctx, tag):
+    """Return the release, rebase and patches tags of tag which exist."""
+    refs = [str(tag)]
+    if not tag.is_rc:
+        refs.append(tag.rebase)
+    refs.append(str(tag) + '-patches')
+    return [r for r in refs if tag_exists(r)]
+
+
+def create_bundle(ctx):
+    """Create an incremental bundle from the previous release.
+
+    The bundle contains the new release tags and expects the old
+    release tags to be present on the receiving side.
+    """
+    create_bundle_file(bundle_refs(ctx, ctx.new_tag),
+                       bundle_refs(ctx, ctx.old_tag),
+                       ctx.new_fln_bundle)
+
+
 def create_tar_file(dirname, filename):
     cmd(['tar', '-C', dirname, '-cJf', filename, 'patches/'])
 
 
-def create(config, ctx):
+def create(config, ctx, bundle=False, jobs=None, lint=False):
     for d in [ctx.new_dir_patches, ctx.new_dir_series]:
         if not os.path.exists(d):
             os.makedirs(d)
@@ -67,14 +183,27 @@ def create(config, ctx):
     if ctx.new_tag.is_rc:
         create_patch_file(ctx.old_tag.base, str(
             ctx.new_tag), ctx.new_fln_patch)
-        create_series(ctx.old_tag, ctx.new_tag, ctx.new_dir_series)
+        create_series(ctx.old_tag, ctx.new_tag, ctx.new_dir_series, jobs)
     else:
         create_patch_file(ctx.new_tag.base, str(
             ctx.new_tag), ctx.new_fln_patch)
-        create_series(ctx.new_tag.base, ctx.new_tag.rebase, ctx.new_dir_series)
+        create_series(ctx.new_tag.base, ctx.new_tag.rebase,
+                      ctx.new_dir_series, jobs)
+
+    if lint or get_config_bool(config, 'CREATE_LINT'):
+        if lint_series(config, ctx.new_dir_series, jobs):
+            print('Lint failed, fix the patches in {0} and rerun'.format(
+                ctx.new_dir_series), file=sys.stderr)
+            sys.exit(1)
 
     create_tar_file(ctx.new_dir_patches, ctx.new_fln_tar)
 
+    if bundle:
+        create_bundle(ctx)
+
+    if not ctx.new_tag.is_rc:
+        write_incr_diff(config, ctx, str(ctx.new_tag))
+
     print('Created the following files in {0}'.format(ctx.new_dir_patches))
     for f in ctx.get_files():
         print('\t{0}'.format(f))
@@ -85,6 +214,13 @@ def add_argparser(parser):
     prs = parser.add_parser('create')
     prs.add_argument('OLD_TAG', nargs='?')
     prs.add_argument('NEW_TAG', nargs='?')
+    prs.add_argument('--bundle', '-b', action='store_true', default=False,
+                     help='Create an incremental git bundle as well')
+    prs.add_argument('--jobs', '-j', type=int, default=None,
+                     help='Number of parallel format-patch workers '
+                          '(default: number of CPUs)')
+    prs.add_argument('--lint', '-l', action='store_true', default=False,
+                     help='Lint the series and stop if a check fails')
     return prs
 
 
@@ -92,4 +228,4 @@ def execute(args):
     ctx = SrtContext(args)
     check_context(ctx)
 
-    create(get_config(), ctx)
+    create(get_config(), ctx, args.bundle, args.jobs, args.lint)
@@ -23,19 +23,30 @@
 # SOFTWARE
 
 
+import io
 import os
 import sys
 
-review_tag = os.environ['SRT_REVIEW_TAG']
-message = sys.stdin.readlines()
-
-msg = """\
+preamble = """\
 {} stable review patch.
 If anyone has any objections, please let me know.
 
 -----------
-""".format(review_tag)
+"""
+
+
+def review_message(message, review_tag):
+    """Return message with the stable review preamble after the subject.
+
+    The result is byte for byte what the former 'git filter-branch
+    --msg-filter' script produced.
+    """
+    lines = io.StringIO(message, newline=None).readlines()
+    return '{0}\n{1}\n{2}\n'.format(
+        lines[0] if lines else '', preamble.format(review_tag),
+        ''.join(lines[1:]))
+
 
-print(message[0])
-print(msg)
-print(''.join(message[1:]))
+if __name__ == '__main__':
+    sys.stdout.write(review_message(sys.stdin.read(),
+                                    os.environ['SRT_REVIEW_TAG']))
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import hashlib
+import os
+from subprocess import PIPE, run
+
+from stable_rt_tools.srt_check import get_patches_dir
+from stable_rt_tools.srt_util import cmd, get_remote_branch_name
+
+
+def blob_hasher():
+    """Return a function computing the git blob id of some data."""
+    fmt = cmd(['git', 'rev-parse', '--show-object-format'])
+
+    def hash_blob(data):
+        h = hashlib.new(fmt)
+        h.update(b'blob %d\0' % len(data))
+        h.update(data)
+        return h.hexdigest()
+    return hash_blob
+
+
+def read_dir(path):
+    """Return {relative path: (mode, data)} of the files below path."""
+    files = {}
+    for root, dirs, names in os.walk(path):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in names:
+            fname = os.path.join(root, name)
+            if name.startswith('.') or not os.path.isfile(fname):
+                continue
+            mode = '100755' if os.access(fname, os.X_OK) else '100644'
+            with open(fname, 'rb') as f:
+                files[os.path.relpath(fname, path)] = (mode, f.read())
+    return files
+
+
+def read_tree(ref, prefix):
+    """Return {relative path: (mode, blob id)} of prefix in ref."""
+    entries = {}
+    out = cmd(['git', 'ls-tree', '-r', '-z', '--full-tree', ref, '--',
+               prefix])
+    for entry in filter(None, out.split('\0')):
+        info, path = entry.split('\t', 1)
+        mode, _, sha = info.split()
+        entries[os.path.relpath(path, prefix)] = (mode, sha)
+    return entries
+
+
+def get_parent(ref):
+    p = run(['git', 'rev-parse', '--verify', '--quiet', ref + '^{commit}'],
+            stdout=PIPE, stderr=PIPE)
+    if p.returncode:
+        return None
+    return p.stdout.decode().strip()
+
+
+def diff_tree(files, tree):
+    """Return the changed files and the deleted paths of files vs tree."""
+    hash_blob = blob_hasher()
+    changed = {path: (mode, data) for path, (mode, data) in files.items()
+               if tree.get(path) != (mode, hash_blob(data))}
+    deleted = sorted(set(tree) - set(files))
+    return changed, deleted
+
+
+def fast_import_stream(ref, parent, prefix, changed, deleted, message):
+    ident = cmd(['git', 'var', 'GIT_COMMITTER_IDENT']).encode()
+    msg = message.encode()
+    out = [b'commit ' + ref.encode(),
+           b'committer ' + ident,
+           b'data %d' % len(msg), msg]
+    if parent:
+        out.append(b'from ' + parent.encode())
+    for path in sorted(changed):
+        mode, data = changed[path]
+        name = '/'.join([prefix, path]).encode()
+        out.append(b'M %s inline %s' % (mode.encode(), name))
+        out += [b'data %d' % len(data), data]
+    for path in deleted:
+        out.append(b'D ' + '/'.join([prefix, path]).encode())
+    return b'\n'.join(out) + b'\n\n'
+
+
+def refresh_worktree(branch, prefix):
+    """Sync the index of a worktree which has branch checked out.
+
+    Only the entries below prefix are reset, the files in the worktree
+    are not touched.
+    """
+    worktree = None
+    for line in cmd(['git', 'worktree', 'list', '--porcelain']).splitlines():
+        if line.startswith('worktree '):
+            worktree = line[len('worktree '):]
+        elif line == 'branch refs/heads/' + branch:
+            cmd(['git', '-C', worktree, 'reset', '-q', '--', prefix])
+
+
+def import_patches(patches_dir, branch, message, prefix='patches'):
+    """Commit patches_dir as prefix onto branch with git fast-import.
+
+    Only blobs which differ from the tip of branch are sent, the branch
+    is never checked out. Returns the new commit or None if nothing
+    changed.
+    """
+    ref = 'refs/heads/' + branch
+    parent = get_parent(ref)
+    tree = read_tree(parent, prefix) if parent else {}
+    changed, deleted = diff_tree(read_dir(patches_dir), tree)
+    if not changed and not deleted:
+        print('{0} is up to date'.format(branch))
+        return None
+
+    stream = fast_import_stream(ref, parent, prefix, changed, deleted,
+                                message)
+    run(['git', 'fast-import', '--quiet', '--date-format=raw'],
+        input=stream, check=True)
+    refresh_worktree(branch, prefix)
+    print('{0}: {1} changed, {2} deleted'.format(branch, len(changed),
+                                                 len(deleted)))
+    return get_parent(ref)
+
+
+def add_argparser(parser):
+    prs = parser.add_parser('import-patches')
+    prs.add_argument('--patches', '-p', default=None, metavar='DIR',
+                     help='quilt patches directory (default: '
+                          'QUILT_PATCHES)')
+    prs.add_argument('--branch', '-b', default=None,
+                     help='Branch to commit to (default: the upstream '
+                          'branch with -patches appended)')
+    prs.add_argument('--message', '-m', default=None,
+                     help='Commit message')
+    return prs
+
+
+def execute(args):
+    branch = args.branch or get_remote_branch_name() + '-patches'
+    message = args.message
+    if not message:
+        message = 'Patch queue for {0}'.format(
+            os.environ.get('NEW_TAG', branch))
+    import_patches(args.patches or get_patches_dir(), branch, message)
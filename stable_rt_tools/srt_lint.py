@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import hashlib
+import os
+import re
+import shlex
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from subprocess import PIPE, STDOUT, run
+
+from stable_rt_tools.srt_check import get_patches_dir, read_series
+from stable_rt_tools.srt_util import (get_cache_dir, get_config,
+                                      read_json_cache, update_json_cache)
+
+
+def split_message(data):
+    """Return the mail header and the commit message of a patch."""
+    header, _, body = data.partition(b'\n\n')
+    message = re.split(rb'^(?:---\s*$|diff --git )', body, maxsplit=1,
+                       flags=re.M)[0]
+    return header, message
+
+
+class CheckerError(Exception):
+    """A checker could not be run, its result is not cached."""
+    pass
+
+
+def check_from(spec, path, data):
+    header, _ = split_message(data)
+    if not re.search(rb'^From: .*<.+@.+>', header, re.M):
+        return ['missing From: header']
+    return []
+
+
+def check_signoff(spec, path, data):
+    _, message = split_message(data)
+    if not re.search(rb'^Signed-off-by: .+', message, re.M):
+        return ['missing Signed-off-by:']
+    return []
+
+
+def check_upstream(spec, path, data):
+    _, message = split_message(data)
+    tags = spec.split(',')
+    for tag in tags:
+        if re.search(rb'^' + re.escape(tag.encode()) + rb': .+', message,
+                     re.M):
+            return []
+    return ['missing upstream status ({0})'.format(', '.join(tags))]
+
+
+def check_command(spec, path, data):
+    try:
+        p = run(shlex.split(spec) + [path], stdout=PIPE, stderr=STDOUT)
+    except (OSError, ValueError) as e:
+        raise CheckerError('failed to run: {0}'.format(e))
+    if p.returncode == 0:
+        return []
+    output = p.stdout.decode('utf-8', 'replace').splitlines()
+    return [line for line in output if line.strip()] or \
+        ['exited with {0}'.format(p.returncode)]
+
+
+BUILTIN_CHECKERS = {
+    'from': check_from,
+    'signoff': check_signoff,
+    'upstream': check_upstream,
+}
+
+# Part of every cache key, bump it when the built-in checkers or the
+# patch parsing change so cached results are not reused.
+CHECKER_VERSION = 1
+
+
+def get_checkers(config):
+    """Return [(name, spec)] of the checkers listed in LINT_CHECKERS.
+
+    spec is the command line of an external checker, taken from
+    LINT_<NAME>. The patch file is appended to it.
+    """
+    checkers = []
+    for name in config.get('LINT_CHECKERS', 'from, signoff').split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name == 'upstream':
+            tags = config.get('LINT_UPSTREAM_TAGS', 'Link, Upstream-Status')
+            spec = ','.join(t.strip() for t in tags.split(','))
+        elif name in BUILTIN_CHECKERS:
+            spec = ''
+        else:
+            key = 'LINT_' + name.upper().replace('-', '_')
+            if key not in config:
+                print('No command configured for checker {0}, set {1}'.format(
+                    name, key), file=sys.stderr)
+                sys.exit(1)
+            spec = config[key]
+        checkers.append((name, spec))
+    return checkers
+
+
+def cache_key(name, spec, digest):
+    key = '\0'.join([str(CHECKER_VERSION), name, spec, digest])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_lint_cache_path():
+    return os.path.join(get_cache_dir(), 'lint-cache.json')
+
+
+def read_lint_cache():
+    """Return {cache key: problems} of the patches already checked."""
+    return read_json_cache(get_lint_cache_path())
+
+
+def write_lint_cache(cache):
+    update_json_cache(get_lint_cache_path(), cache)
+
+
+def lint_patch(path, data, checkers):
+    """Run checkers on a patch and return {name: (problems, cacheable)}."""
+    results = {}
+    for name, spec in checkers:
+        check = BUILTIN_CHECKERS.get(name, check_command)
+        try:
+            results[name] = (check(spec, path, data), True)
+        except CheckerError as e:
+            results[name] = ([str(e)], False)
+    return results
+
+
+def print_problems(patch, problems):
+    print('{0}:'.format(patch))
+    for name, lines in problems:
+        for line in lines:
+            print('    {0}: {1}'.format(name, line))
+
+
+def lint_series(config, patches_dir, jobs=None):
+    """Lint the patches of the series in patches_dir.
+
+    The results are cached by the content of the patch and the checker,
+    so only new or changed patches are checked. The checks run in a
+    process pool. Returns the number of patches with problems.
+    """
+    checkers = get_checkers(config)
+    cache = read_lint_cache()
+    keys = {}
+    todo = []
+    for patch, _ in read_series(patches_dir):
+        path = os.path.join(patches_dir, patch)
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        keys[patch] = {name: cache_key(name, spec, digest)
+                       for name, spec in checkers}
+        missing = [(name, spec) for name, spec in checkers
+                   if keys[patch][name] not in cache]
+        if missing:
+            todo.append((patch, path, data, missing))
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(lint_patch, path, data, missing)
+                       for _, path, data, missing in todo]
+            results = {}
+            for (patch, _, _, _), future in zip(todo, futures):
+                for name, (problems, cacheable) in future.result().items():
+                    cache[keys[patch][name]] = problems
+                    if cacheable:
+                        results[keys[patch][name]] = problems
+        write_lint_cache(results)
+
+    failed = 0
+    for patch, pkeys in keys.items():
+        problems = [(name, cache[key]) for name, key in pkeys.items()
+                    if cache[key]]
+        if problems:
+            failed += 1
+            print_problems(patch, problems)
+    print('{0} patches, {1} checked, {2} with problems'.format(
+        len(keys), len(todo), failed))
+    return failed
+
+
+def add_argparser(parser):
+    prs = parser.add_parser('lint-series')
+    prs.add_argument('--patches', '-p', default=None, metavar='DIR',
+                     help='quilt patches directory (default: '
+                          'QUILT_PATCHES)')
+    prs.add_argument('--jobs', '-j', type=int, default=None,
+                     help='Number of parallel checkers '
+                          '(default: number of CPUs)')
+    return prs
+
+
+def execute(args):
+    if lint_series(get_config(), args.patches or get_patches_dir(),
+                   args.jobs):
+        sys.exit(1)
@@ -23,42 +23,20 @@
 # SOFTWARE
 
 import re
-import shutil
 import tempfile
 from email.utils import make_msgid
 from time import gmtime, strftime
 import subprocess
 from stable_rt_tools.srt_util import (
-    check_context, cmd, confirm, get_config, get_gnupghome,
+    check_context, cmd, get_config, get_gnupghome,
     get_remote_branch_name, get_gpg_fingerprint
 )
 from stable_rt_tools.srt_util_context import SrtContext
+from stable_rt_tools.srt_tag import apply_tags
+from stable_rt_tools.srt_util_tag_batch import TagBatch
 import importlib.resources as pkg_resources
 
 
-def localversion_set(filename, version):
-    with open(filename, 'w') as f:
-        f.write(version)
-        f.write('\n')
-
-
-def localversion_inc(filename):
-    with open(filename, 'r+') as f:
-        line = f.readline()
-        version = int(line[3:])
-        f.seek(0)
-        f.write('-rt{0}\n'.format(version+1))
-        f.truncate()
-
-
-def get_kernel_version():
-    tmp = tempfile.mkdtemp()
-    cmd(['make', 'O=%s' % tmp, 'defconfig'])
-    line = cmd(['make', '-s', 'O=%s' % tmp, 'kernelrelease'])
-    shutil.rmtree(tmp)
-    return line.strip()[:-1]
-
-
 def last_commit_was_release_commit():
     p = re.compile(r'^.*Linux ([0-9\.]+[-a-z0-9]+)( REBASE)*')
     lines = cmd(['git', 'log', '-1', '--pretty=%B'])
@@ -112,26 +90,17 @@ def do_patches(config, ctx, args):
         f.write(stable_rt_text.format(**r))
         msg_path = f.name
     subprocess.run(['git', 'commit', '--edit', '-F', msg_path])
-    tag = str(ctx.new_tag) + '-patches'
-    msg = 'Patch queue for ' + str(ctx.new_tag)
-    print('tagging as {0} with message \'{1}\''.format(tag, msg))
-    if confirm('OK to tag?'):
-        cmd(
-            ['git', 'tag', '-s', '-u', config['GPG_KEY_ID'],
-             '-m', msg, tag],
-            env={'GNUPGHOME': get_gnupghome(config)}
-        )
+    batch = TagBatch(config)
+    batch.add(str(ctx.new_tag) + '-patches', 'HEAD',
+              'Patch queue for ' + str(ctx.new_tag))
+    apply_tags(batch)
 
 
 def do_rebase(config, ctx, args):
     tag = str(ctx.new_tag) + '-rebase'
-    print('tagging as {0} with message \'{1}\''.format(tag, tag))
-    if confirm('OK to tag?'):
-        cmd(
-            ['git', 'tag', '-s', '-u', config['GPG_KEY_ID'],
-             '-m', tag, tag],
-            env={'GNUPGHOME': get_gnupghome(config)}
-        )
+    batch = TagBatch(config)
+    batch.add(tag, 'HEAD', tag)
+    apply_tags(batch)
 
 
 def do_release(config, ctx, args):
@@ -140,13 +109,9 @@ def do_release(config, ctx, args):
         ['git', 'commit', '-s', '-m', tag],
         env={'GNUPGHOME': get_gnupghome(config)}
     )
-    print('tagging as {0} with message \'{1}\''.format(tag, tag))
-    if confirm('OK to tag?'):
-        cmd(
-            ['git', 'tag', '-s', '-u', config['GPG_KEY_ID'],
-             '-m', tag, tag],
-            env={'GNUPGHOME': get_gnupghome(config)}
-        )
+    batch = TagBatch(config)
+    batch.add(tag, 'HEAD', tag)
+    apply_tags(batch)
 
 
 def patches(config, ctx, args):
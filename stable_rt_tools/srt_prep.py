@@ -23,13 +23,31 @@
 # SOFTWARE
 
 
+import hashlib
+import json
 import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from logging import debug
+from subprocess import CalledProcessError
 from stable_rt_tools.srt_util import (
-    get_remote_branch_name, get_old_tag, get_config, get_last_rt_tag, cmd
+    get_remote_branch_name, get_old_tag, get_config, get_config_bool,
+    get_last_rt_tag, cmd, get_cache_dir, ls_remote_tags, print_table,
+    read_json_cache, update_json_cache
 )
+from stable_rt_tools.srt_util_tag_index import (find_newest_tag, get_git_dir,
+                                                stat_key)
+from stable_rt_tools.srt_verify import get_stable_tree_dir, verify_tags
 
 
 def get_next_stable_version(branch_name, tree_dir):
+    m = re.match(r'^v(\d+\.\d+)-rt', branch_name)
+    tag = find_newest_tag(tree_dir, m.group(1)) if m else None
+    if tag:
+        return tag
+
+    # the index can't answer, ask git
     branch = cmd([
         'git', '-C', tree_dir, 'rev-parse', '--abbrev-ref', 'HEAD']
     ).strip()
@@ -42,7 +60,7 @@ def get_next_stable_version(branch_name, tree_dir):
     return None
 
 
-def prep(config):
+def compute_exports(config, remote_tags):
     current_dir = os.path.basename(os.getcwd())
 
     # quilt patches
@@ -51,28 +69,164 @@ def prep(config):
     )
 
     # old tag
-    old_tag = get_old_tag()
+    old_tag = get_old_tag(remote_tags)
 
     # new tag
     branch_name = get_remote_branch_name()
     rt = get_last_rt_tag(branch_name, '')
     rt_ver = rt[3:]
     rt_ver = int(rt_ver) + 1
-    stable_tree_dir = os.path.abspath(
-        os.path.join('..', current_dir.split('-rt')[0])
-    )
+    stable_tree_dir = get_stable_tree_dir()
     next_stable = get_next_stable_version(branch_name, stable_tree_dir)
+    if not next_stable:
+        print(f"No stable tag found in {stable_tree_dir}", file=sys.stderr)
+        sys.exit(1)
+    if get_config_bool(config, 'VERIFY_UPSTREAM', True):
+        verdicts = verify_tags(config, stable_tree_dir, [next_stable])
+        if not verdicts[next_stable]:
+            print(f"Signature of {next_stable} could not be verified",
+                  file=sys.stderr)
+            sys.exit(1)
     new_tag = f"{next_stable}-rt{rt_ver}"
 
-    print(f"export QUILT_PATCHES={quilt_patches}")
-    print(f"export OLD_TAG={old_tag}")
-    print(f"export NEW_TAG={new_tag}")
+    return [f"export QUILT_PATCHES={quilt_patches}",
+            f"export OLD_TAG={old_tag}",
+            f"export NEW_TAG={new_tag}"]
+
+
+def ref_state(tree_dir):
+    """Return the state of the refs of the repository in tree_dir:
+    packed-refs, the loose refs, HEAD and the git config."""
+    git_dir = get_git_dir(tree_dir)
+    state = [git_dir, stat_key(os.path.join(git_dir, 'packed-refs')),
+             stat_key(os.path.join(git_dir, 'config'))]
+    head = os.path.join(cmd(['git', '-C', tree_dir, 'rev-parse',
+                             '--absolute-git-dir']), 'HEAD')
+    with open(head, 'r') as f:
+        state.append(f.read())
+    for root, _, files in sorted(os.walk(os.path.join(git_dir, 'refs'))):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            state.append([path, os.stat(path).st_mtime_ns])
+    return state
+
+
+def prep_fingerprint(config, remote_time):
+    """Return a hash over everything the exports depend on."""
+    state = [os.getcwd(), sorted(dict(config).items()), remote_time,
+             ref_state('.'), ref_state(get_stable_tree_dir())]
+    return hashlib.sha256(json.dumps(state).encode()).hexdigest()
+
+
+def get_prep_cache_path():
+    key = hashlib.sha1(os.getcwd().encode()).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), 'prep-{0}.json'.format(key))
+
+
+def read_prep_cache(fingerprint):
+    cache = read_json_cache(get_prep_cache_path())
+    if cache.get('fingerprint') != fingerprint:
+        return None
+    exports = cache.get('exports')
+    return exports if isinstance(exports, list) else None
+
+
+def write_prep_cache(fingerprint, exports):
+    update_json_cache(get_prep_cache_path(),
+                      {'fingerprint': fingerprint, 'exports': exports})
+
+
+def get_exports(config, refresh=False):
+    max_age = int(config.get('PREP_REMOTE_TTL', 300))
+    remote_time, remote_tags = ls_remote_tags(max_age, refresh)
+
+    try:
+        fingerprint = prep_fingerprint(config, remote_time)
+    except (CalledProcessError, OSError) as e:
+        debug('not caching prep: {0}'.format(e))
+        fingerprint = None
+
+    exports = None
+    if fingerprint and not refresh:
+        exports = read_prep_cache(fingerprint)
+    if exports is None:
+        exports = compute_exports(config, remote_tags)
+        if fingerprint:
+            write_prep_cache(fingerprint, exports)
+    return exports
+
+
+def prep(config, refresh=False):
+    for line in get_exports(config, refresh):
+        print(line)
+
+
+def find_rt_trees(workspace):
+    """Return the -rt trees in workspace which have a stable tree
+    next to them."""
+    trees = []
+    for name in sorted(os.listdir(workspace)):
+        path = os.path.join(workspace, name)
+        if not name.endswith('-rt') or \
+                not os.path.exists(os.path.join(path, '.git')):
+            continue
+        if os.path.isdir(os.path.join(workspace, name.split('-rt')[0])):
+            trees.append(path)
+        else:
+            debug('no stable tree for {0}'.format(path))
+    return trees
+
+
+def prep_tree(tree, refresh):
+    """Return the exports of tree as dict or the error as string."""
+    try:
+        os.chdir(tree)
+        exports = get_exports(get_config(), refresh)
+    except KeyError as e:
+        return 'failed (missing configuration {0})'.format(e)
+    except (SystemExit, Exception) as e:
+        return 'failed ({0})'.format(e)
+    return dict(line[len('export '):].split('=', 1) for line in exports)
+
+
+def prep_workspace(workspace, refresh=False, env_dir=None):
+    """Compute the exports of all -rt trees in workspace in parallel.
+
+    Prints a table and writes <tree>.env files to env_dir if given.
+    """
+    trees = find_rt_trees(os.path.abspath(workspace))
+    with ProcessPoolExecutor() as pool:
+        results = list(pool.map(prep_tree, trees, [refresh] * len(trees)))
+
+    table = [('Tree', 'OLD_TAG', 'NEW_TAG', 'QUILT_PATCHES')]
+    for tree, r in zip(trees, results):
+        name = os.path.basename(tree)
+        if isinstance(r, str):
+            table.append((name, '-', '-', r))
+            continue
+        table.append((name, r['OLD_TAG'], r['NEW_TAG'], r['QUILT_PATCHES']))
+        if env_dir:
+            os.makedirs(env_dir, exist_ok=True)
+            with open(os.path.join(env_dir, name + '.env'), 'w') as f:
+                for key in ['QUILT_PATCHES', 'OLD_TAG', 'NEW_TAG']:
+                    f.write('export {0}={1}\n'.format(key, r[key]))
+    print_table(table)
+    return results
 
 
 def add_argparser(parser):
     prs = parser.add_parser('prep')
+    prs.add_argument('--refresh', action='store_true', default=False,
+                     help='Query the remote and recompute the exports')
+    prs.add_argument('--workspace', '-w', default=None, metavar='DIR',
+                     help='Prepare all -rt trees in DIR')
+    prs.add_argument('--env-dir', default=None, metavar='DIR',
+                     help='With --workspace, write <tree>.env files to DIR')
     return prs
 
 
 def execute(args):
-    prep(get_config())
+    if args.workspace:
+        prep_workspace(args.workspace, args.refresh, args.env_dir)
+        return
+    prep(get_config(), args.refresh)
@@ -22,48 +22,257 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE
 
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import CalledProcessError
+
 from stable_rt_tools.srt_util import (check_context, cmd, confirm, get_config,
                                       get_remote_branch_name,
-                                      is_quilt_workflow)
+                                      invalidate_remote_tags, is_ancestor,
+                                      is_quilt_workflow, print_table)
 from stable_rt_tools.srt_util_context import SrtContext
 
+# git push --porcelain flags
+push_flags = {
+    ' ': 'fast-forward',
+    '+': 'forced update',
+    '-': 'deleted',
+    '*': 'new',
+    '!': 'rejected',
+    '=': 'up to date',
+}
 
-def push(config, ctx):
-    branch = get_remote_branch_name()
 
-    args = None
+def get_push_remotes(config):
+    """Return PRJ_GIT_TREE followed by the PUSH_MIRRORS remotes."""
+    remotes = [config['PRJ_GIT_TREE']]
+    mirrors = config.get('PUSH_MIRRORS', '')
+    remotes += [m.strip() for m in mirrors.split(',') if m.strip()]
+    return remotes
+
+
+def get_refspecs(config, ctx, branch):
     if ctx.is_rc:
-        args = [config['PRJ_GIT_TREE'],
-                '{0}^{{}}:{1}'.format(ctx.new_tag, branch),
+        return ['{0}^{{}}:refs/heads/{1}'.format(ctx.new_tag, branch),
                 'tag', str(ctx.new_tag)]
-    else:
-        args = [
-            config['PRJ_GIT_TREE'],
-            '{0}^{{}}:{1}'.format(ctx.new_tag, branch),
-            '+{0}-rebase^{{}}:{1}-rebase'.format(ctx.new_tag, branch),
-            'tag', str(ctx.new_tag),
-            'tag', '{0}-rebase'.format(ctx.new_tag)
-        ]
-        if is_quilt_workflow(config):
-            patches_branch = branch + '-patches'
-            patches_tag = str(ctx.new_tag) + '-patches'
-            args += [patches_branch, 'tag', patches_tag]
-
-    gcp = ['git', 'push']
-    if ctx.is_rc:
-        gcp += ['-f']
 
-    print('Dry run')
-    cmd(gcp + ['-n'] + args, verbose=True)
+    args = [
+        '{0}^{{}}:refs/heads/{1}'.format(ctx.new_tag, branch),
+        '+{0}-rebase^{{}}:refs/heads/{1}-rebase'.format(ctx.new_tag, branch),
+        'tag', str(ctx.new_tag),
+        'tag', '{0}-rebase'.format(ctx.new_tag)
+    ]
+    if is_quilt_workflow(config):
+        patches_branch = branch + '-patches'
+        patches_tag = str(ctx.new_tag) + '-patches'
+        args += [patches_branch, 'tag', patches_tag]
+    return args
+
+
+def parse_refspecs(refspecs, force=False):
+    """Return (src, dst, force) for each ref in a git push refspec list."""
+    entries = []
+    it = iter(refspecs)
+    for spec in it:
+        if spec == 'tag':
+            tag = 'refs/tags/' + next(it)
+            entries.append((tag, tag, force))
+            continue
+        forced = force or spec.startswith('+')
+        src, _, dst = spec.lstrip('+').partition(':')
+        if not dst:
+            dst = 'refs/heads/' + src
+        entries.append((src, dst, forced))
+    return entries
+
+
+def get_push_cache_path():
+    try:
+        gitdir = cmd(['git', 'rev-parse', '--git-common-dir'])
+    except CalledProcessError:
+        return None
+    if not gitdir:
+        return None
+    return os.path.join(gitdir, 'srt-push-cache.json')
+
+
+def read_push_cache():
+    """Return the cached remote refs as {remote: {ref: sha}}."""
+    path = get_push_cache_path()
+    if not path or not os.path.isfile(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_push_cache(cache):
+    path = get_push_cache_path()
+    if not path:
+        return
+    with open(path + '.tmp', 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def ls_remote(remote, refs):
+    """Return {ref: sha} for refs on remote, None for missing refs."""
+    out = cmd(['git', 'ls-remote', remote] + refs)
+    result = dict.fromkeys(refs)
+    for line in out.splitlines():
+        sha, _, ref = line.partition('\t')
+        if ref in refs:
+            result[ref] = sha
+    return result
+
+
+def plan_push(entries, local, remote_refs):
+    """Return (dst, old, new, status) for every ref to push.
+
+    old is the value of dst in the remote refs cache or None if the
+    ref does not exist on the remote yet.
+    """
+    plan = []
+    for src, dst, force in entries:
+        new = local.get(src, '')
+        old = remote_refs.get(dst)
+        if old is None:
+            status = 'new'
+        elif old == new:
+            status = 'up to date'
+        elif dst.startswith('refs/heads/') and is_ancestor(old, new):
+            status = 'fast-forward'
+        elif force:
+            status = 'forced update'
+        else:
+            status = 'rejected'
+        plan.append((dst, old, new, status))
+    return plan
+
+
+def get_leases(plan):
+    return ['--force-with-lease={0}:{1}'.format(dst, old or '')
+            for dst, old, _, _ in plan]
+
+
+def parse_porcelain(out):
+    rows = []
+    for line in out.splitlines():
+        parts = line.split('\t')
+        if len(parts) < 3:
+            continue
+        flag, refs, summary = parts[0], parts[1], parts[2]
+        rows.append((refs.split(':')[-1], push_flags.get(flag, flag),
+                     summary))
+    return rows
+
+
+def git_push(remote, refspecs, leases):
+    """Push atomically to remote and return (ok, rows)."""
+    gcp = ['git', 'push', '--atomic', '--porcelain'] + leases
+
+    try:
+        out = cmd(gcp + [remote] + refspecs)
+    except CalledProcessError as e:
+        out = e.stdout.decode('utf-8') if e.stdout else ''
+        rows = parse_porcelain(out)
+        if not rows:
+            rows = [('', 'error', 'exit code {0}'.format(e.returncode))]
+        return False, rows
+    return True, parse_porcelain(out)
+
+
+def run_all(func, remotes):
+    with ThreadPoolExecutor(max_workers=len(remotes)) as executor:
+        return dict(zip(remotes, executor.map(func, remotes)))
+
+
+def print_plan(plans):
+    table = [('Remote', 'Ref', 'Update', 'Status')]
+    for remote, plan in plans.items():
+        for dst, old, new, status in plan:
+            update = '{0}..{1}'.format((old or '0' * 12)[:12], new[:12])
+            table.append((remote, dst, update, status))
+    print_table(table)
+
+
+def print_status(results):
+    table = [('Remote', 'Ref', 'Status', 'Summary')]
+    for remote, (ok, rows) in results.items():
+        for ref, status, summary in rows:
+            table.append((remote, ref, status, summary))
+        if not rows:
+            table.append((remote, '', 'ok' if ok else 'failed', ''))
+    print_table(table)
+
+
+def update_push_cache(cache, plans, results, dsts):
+    for r, (ok, _) in results.items():
+        if ok:
+            cache[r].update({dst: new for dst, _, new, _ in plans[r]})
+            continue
+        print('Push to {0} failed'.format(r), file=sys.stderr)
+        # most likely stale info, refetch for the next attempt
+        try:
+            cache[r].update(ls_remote(r, dsts))
+        except CalledProcessError:
+            # unreachable, the next attempt has to ask again
+            del cache[r]
+    write_push_cache(cache)
+
+
+def push(config, ctx, refresh=False):
+    branch = get_remote_branch_name()
+    refspecs = get_refspecs(config, ctx, branch)
+    entries = parse_refspecs(refspecs, force=ctx.is_rc)
+    remotes = get_push_remotes(config)
+    dsts = [dst for _, dst, _ in entries]
+
+    # Refresh the remote refs only if asked for or the branches are not
+    # cached yet. New tags are expected to be missing on the remote. The
+    # leases make sure a stale cache can't overwrite anything.
+    cache = read_push_cache()
+    stale = [r for r in remotes if refresh or r not in cache or
+             any(d not in cache[r] for d in dsts
+                 if d.startswith('refs/heads/'))]
+    if stale:
+        for r, refs in run_all(lambda r: ls_remote(r, dsts), stale).items():
+            cache.setdefault(r, {}).update(refs)
+        write_push_cache(cache)
+
+    srcs = [src for src, _, _ in entries]
+    local = dict(zip(srcs, cmd(['git', 'rev-parse'] + srcs).splitlines()))
+    plans = {r: plan_push(entries, local, cache[r]) for r in remotes}
+    print_plan(plans)
+
+    for r, plan in plans.items():
+        if any(status == 'rejected' for _, _, _, status in plan):
+            print('Not pushing to {0}, non fast-forward update'.format(r),
+                  file=sys.stderr)
+            remotes.remove(r)
+    if not remotes:
+        return
+
+    if not confirm('OK to push?'):
+        return
+
+    refspecs = [spec.lstrip('+') for spec in refspecs]
+    results = run_all(
+        lambda r: git_push(r, refspecs, get_leases(plans[r])), remotes)
+    print_status(results)
+    # the remote tags changed, 'srt prep' has to ask again
+    invalidate_remote_tags()
 
-    if confirm('OK to push?'):
-        cmd(gcp + args)
+    update_push_cache(cache, plans, results, dsts)
 
 
 def add_argparser(parser):
     prs = parser.add_parser('push')
     prs.add_argument('OLD_TAG', nargs='?')
     prs.add_argument('NEW_TAG', nargs='?')
+    prs.add_argument('--refresh', action='store_true', default=False,
+                     help='Refresh the cached remote refs before planning')
     return prs
 
 
@@ -71,4 +280,4 @@ def execute(args):
     ctx = SrtContext(args)
     check_context(ctx)
 
-    push(get_config(), ctx)
+    push(get_config(), ctx, args.refresh)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+import sqlite3
+import sys
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from logging import debug
+from subprocess import PIPE, CalledProcessError, run
+
+from stable_rt_tools.srt_util import (cmd, get_cache_dir, get_config,
+                                      is_ancestor)
+from stable_rt_tools.srt_util_context import SrtContext
+
+msgid_re = re.compile(r'<[^<>\s]+>')
+ack_re = re.compile(rb'^\s*((Acked|Reviewed|Tested)-by:.*?)\s*$',
+                    re.MULTILINE | re.IGNORECASE)
+nack_re = re.compile(rb'^(?!\s*>).*(\bNACK\b|\bNAK\b|\bNacked-by:)',
+                     re.MULTILINE | re.IGNORECASE)
+
+schema = '''
+CREATE TABLE IF NOT EXISTS messages (
+    msgid TEXT PRIMARY KEY, refs TEXT, sender TEXT, subject TEXT,
+    acks TEXT, objection INTEGER);
+CREATE TABLE IF NOT EXISTS refs (ref TEXT, msgid TEXT);
+CREATE INDEX IF NOT EXISTS refs_ref ON refs (ref);
+CREATE INDEX IF NOT EXISTS messages_subject ON messages (subject);
+CREATE TABLE IF NOT EXISTS state (source TEXT PRIMARY KEY, position TEXT);
+'''
+
+
+def get_index_path():
+    return os.path.join(get_cache_dir(), 'review-index.sqlite')
+
+
+def parse_message(raw):
+    """Return (msgid, refs, sender, subject, acks, objection) for raw.
+
+    refs lists the referenced Message-IDs, the direct parent last. The
+    body is only inspected for replies.
+    """
+    if raw.startswith(b'From '):
+        raw = raw.split(b'\n', 1)[-1]
+    header, _, body = raw.replace(b'\r\n', b'\n').partition(b'\n\n')
+    msg = BytesHeaderParser().parsebytes(header + b'\n\n')
+    msgid = msgid_re.findall(str(msg.get('Message-ID', '')))
+    if not msgid:
+        return None
+    refs = msgid_re.findall(str(msg.get('References', '')))
+    for parent in msgid_re.findall(str(msg.get('In-Reply-To', ''))):
+        if parent in refs:
+            refs.remove(parent)
+        refs.append(parent)
+
+    acks, objection = [], False
+    if refs:
+        acks = [m.group(1).decode('utf-8', 'replace')
+                for m in ack_re.finditer(body)]
+        objection = nack_re.search(body) is not None
+    return (msgid[0], ' '.join(refs), decode(msg.get('From', '')),
+            decode(msg.get('Subject', '')), json.dumps(acks),
+            int(objection))
+
+
+def decode(value):
+    try:
+        return str(make_header(decode_header(str(value)))).replace('\n', '')
+    except (LookupError, ValueError):
+        return str(value)
+
+
+class ReviewIndex:
+    """Index of the messages of a mail archive by Message-ID and by the
+    Message-IDs they reply to.
+
+    The index remembers how far each archive has been read, updates
+    only process new messages.
+    """
+
+    def __init__(self, path=None):
+        self.db = sqlite3.connect(path or get_index_path())
+        self.db.executescript(schema)
+
+    def close(self):
+        self.db.close()
+
+    def add(self, raw):
+        row = parse_message(raw)
+        if not row:
+            return
+        self.db.execute('DELETE FROM refs WHERE msgid = ?', (row[0],))
+        self.db.execute('INSERT OR REPLACE INTO messages VALUES '
+                        '(?, ?, ?, ?, ?, ?)', row)
+        self.db.executemany('INSERT INTO refs VALUES (?, ?)',
+                            [(r, row[0]) for r in row[1].split()])
+
+    def get_position(self, source):
+        row = self.db.execute('SELECT position FROM state WHERE source = ?',
+                              (source,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_position(self, source, position):
+        self.db.execute('INSERT OR REPLACE INTO state VALUES (?, ?)',
+                        (source, json.dumps(position)))
+        self.db.commit()
+
+    def update(self, archive):
+        """Index the new messages of an mbox file or a public-inbox
+        mirror and return their number."""
+        archive = os.path.abspath(archive)
+        if os.path.isfile(archive):
+            return self.update_mbox(archive)
+        return sum(self.update_git(repo) for repo in inbox_repos(archive))
+
+    def update_mbox(self, fname):
+        pos = self.get_position(fname)
+        with open(fname, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = pos['offset'] if pos and pos['tail'] == \
+                    tail_hash(mm, pos['offset']) else 0
+                count = 0
+                for raw in mbox_messages(mm, start):
+                    self.add(raw)
+                    count += 1
+                self.set_position(fname, {'offset': len(mm),
+                                          'tail': tail_hash(mm, len(mm))})
+        debug('indexed {0} messages from {1}'.format(count, fname))
+        return count
+
+    def update_git(self, repo):
+        last = self.get_position(repo)
+        try:
+            head = cmd(['git', '--git-dir', repo, 'rev-parse', 'HEAD'])
+        except CalledProcessError:
+            return 0
+        if last == head:
+            return 0
+        rng = [head]
+        if last and is_ancestor(last, head, repo):
+            rng = ['^' + last, head]
+        blobs = cmd(['git', '--git-dir', repo, 'log', '--reverse',
+                     '--format=', '--raw', '--no-abbrev',
+                     '--diff-filter=AM'] + rng).split('\n')
+        blobs = [line.split()[3] for line in blobs if line.startswith(':')]
+        for i in range(0, len(blobs), 1000):
+            for raw in read_blobs(repo, blobs[i:i + 1000]):
+                self.add(raw)
+        self.set_position(repo, head)
+        debug('indexed {0} messages from {1}'.format(len(blobs), repo))
+        return len(blobs)
+
+    def find(self, msgid):
+        return self.db.execute('SELECT * FROM messages WHERE msgid = ?',
+                               (msgid,)).fetchone()
+
+    def find_series(self, tag):
+        """Return the Message-IDs of the RC series of tag, cover letter
+        first."""
+        cover = self.db.execute(
+            'SELECT msgid FROM messages WHERE subject LIKE ? '
+            'AND subject NOT LIKE ? ORDER BY rowid DESC',
+            ('%PATCH RT 0%] Linux ' + tag, 'Re:%')).fetchone()
+        if not cover:
+            return []
+        patches = self.db.execute(
+            'SELECT m.msgid FROM refs r JOIN messages m ON r.msgid = m.msgid '
+            'WHERE r.ref = ? AND m.subject LIKE ? AND m.subject NOT LIKE ? '
+            'ORDER BY m.rowid', (cover[0], '[PATCH RT %', 'Re:%'))
+        return [cover[0]] + [p[0] for p in patches]
+
+    def replies(self, series):
+        """Return {series msgid: [reply rows]}.
+
+        A reply is accounted to the series message it is closest to in
+        its thread.
+        """
+        found = {msgid: [] for msgid in series}
+        marks = ','.join('?' * len(series))
+        rows = self.db.execute(
+            'SELECT DISTINCT m.* FROM refs r JOIN messages m '
+            'ON r.msgid = m.msgid WHERE r.ref IN ({0})'.format(marks),
+            series)
+        for row in rows:
+            if row[0] in found:
+                continue
+            parent = [r for r in row[1].split() if r in found][-1]
+            found[parent].append(row)
+        return found
+
+
+def tail_hash(mm, offset):
+    return hashlib.sha1(mm[max(0, offset - 4096):offset]).hexdigest()
+
+
+def mbox_messages(mm, start):
+    """Yield the raw mbox messages after start."""
+    pos = start
+    size = len(mm)
+    while pos < size:
+        end = mm.find(b'\nFrom ', pos)
+        end = size if end == -1 else end + 1
+        yield mm[pos:end]
+        pos = end
+
+
+def inbox_repos(dirname):
+    """Return the git repositories of a public-inbox mirror (v2 epochs
+    or a single v1 repository)."""
+    epochs = glob.glob(os.path.join(dirname, 'git', '*.git'))
+    if epochs:
+        return sorted(epochs, key=lambda e: int(
+            os.path.basename(e).split('.')[0]))
+    return [dirname]
+
+
+def read_blobs(repo, blobs):
+    p = run(['git', '--git-dir', repo, 'cat-file', '--batch'],
+            input='\n'.join(blobs).encode() + b'\n', stdout=PIPE, check=True)
+    out = p.stdout
+    pos = 0
+    for _ in blobs:
+        nl = out.index(b'\n', pos)
+        size = int(out[pos:nl].split()[2])
+        yield out[nl + 1:nl + 1 + size]
+        pos = nl + size + 2
+
+
+def get_sent_series(ctx):
+    """Return the Message-IDs recorded by 'srt announce --smtp'."""
+    path = os.path.join(ctx.new_dir_mails, '.srt-sent.json')
+    if not os.path.isfile(path):
+        return []
+    with open(path, 'r') as f:
+        ids = json.load(f)['ids']
+    return [ids[k] for k in sorted(ids)]
+
+
+def print_status(index, series):
+    for msgid, rows in index.replies(series).items():
+        msg = index.find(msgid)
+        print(msg[3] if msg else msgid)
+        if not rows:
+            print('    no replies')
+        for _, _, sender, subject, acks, objection in rows:
+            acks = json.loads(acks)
+            for ack in acks:
+                print('    {0}'.format(ack))
+            if objection:
+                print('    Objection: {0}'.format(sender))
+            elif not acks:
+                print('    Comment: {0}'.format(sender))
+
+
+def review_status(config, ctx, archive):
+    index = ReviewIndex()
+    try:
+        count = index.update(archive)
+        print('{0} new messages indexed'.format(count), file=sys.stderr)
+        series = get_sent_series(ctx) or \
+            index.find_series(str(ctx.new_tag))
+        if not series:
+            print('No review series for {0} found'.format(ctx.new_tag))
+            sys.exit(1)
+        print_status(index, series)
+    finally:
+        index.close()
+
+
+def add_argparser(parser):
+    prs = parser.add_parser('review-status')
+    prs.add_argument('OLD_TAG', nargs='?')
+    prs.add_argument('NEW_TAG', nargs='?')
+    prs.add_argument('--archive', '-a', default=None, metavar='PATH',
+                     help='mbox file or public-inbox mirror '
+                          '(default: REVIEW_ARCHIVE)')
+    return prs
+
+
+def execute(args):
+    config = get_config()
+    archive = args.archive or config.get('REVIEW_ARCHIVE')
+    if not archive:
+        print('No archive given, set REVIEW_ARCHIVE or use --archive',
+              file=sys.stderr)
+        sys.exit(1)
+    review_status(config, SrtContext(args), archive)
@@ -24,34 +24,123 @@
 
 
 import re
+import sys
+from subprocess import CalledProcessError
 
-from stable_rt_tools.srt_util import (cmd, confirm, get_config, get_gnupghome)
+from stable_rt_tools.srt_util import (Speculation, cmd, confirm, get_config,
+                                      get_remote_branch_name,
+                                      is_quilt_workflow)
+from stable_rt_tools.srt_util_tag_batch import (TagBatch, TagBatchError,
+                                                rollback)
+
+release_re = re.compile(r'^.*Linux ([0-9\.]+[-a-z0-9]+)( REBASE)*')
+quilt_release_re = re.compile(r'^(v[0-9\.]+-rt[0-9]+)$')
+
+
+def apply_tags(batch):
+    for name, _, msg in batch.tags:
+        print('tagging as {0} with message \'{1}\''.format(name, msg))
+    if not batch:
+        return False
+    # Sign the tags while the operator reads. If gpg needs a passphrase
+    # the tags are signed interactively after the confirmation.
+    speculation = Speculation(batch.sign, False)
+    if not confirm('OK to tag?', speculation):
+        return False
+    try:
+        speculation.result()
+        batch.apply()
+    except CalledProcessError as e:
+        print('{0} failed with error code {1}'.format(e.cmd[0], e.returncode),
+              file=sys.stderr)
+        return False
+    except TagBatchError as e:
+        print('Creating tags failed, no tag created:\n{0}'.format(e),
+              file=sys.stderr)
+        return False
+    return True
+
+
+def find_release(ref):
+    """Return (tag, msg) for the release commit ref points to."""
+    lines = cmd(['git', 'log', '-1', '--pretty=%B', ref])
+    for msg in iter(lines.splitlines()):
+        m = release_re.match(msg)
+        if m:
+            return 'v' + m.group(1) + ('-rebase' if m.group(2) else ''), msg
+        m = quilt_release_re.match(msg)
+        if m:
+            return m.group(1), msg
+    return None, None
+
+
+def release_tags(config, rc):
+    """Collect the tags of a release on the -rt, -rebase and -patches
+    branches."""
+    base = get_remote_branch_name()
+    for postfix in ['-rebase', '-patches']:
+        if base.endswith(postfix):
+            base = base[:-len(postfix)]
+
+    batch = TagBatch(config)
+    tag, msg = find_release(base)
+    if not tag:
+        print('{0} does not point to a release commit'.format(base),
+              file=sys.stderr)
+        return batch
+    if rc:
+        batch.add(tag + '-rc{0}'.format(rc), base, msg)
+        return batch
+    batch.add(tag, base, msg)
+
+    rebase_tag, rebase_msg = find_release(base + '-rebase')
+    if rebase_tag != tag + '-rebase':
+        rebase_tag, rebase_msg = tag + '-rebase', tag + '-rebase'
+    batch.add(rebase_tag, base + '-rebase', rebase_msg)
+
+    if is_quilt_workflow(config):
+        batch.add(tag + '-patches', base + '-patches',
+                  'Patch queue for ' + tag)
+    return batch
 
 
 def tag(config, rc):
-    p = re.compile(r'^.*Linux ([0-9\.]+[-a-z0-9]+)( REBASE)*')
+    batch = TagBatch(config)
     lines = cmd(['git', 'log', '-1', '--pretty=%B'])
     for msg in iter(lines.splitlines()):
-        m = p.match(msg)
+        m = release_re.match(msg)
         if not m:
             continue
 
         tag = 'v' + m.group(1) + ('-rebase' if m.group(2) else '')
         if rc:
             tag = tag + '-rc{0}'.format(rc)
-        print('tagging as {0} with message \'{1}\''.format(tag, msg))
-        if confirm('OK to tag?'):
-            cmd(['git', 'tag', '-s', '-u', config['GPG_KEY_ID'],
-                 '-m', msg, tag],
-                env={'GNUPGHOME': get_gnupghome(config)})
+        batch.add(tag, 'HEAD', msg)
+    apply_tags(batch)
 
 
 def add_argparser(parser):
     prs = parser.add_parser('tag')
     prs.add_argument('--release-candidate', '-r',
                      default=None, metavar='N', type=int)
+    prs.add_argument('--all', '-a', action='store_true', default=False,
+                     help='Tag the release on all branches at once')
+    prs.add_argument('--rollback', action='store_true', default=False,
+                     help='Delete the tags created by the last run')
     return prs
 
 
 def execute(args):
-    tag(get_config(), args.release_candidate)
+    if args.rollback:
+        try:
+            for t in rollback():
+                print('Deleted tag {0}'.format(t))
+        except TagBatchError as e:
+            print('Rollback failed:\n{0}'.format(e), file=sys.stderr)
+        return
+
+    config = get_config()
+    if args.all:
+        apply_tags(release_tags(config, args.release_candidate))
+    else:
+        tag(config, args.release_candidate)
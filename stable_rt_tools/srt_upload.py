@@ -24,54 +24,421 @@
 
 
 import os
+import shlex
+import shutil
 import sys
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from logging import debug
 from pprint import pformat
 from subprocess import CalledProcessError
 
 from stable_rt_tools.srt_util import check_context, cmd, confirm, get_config
 from stable_rt_tools.srt_util_context import SrtContext
+from stable_rt_tools.srt_util_delta import (DeltaError, apply_delta_file,
+                                            create_delta_file)
 
 
-def upload(config, ctx):
-    for f in ctx.get_files():
-        if not os.path.isfile(f):
-            print('Unable to read {0}, did you remember to create?'.format(f))
-            sys.exit(1)
+def sign_name(filename):
+    return os.path.splitext(filename)[0] + '.sign'
+
+
+def delta_name(filename):
+    return os.path.splitext(filename)[0] + '.delta'
+
+
+def artifact_kind(filename):
+    """Return the kind of a release artifact, e.g. 'patch' for
+    patch-6.12.39-rt11.patch.xz."""
+    return os.path.basename(filename).split('-', 1)[0]
+
+
+def create_deltas(ctx):
+    """Create delta files against the previous release's artifacts.
 
+    Returns a dict mapping each new file to (delta file, old file) for
+    which the delta is smaller than the file itself.
+    """
+    old_files = {}
+    for old in sorted(ctx.get_old_files()):
+        old_files.setdefault(artifact_kind(old), old)
+
+    deltas = {}
+    for new in ctx.get_files():
+        old = old_files.get(artifact_kind(new))
+        if not old:
+            debug('No previous {0} artifact, skip delta'.format(
+                artifact_kind(new)))
+            continue
+        if not os.path.isfile(old):
+            debug('No previous artifact {0}, skip delta'.format(old))
+            continue
+        size = create_delta_file(old, new, delta_name(new))
+        print('{0}: {1} bytes delta instead of {2} bytes'.format(
+            os.path.basename(new), size, os.path.getsize(new)))
+        if size >= os.path.getsize(new):
+            os.unlink(delta_name(new))
+            continue
+        deltas[new] = (delta_name(new), old)
+    return deltas
+
+
+def upload_ops(config, ctx, deltas=None):
+    """Return the list of operations for a release upload.
+
+    The operations follow the kup command set: ('put', files, dir),
+    ('ln', target, link), ('rm', path) and ('ls', path). All remote
+    paths are absolute paths below PRJ_DIR.
+
+    Files listed in deltas are uploaded with ('patch', files, dir,
+    delta, base) instead, where base is the remote path of the
+    previous release's artifact. Backends without delta support
+    treat it like 'put'.
+    """
     path = config['PRJ_DIR']
     older_path = path + '/' + 'older'
+    deltas = deltas or {}
 
-    kup = ['kup']
+    ops = []
 
     # upload files to archive
-    for i, f in enumerate(ctx.get_files()):
+    for f in ctx.get_files():
         basename = os.path.splitext(f)[0]
-        kup.extend(['put', basename + '.xz', basename + '.sign',
-                    older_path + '/', '--'])
+        files = [basename + '.xz', basename + '.sign']
+        if f in deltas:
+            delta, old = deltas[f]
+            ops.append(('patch', files, older_path + '/', delta,
+                        older_path + '/' + os.path.basename(old)))
+        else:
+            ops.append(('put', files, older_path + '/'))
 
     # create links from archive to latest dir.
     for f in ctx.get_files():
-        kup.extend(['ln', older_path + '/' + os.path.basename(f), '../', '--'])
+        ops.append(('ln', older_path + '/' + os.path.basename(f), '../'))
 
     # remove previous release from latest dir
     for f in ctx.get_old_files():
-        kup.extend(['rm', path + '/' + os.path.basename(f), '--'])
+        ops.append(('rm', path + '/' + os.path.basename(f)))
+
+    ops.append(('ls', path))
+    return ops
+
+
+def link_location(target, link):
+    """Resolve a kup style link argument into (directory, name)."""
+    if link.endswith('/'):
+        linkdir = os.path.join(os.path.dirname(target), link)
+        return os.path.normpath(linkdir), os.path.basename(target)
+    link = os.path.normpath(os.path.join(os.path.dirname(target), link))
+    return os.path.dirname(link), os.path.basename(link)
 
-    kup.extend(['ls', path])
 
-    print(pformat(kup))
-    if confirm('OK to commit?'):
+class UploadBackend(ABC):
+    name = None
+    needs_location = False
+
+    def __init__(self, location=None):
+        if self.needs_location and not location:
+            raise ValueError('missing location, use {0}:/root'.format(
+                self.name))
+        self.location = location
+
+    def __str__(self):
+        if self.location:
+            return '{0}:{1}'.format(self.name, self.location)
+        return self.name
+
+    def describe(self, ops):
+        return ops
+
+    @abstractmethod
+    def run(self, ops):
+        """Execute ops and return the output."""
+
+
+class KupBackend(UploadBackend):
+    """Upload to kernel.org via the kup command line tool."""
+    name = 'kup'
+
+    def command(self, ops):
+        kup = ['kup']
+        for op in ops:
+            if op[0] in ('put', 'patch'):
+                kup.extend(['put'] + op[1] + [op[2], '--'])
+            elif op[0] == 'ln':
+                kup.extend(['ln', op[1], op[2], '--'])
+            elif op[0] == 'rm':
+                kup.extend(['rm', op[1], '--'])
+            elif op[0] == 'ls':
+                kup.extend(['ls', op[1]])
+        return kup
+
+    def describe(self, ops):
+        return self.command(ops)
+
+    def run(self, ops):
+        return cmd(self.command(ops))
+
+
+class RsyncBackend(UploadBackend):
+    """Upload to a mirror with rsync and maintain the links via ssh.
+
+    The location has the form [user@]host:/root. The PRJ_DIR layout
+    is reproduced below root. Delta uploads are applied on the mirror
+    with 'python3 -m stable_rt_tools.srt_util_delta'. If that fails,
+    e.g. the base file is missing or the helper isn't installed, the
+    file is uploaded in full.
+    """
+    name = 'rsync'
+    needs_location = True
+
+    def __init__(self, location):
+        super().__init__(location)
+        if ':' not in location:
+            raise ValueError('missing host, use rsync:[user@]host:/root')
+        self.host, self.root = location.split(':', 1)
+
+    def remote(self, path):
+        return os.path.join(self.root, path.lstrip('/'))
+
+    def commands(self, ops):
+        cmds = []
+        script = []
+        for op in ops:
+            if op[0] == 'put':
+                dest = self.remote(op[2])
+                cmds.append(['ssh', self.host,
+                             'mkdir -p {0}'.format(shlex.quote(dest))])
+                cmds.append(['rsync', '-a', '--'] + op[1] +
+                            ['{0}:{1}'.format(self.host, dest)])
+            elif op[0] == 'patch':
+                cmds.extend(self.patch_commands(*op[1:]))
+            elif op[0] == 'ln':
+                linkdir, name = link_location(op[1], op[2])
+                target = os.path.relpath(op[1], linkdir)
+                for t, n in [(target, name),
+                             (sign_name(target), sign_name(name))]:
+                    script.append('ln -sfn {0} {1}'.format(
+                        shlex.quote(t),
+                        shlex.quote(os.path.join(self.remote(linkdir), n))))
+            elif op[0] == 'rm':
+                script.append('rm -f {0} {1}'.format(
+                    shlex.quote(self.remote(op[1])),
+                    shlex.quote(self.remote(sign_name(op[1])))))
+            elif op[0] == 'ls':
+                script.append('ls -l {0}'.format(
+                    shlex.quote(self.remote(op[1]))))
+        if script:
+            cmds.append(['ssh', self.host, ' && '.join(script)])
+        return cmds
+
+    def patch_commands(self, files, dest, delta, base):
+        dest = self.remote(dest)
+        new = os.path.join(dest, os.path.basename(files[0]))
+        rdelta = os.path.join(dest, os.path.basename(delta))
+        helper = ['python3', '-m', 'stable_rt_tools.srt_util_delta',
+                  self.remote(base), rdelta, new]
+        return [['ssh', self.host, 'mkdir -p {0}'.format(shlex.quote(dest))],
+                ['rsync', '-a', '--', delta, files[1],
+                 '{0}:{1}'.format(self.host, dest)],
+                ['ssh', self.host, '{0}; rc=$?; rm -f {1}; exit $rc'.format(
+                    ' '.join(shlex.quote(a) for a in helper),
+                    shlex.quote(rdelta))]]
+
+    def describe(self, ops):
+        return self.commands(ops)
+
+    def patch(self, files, dest, delta, base):
         try:
-            cmd(kup)
-        except CalledProcessError as e:
-            print('kup failed with error code {0}'.format(e.returncode),
+            return [cmd(c)
+                    for c in self.patch_commands(files, dest, delta, base)]
+        except CalledProcessError:
+            print('{0}: delta of {1} failed, uploading it in full'.format(
+                self, os.path.basename(files[0])), file=sys.stderr)
+        return [cmd(c) for c in self.commands([('put', files, dest)])]
+
+    def run(self, ops):
+        out = []
+        for op in ops:
+            if op[0] == 'patch':
+                out.extend(self.patch(*op[1:]))
+            elif op[0] == 'put':
+                out.extend(cmd(c) for c in self.commands([op]))
+        # links, removals and the listing go in a single ssh call
+        rest = [op for op in ops if op[0] not in ('put', 'patch')]
+        out.extend(cmd(c) for c in self.commands(rest))
+        return '\n'.join(out)
+
+
+class LocalBackend(UploadBackend):
+    """Reproduce the kup semantics in a local directory.
+
+    Files and links are first written to a temporary name and then
+    renamed into place, so a reader never observes a partial upload.
+    """
+    name = 'local'
+    needs_location = True
+
+    def path(self, path):
+        return os.path.join(self.location, path.lstrip('/'))
+
+    def _replace(self, dirname, name, create):
+        fd, tmp = tempfile.mkstemp(dir=dirname, prefix='.' + name + '.')
+        os.close(fd)
+        os.unlink(tmp)
+        try:
+            create(tmp)
+            os.replace(tmp, os.path.join(dirname, name))
+        except Exception:
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def put(self, files, dest):
+        dest = self.path(dest)
+        os.makedirs(dest, exist_ok=True)
+        for f in files:
+            self._replace(dest, os.path.basename(f),
+                          lambda tmp: shutil.copyfile(f, tmp))
+
+    def patch(self, files, dest, delta, base):
+        base = self.path(base)
+        ldest = self.path(dest)
+        os.makedirs(ldest, exist_ok=True)
+        try:
+            self._replace(ldest, os.path.basename(files[0]),
+                          lambda tmp: apply_delta_file(base, delta, tmp))
+        except (OSError, DeltaError) as e:
+            print('{0}: delta of {1} failed ({2}), uploading it in full'
+                  .format(self, os.path.basename(files[0]), e),
                   file=sys.stderr)
+            self.put(files, dest)
+            return
+        self._replace(ldest, os.path.basename(files[1]),
+                      lambda tmp: shutil.copyfile(files[1], tmp))
+
+    def ln(self, target, link):
+        linkdir, name = link_location(target, link)
+        rel = os.path.relpath(target, linkdir)
+        linkdir = self.path(linkdir)
+        os.makedirs(linkdir, exist_ok=True)
+        for t, n in [(rel, name), (sign_name(rel), sign_name(name))]:
+            if not os.path.exists(os.path.join(linkdir, t)):
+                continue
+            self._replace(linkdir, n, lambda tmp: os.symlink(t, tmp))
+
+    def rm(self, path):
+        for p in [self.path(path), self.path(sign_name(path))]:
+            if os.path.lexists(p):
+                os.unlink(p)
+
+    def ls(self, path):
+        return '\n'.join(sorted(os.listdir(self.path(path))))
+
+    def run(self, ops):
+        out = ''
+        for op in ops:
+            debug('{0}: {1}'.format(self, op))
+            r = getattr(self, op[0])(*op[1:])
+            if r is not None:
+                out = r
+        return out
+
+
+backends = {
+    'kup': KupBackend,
+    'rsync': RsyncBackend,
+    'local': LocalBackend,
+}
+
+
+def get_backends(config):
+    """Return the upload backends configured in UPLOAD_TARGETS.
+
+    UPLOAD_TARGETS is a comma separated list of targets of the form
+    'kup', 'rsync:[user@]host:/root' or 'local:/root'. Without the key
+    the release is uploaded with kup only.
+    """
+    targets = config.get('UPLOAD_TARGETS', 'kup')
+    result = []
+    for t in targets.split(','):
+        t = t.strip()
+        if not t:
+            continue
+        name, _, location = t.partition(':')
+        if name not in backends:
+            print('Unknown upload target {0}'.format(t), file=sys.stderr)
+            sys.exit(1)
+        try:
+            result.append(backends[name](location or None))
+        except ValueError as e:
+            print('Invalid upload target {0}: {1}'.format(t, e),
+                  file=sys.stderr)
+            sys.exit(1)
+    return result
+
+
+def run_backend(backend, ops):
+    """Run ops on backend and return (ok, output)."""
+    try:
+        return True, backend.run(ops)
+    except CalledProcessError as e:
+        print('{0} failed with error code {1}'.format(backend, e.returncode),
+              file=sys.stderr)
+    except (OSError, DeltaError) as e:
+        print('{0} failed: {1}'.format(backend, e), file=sys.stderr)
+    return False, None
+
+
+def check_results(targets, results):
+    failed = []
+    for b, (ok, r) in zip(targets, results):
+        if not ok:
+            failed.append(str(b))
+        elif r:
+            debug('{0}: {1}'.format(b, r))
+    if failed:
+        print('Upload to {0} failed'.format(', '.join(failed)),
+              file=sys.stderr)
+        sys.exit(1)
+
+
+def upload(config, ctx, delta=False):
+    for f in ctx.get_files():
+        if not os.path.isfile(f):
+            print('Unable to read {0}, did you remember to create?'.format(f))
+            sys.exit(1)
+
+    deltas = create_deltas(ctx) if delta else {}
+    ops = upload_ops(config, ctx, deltas)
+    targets = get_backends(config)
+
+    for b in targets:
+        if len(targets) > 1:
+            print('{0}:'.format(b))
+        print(pformat(b.describe(ops)))
+
+    try:
+        if not confirm('OK to commit?'):
+            return
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            results = list(executor.map(lambda b: run_backend(b, ops),
+                                        targets))
+    finally:
+        for d, _ in deltas.values():
+            os.unlink(d)
+
+    check_results(targets, results)
 
 
 def add_argparser(parser):
     prs = parser.add_parser('upload')
     prs.add_argument('OLD_TAG', nargs='?')
     prs.add_argument('NEW_TAG', nargs='?')
+    prs.add_argument('--delta', action='store_true', default=False,
+                     help='Upload deltas against the previous release')
     return prs
 
 
@@ -79,4 +446,4 @@ def execute(args):
     ctx = SrtContext(args)
     check_context(ctx)
 
-    upload(get_config(), ctx)
+    upload(get_config(), ctx, args.delta)
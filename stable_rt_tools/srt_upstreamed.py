@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import json
+import os
+import re
+import sqlite3
+import sys
+from logging import debug
+from subprocess import PIPE, CalledProcessError, Popen, run
+
+from stable_rt_tools.srt_util import (cmd, get_cache_dir, get_config,
+                                      is_ancestor, print_table)
+from stable_rt_tools.srt_util_tag import Tag
+
+schema = '''
+CREATE TABLE IF NOT EXISTS patch_ids (patch_id TEXT, sha TEXT,
+    UNIQUE (patch_id, sha));
+CREATE TABLE IF NOT EXISTS subjects (subject TEXT, sha TEXT,
+    UNIQUE (subject, sha));
+CREATE TABLE IF NOT EXISTS state (source TEXT PRIMARY KEY, position TEXT);
+'''
+
+
+def get_index_path():
+    return os.path.join(get_cache_dir(), 'upstream-index.sqlite')
+
+
+def normalize_subject(subject):
+    """Return subject without [PATCH] prefixes, case and spacing."""
+    subject = re.sub(r'^(\s*\[[^\]]*\])+', '', subject)
+    return ' '.join(subject.split()).rstrip('.').lower()
+
+
+def get_patch_ids(git_dir, rng):
+    """Return [(patch id, commit)] of the non-merge commits in rng."""
+    args = ['git', '--git-dir', git_dir, 'log', '-p', '--no-merges',
+            '--no-color', '--no-ext-diff'] + rng
+    debug('run: ' + ' '.join(args) + ' | git patch-id --stable')
+    log = Popen(args, stdout=PIPE)
+    p = run(['git', 'patch-id', '--stable'], stdin=log.stdout, stdout=PIPE,
+            check=True)
+    log.stdout.close()
+    if log.wait():
+        raise CalledProcessError(log.returncode, args)
+    return [tuple(line.split()) for line in p.stdout.decode().splitlines()]
+
+
+def get_subjects(git_dir, rng):
+    """Return [(normalized subject, commit)] of the non-merge commits."""
+    out = cmd(['git', '--git-dir', git_dir, 'log', '--no-merges',
+               '--format=%H%x00%s'] + rng)
+    subjects = []
+    for line in out.splitlines():
+        sha, subject = line.split('\0', 1)
+        subjects.append((normalize_subject(subject), sha))
+    return subjects
+
+
+class UpstreamIndex:
+    """Index of mainline commits by stable patch id and by normalized
+    subject.
+
+    The index remembers the last indexed commit of each mainline tree,
+    updates only process the commits added since.
+    """
+
+    def __init__(self, path=None):
+        self.db = sqlite3.connect(path or get_index_path())
+        self.db.executescript(schema)
+
+    def close(self):
+        self.db.close()
+
+    def get_position(self, source):
+        row = self.db.execute('SELECT position FROM state WHERE source = ?',
+                              (source,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_position(self, source, position):
+        self.db.execute('INSERT OR REPLACE INTO state VALUES (?, ?)',
+                        (source, json.dumps(position)))
+        self.db.commit()
+
+    def update(self, tree, ref='HEAD', since=None):
+        """Index the commits of ref in the mainline tree which are not
+        reachable from since and return their number."""
+        git_dir = cmd(['git', '-C', tree, 'rev-parse', '--absolute-git-dir'])
+        head = cmd(['git', '--git-dir', git_dir, 'rev-parse',
+                    ref + '^{commit}'])
+        last = self.get_position(git_dir)
+        if last == head:
+            return 0
+        rng = [head] + (['^' + since] if since else [])
+        if last and is_ancestor(last, head, git_dir):
+            rng.append('^' + last)
+
+        patch_ids = get_patch_ids(git_dir, rng)
+        self.db.executemany('INSERT OR IGNORE INTO patch_ids VALUES (?, ?)',
+                            patch_ids)
+        self.db.executemany('INSERT OR IGNORE INTO subjects VALUES (?, ?)',
+                            get_subjects(git_dir, rng))
+        self.set_position(git_dir, head)
+        debug('indexed {0} commits of {1}'.format(len(patch_ids), git_dir))
+        return len(patch_ids)
+
+    def lookup(self, patch_id, subject):
+        """Return (status, mainline commit) of a patch."""
+        row = self.db.execute('SELECT sha FROM patch_ids WHERE patch_id = ?',
+                              (patch_id,)).fetchone()
+        if row:
+            return 'merged', row[0]
+        row = self.db.execute('SELECT sha FROM subjects WHERE subject = ?',
+                              (normalize_subject(subject),)).fetchone()
+        if row:
+            return 'likely merged', row[0]
+        return 'out of tree', None
+
+
+def classify(index, rng):
+    """Return [(commit, status, mainline commit, subject)] of the
+    commits in rng, oldest first."""
+    git_dir = cmd(['git', 'rev-parse', '--absolute-git-dir'])
+    patch_ids = {sha: pid for pid, sha in get_patch_ids(git_dir, [rng])}
+    out = cmd(['git', 'log', '--reverse', '--no-merges',
+               '--format=%H%x00%s', rng])
+    rows = []
+    for line in out.splitlines():
+        sha, subject = line.split('\0', 1)
+        # commits without changes have no patch id
+        status, upstream = index.lookup(patch_ids.get(sha), subject)
+        rows.append((sha, status, upstream, subject))
+    return rows
+
+
+def print_upstreamed(rows):
+    table = [('Commit', 'Status', 'Upstream', 'Subject')]
+    for sha, status, upstream, subject in rows:
+        table.append((sha[:12], status, (upstream or '-')[:12], subject))
+    print_table(table)
+    counts = {}
+    for row in rows:
+        counts[row[1]] = counts.get(row[1], 0) + 1
+    print('{0} merged, {1} likely merged, {2} out of tree'.format(
+        counts.get('merged', 0), counts.get('likely merged', 0),
+        counts.get('out of tree', 0)))
+
+
+def upstreamed(config, tree, rng):
+    index = UpstreamIndex()
+    try:
+        count = index.update(tree, config.get('MAINLINE_REF', 'HEAD'),
+                             config.get('MAINLINE_SINCE'))
+        print('{0} new mainline commits indexed'.format(count),
+              file=sys.stderr)
+        rows = classify(index, rng)
+    finally:
+        index.close()
+    print_upstreamed(rows)
+    return rows
+
+
+def add_argparser(parser):
+    prs = parser.add_parser('upstreamed')
+    prs.add_argument('RANGE', nargs='?',
+                     help='Commits of the queue (default: stable base of '
+                          'NEW_TAG..HEAD)')
+    prs.add_argument('--mainline', '-m', default=None, metavar='DIR',
+                     help='mainline clone (default: MAINLINE_TREE)')
+    return prs
+
+
+def execute(args):
+    config = get_config()
+    tree = args.mainline or config.get('MAINLINE_TREE')
+    if not tree:
+        print('No mainline tree given, set MAINLINE_TREE or use '
+              '--mainline', file=sys.stderr)
+        sys.exit(1)
+    rng = args.RANGE
+    if not rng:
+        if 'NEW_TAG' not in os.environ:
+            print('No RANGE given and NEW_TAG is not set', file=sys.stderr)
+            sys.exit(1)
+        rng = '{0}..HEAD'.format(Tag(os.environ['NEW_TAG']).base)
+    upstreamed(config, os.path.expanduser(tree), rng)
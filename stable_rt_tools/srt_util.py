@@ -22,9 +22,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE
 
+import fcntl
+import json
 import os
 import re
 import sys
+import tempfile
+import threading
+import time
 from configparser import ConfigParser
 
 from logging import debug, error
@@ -42,6 +47,23 @@ def cmd(args, verbose=False, env=None):
     return r
 
 
+def is_ancestor(old, new, git_dir=None):
+    args = ['git'] + (['--git-dir', git_dir] if git_dir else [])
+    try:
+        cmd(args + ['merge-base', '--is-ancestor', old, new])
+    except CalledProcessError:
+        return False
+    return True
+
+
+def print_table(table):
+    widths = [max(len(row[i]) for row in table)
+              for i in range(len(table[0]) - 1)]
+    for row in table:
+        print('  '.join(c.ljust(w) for c, w in zip(row, widths)) +
+              '  ' + row[-1])
+
+
 def get_remote_repo_name():
     line = cmd(['git', 'config', '--get', 'remote.origin.url'])
     name = os.path.splitext(os.path.basename(line))[0]
@@ -90,7 +112,45 @@ def get_last_rt_tag(branch_name, postfix=None):
     return m.group(1)
 
 
-def get_old_tag():
+def get_remote_tags_cache_path():
+    git_dir = cmd(['git', 'rev-parse', '--git-common-dir'])
+    return os.path.join(git_dir, 'srt-remote-tags.json')
+
+
+def ls_remote_tags(max_age=0, refresh=False):
+    """Return (time, output of 'git ls-remote --tags').
+
+    The listing is cached and reused while it is at most max_age
+    seconds old.
+    """
+    path = get_remote_tags_cache_path()
+    if not refresh and max_age > 0 and os.path.isfile(path):
+        with open(path, 'r') as f:
+            cache = json.load(f)
+        if time.time() - cache['time'] <= max_age:
+            return cache['time'], cache['tags']
+    now = time.time()
+    tags = cmd(['git', 'ls-remote', '--tags'])
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'time': now, 'tags': tags}, f)
+    os.replace(path + '.tmp', path)
+    return now, tags
+
+
+def invalidate_remote_tags():
+    """Drop the cached remote tag listing, e.g. after a push."""
+    try:
+        os.unlink(get_remote_tags_cache_path())
+    except (FileNotFoundError, CalledProcessError):
+        pass
+
+
+def get_old_tag(tags=None):
+    """Return the last tag of the series on the remote.
+
+    tags is the output of 'git ls-remote --tags', it is queried if
+    not given.
+    """
     last_tag = get_last_tag(get_remote_branch_name())
 
     import logging
@@ -108,7 +168,7 @@ def get_old_tag():
     minor = int(m.group(2))
     base_version = 'v{}.{}'.format(major, minor)
 
-    tags = cmd(['git', 'ls-remote', '--tags'])
+    tags = cmd(['git', 'ls-remote', '--tags']) if tags is None else tags
     # Look for all matching tags with optional -rcN and -patches
     match_re = r'.*({}\.\d+-rt\d+(-rc\d+)?(-patches)?)$'.format(base_version)
     matches = re.findall(match_re, tags, re.MULTILINE)
@@ -182,17 +242,79 @@ def get_config():
     return config
 
 
-def is_quilt_workflow(config):
-    """Return True if the quilt workflow is enabled in config, else False."""
+def get_config_bool(config, key, default=False):
+    """Return the boolean value of key in config."""
     if hasattr(config, 'getboolean'):
-        return config.getboolean('quilt_workflow', fallback=False)
+        return config.getboolean(key, fallback=default)
     # fallback for dict-like config
-    val = config.get('quilt_workflow', False)
+    val = config.get(key, default)
     if isinstance(val, bool):
         return val
     if isinstance(val, str):
         return val.lower() in ('1', 'yes', 'true', 'on')
-    return False
+    return default
+
+
+def get_config_size(config, key, default=0):
+    """Return the size in bytes of key in config.
+
+    The value may carry a K, M or G suffix.
+    """
+    val = str(config.get(key, '') or '').strip().upper()
+    if not val:
+        return default
+    factor = 1
+    if val[-1] in 'KMG':
+        factor = 1024 ** ('KMG'.index(val[-1]) + 1)
+        val = val[:-1]
+    return int(val) * factor
+
+
+def is_quilt_workflow(config):
+    """Return True if the quilt workflow is enabled in config, else False."""
+    return get_config_bool(config, 'quilt_workflow')
+
+
+def get_cache_dir():
+    """Return the per host cache directory of srt."""
+    base = os.environ.get('XDG_CACHE_HOME',
+                          os.path.expanduser('~/.cache'))
+    path = os.path.join(base, 'srt')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def read_json_cache(path):
+    """Return the dict stored in path, an unreadable cache is empty."""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def update_json_cache(path, entries):
+    """Merge entries into the dict stored in path.
+
+    Several srt processes may update the cache at the same time. The
+    merge runs under a lock and the file is replaced by a unique
+    temporary file, readers never see a partial cache.
+    """
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        cache = read_json_cache(path)
+        cache.update(entries)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path),
+                                   prefix=os.path.basename(path) + '.')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cache, f, indent=1, sort_keys=True)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    return cache
 
 
 def get_gnupghome(config):
@@ -219,16 +341,68 @@ def get_gpg_fingerprint(config):
     return fingerprint
 
 
-def confirm(text):
+class Speculation:
+    """Work started in the background while a confirm() prompt is up.
+
+    fn(*args) runs in a thread. If the operator declines, the result is
+    passed to discard once available. Speculative work must not change
+    anything visible, the caller commits its result after the
+    confirmation.
+    """
+
+    def __init__(self, fn, *args, discard=None):
+        self.value = None
+        self.error = None
+        self._discard = discard
+        self._cancelled = False
+        self._finished = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(fn, args),
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self, fn, args):
+        try:
+            value = fn(*args)
+        except Exception as e:
+            debug('speculation {0} failed: {1}'.format(fn.__name__, e))
+            self.error = e
+            return
+        with self._lock:
+            self.value = value
+            self._finished = True
+            if self._cancelled and self._discard:
+                self._discard(value)
+
+    def result(self):
+        """Wait for the work and return True if it succeeded."""
+        self._thread.join()
+        return self.error is None
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            if self._finished and self._discard:
+                self._discard(self.value)
+
+
+def confirm(text, speculation=None):
+    """Ask text and return True on yes.
+
+    A declined speculation is cancelled.
+    """
+    reply = False
     try:
         while True:
-            reply = str(input(text + ' (y/n): ')).lower().strip()
-            if reply[:1] == 'y':
-                return True
-            if reply[:1] == 'n':
-                return False
+            answer = str(input(text + ' (y/n): ')).lower().strip()
+            if answer[:1] in ('y', 'n'):
+                reply = answer[:1] == 'y'
+                break
     except KeyboardInterrupt:
-        return False
+        pass
+    if speculation and not reply:
+        speculation.cancel()
+    return reply
 
 
 def check_context(ctx):
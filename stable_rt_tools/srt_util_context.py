@@ -24,6 +24,7 @@
 
 
 import os
+from glob import glob
 from logging import debug
 
 from stable_rt_tools.srt_util import (get_last_tag, get_old_tag,
@@ -55,6 +56,8 @@ class SrtContext:
 
         self._add_tag('old', old_tag)
         self._add_tag('new', new_tag)
+        self.new_fln_incr = '{0}/incr-{1}-{2}.patch.xz'.format(
+            self.new_dir_patches, self.old_short_tag, self.new_short_tag)
         self._update_tags()
         debug(self._dump())
 
@@ -65,6 +68,7 @@ class SrtContext:
         dir_mails = '{0}/patches/{1}/mails'.format(self.path, tag)
         fln_patch = '{0}/patch-{1}.patch.xz'.format(dir_patches, tag[1:])
         fln_tar = '{0}/patches-{1}.tar.xz'.format(dir_patches, tag[1:])
+        fln_bundle = '{0}/bundle-{1}.bundle.xz'.format(dir_patches, tag[1:])
 
         setattr(self, prefix + '_tag', t)
         setattr(self, prefix + '_short_tag', tag[1:])
@@ -73,6 +77,7 @@ class SrtContext:
         setattr(self, prefix + '_dir_mails', dir_mails)
         setattr(self, prefix + '_fln_patch', fln_patch)
         setattr(self, prefix + '_fln_tar', fln_tar)
+        setattr(self, prefix + '_fln_bundle', fln_bundle)
 
     def _update_tags(self):
         self.is_rc = self.new_tag.is_rc
@@ -85,10 +90,21 @@ class SrtContext:
         return value
 
     def get_files(self):
-        return [self.new_fln_patch, self.new_fln_tar]
+        files = [self.new_fln_patch, self.new_fln_tar]
+        # the git bundle is optional, see 'srt create --bundle'
+        if os.path.isfile(self.new_fln_bundle):
+            files.append(self.new_fln_bundle)
+        # written by 'srt announce' if the diff is too large to inline
+        if os.path.isfile(self.new_fln_incr):
+            files.append(self.new_fln_incr)
+        return files
 
     def get_old_files(self):
-        return [self.old_fln_patch, self.old_fln_tar]
+        files = [self.old_fln_patch, self.old_fln_tar]
+        if os.path.isfile(self.old_fln_bundle):
+            files.append(self.old_fln_bundle)
+        files += glob(self.old_dir_patches + '/incr-*.patch.xz')
+        return files
 
     def _dump(self):
         out = '\n'
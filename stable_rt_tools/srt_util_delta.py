@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import hashlib
+import lzma
+import struct
+import sys
+import zlib
+
+# The artifacts are text (patches and tar archives of patches), so the
+# data is cut into content defined chunks at line boundaries. A chunk
+# ends after a line whose checksum matches the mask or when it grows
+# beyond CHUNK_MAX. Identical content therefore yields identical
+# chunks, regardless of its offset in the file.
+CHUNK_MASK = 0xf
+CHUNK_MAX = 64 * 1024
+
+MAGIC = b'SRTDELTA1\n'
+OP_COPY = b'C'
+OP_DATA = b'D'
+
+
+class DeltaError(Exception):
+    pass
+
+
+def chunks(data):
+    """Yield (offset, length) of the content defined chunks of data."""
+    start = 0
+    pos = 0
+    end = len(data)
+    while pos < end:
+        nl = data.find(b'\n', pos)
+        nl = end if nl == -1 else nl + 1
+        if (zlib.crc32(data[pos:nl]) & CHUNK_MASK) == 0 or \
+                nl - start >= CHUNK_MAX or nl == end:
+            yield start, nl - start
+            start = nl
+        pos = nl
+
+
+def make_delta(old, new):
+    """Return a delta which turns old into new."""
+    index = {}
+    for off, length in chunks(old):
+        index.setdefault(hashlib.sha1(old[off:off + length]).digest(),
+                         (off, length))
+
+    ops = []
+    for off, length in chunks(new):
+        block = new[off:off + length]
+        ref = index.get(hashlib.sha1(block).digest())
+        if ref and old[ref[0]:ref[0] + ref[1]] == block:
+            last = ops[-1] if ops else None
+            if last and last[0] == OP_COPY and \
+                    last[1] + last[2] == ref[0]:
+                ops[-1] = (OP_COPY, last[1], last[2] + ref[1])
+            else:
+                ops.append((OP_COPY, ref[0], ref[1]))
+        elif ops and ops[-1][0] == OP_DATA:
+            ops[-1] = (OP_DATA, ops[-1][1] + block)
+        else:
+            ops.append((OP_DATA, block))
+
+    out = [MAGIC,
+           hashlib.sha256(old).digest(),
+           hashlib.sha256(new).digest()]
+    for op in ops:
+        if op[0] == OP_COPY:
+            out.append(OP_COPY + struct.pack('>QQ', op[1], op[2]))
+        else:
+            out.append(OP_DATA + struct.pack('>Q', len(op[1])))
+            out.append(op[1])
+    return lzma.compress(b''.join(out))
+
+
+def apply_delta(old, delta):
+    """Apply delta to old and return the verified result."""
+    delta = lzma.decompress(delta)
+    if not delta.startswith(MAGIC):
+        raise DeltaError('Not a delta file')
+    pos = len(MAGIC)
+    old_sha, new_sha = delta[pos:pos + 32], delta[pos + 32:pos + 64]
+    pos += 64
+    if hashlib.sha256(old).digest() != old_sha:
+        raise DeltaError('Delta does not apply to this base file')
+
+    out = []
+    while pos < len(delta):
+        op = delta[pos:pos + 1]
+        if op == OP_COPY:
+            off, length = struct.unpack_from('>QQ', delta, pos + 1)
+            out.append(old[off:off + length])
+            pos += 17
+        elif op == OP_DATA:
+            length, = struct.unpack_from('>Q', delta, pos + 1)
+            out.append(delta[pos + 9:pos + 9 + length])
+            pos += 9 + length
+        else:
+            raise DeltaError('Corrupt delta file')
+
+    new = b''.join(out)
+    if hashlib.sha256(new).digest() != new_sha:
+        raise DeltaError('Hash mismatch after applying delta')
+    return new
+
+
+def read_xz(filename):
+    with lzma.open(filename) as f:
+        return f.read()
+
+
+def create_delta_file(old_fln, new_fln, delta_fln):
+    """Write the delta between the uncompressed content of two xz files.
+
+    Returns the size of the delta file.
+    """
+    delta = make_delta(read_xz(old_fln), read_xz(new_fln))
+    with open(delta_fln, 'wb') as f:
+        f.write(delta)
+    return len(delta)
+
+
+def apply_delta_file(old_fln, delta_fln, new_fln):
+    """Reconstruct an xz file from its predecessor and a delta file."""
+    with open(delta_fln, 'rb') as f:
+        delta = f.read()
+    new = apply_delta(read_xz(old_fln), delta)
+    with open(new_fln, 'wb') as f:
+        f.write(lzma.compress(new, preset=9))
+
+
+def main():
+    # Receiving side helper:
+    # python3 -m stable_rt_tools.srt_util_delta OLD.xz DELTA NEW.xz
+    if len(sys.argv) != 4:
+        print('usage: {0} OLD DELTA NEW'.format(sys.argv[0]),
+              file=sys.stderr)
+        sys.exit(2)
+    try:
+        apply_delta_file(*sys.argv[1:])
+    except DeltaError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
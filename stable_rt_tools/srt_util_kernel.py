@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import glob
+import os
+import re
+import shutil
+import tempfile
+from logging import debug
+
+from stable_rt_tools.srt_util import cmd
+
+version_vars = ['VERSION', 'PATCHLEVEL', 'SUBLEVEL', 'EXTRAVERSION']
+assign_re = re.compile(r'^({0})\s*([:+?]?=)(.*)$'.format(
+    '|'.join(version_vars)), re.MULTILINE)
+
+
+class UnsupportedMakefile(Exception):
+    pass
+
+
+def parse_makefile(text):
+    """Return {VERSION, PATCHLEVEL, SUBLEVEL, EXTRAVERSION} of the top
+    level kernel Makefile.
+
+    Raises UnsupportedMakefile if the values are not plain
+    assignments.
+    """
+    values = {}
+    for m in assign_re.finditer(text):
+        name, op, value = m.group(1), m.group(2), m.group(3).strip()
+        if name in values or op not in ('=', ':=') or '$' in value or \
+                '\\' in value:
+            raise UnsupportedMakefile('{0} {1} {2}'.format(name, op, value))
+        values[name] = value
+    if not values.get('VERSION'):
+        raise UnsupportedMakefile('no VERSION')
+    return values
+
+
+def kernelversion(values):
+    """Return KERNELVERSION as the Makefile defines it."""
+    version = values['VERSION']
+    if values.get('PATCHLEVEL'):
+        version += '.' + values['PATCHLEVEL']
+        if values.get('SUBLEVEL'):
+            version += '.' + values['SUBLEVEL']
+    return version + values.get('EXTRAVERSION', '')
+
+
+def read_localversion(srctree):
+    """Return the concatenated localversion* files like
+    scripts/setlocalversion does. Backup files (*~*) are ignored."""
+    res = ''
+    for fname in sorted(glob.glob(os.path.join(srctree, 'localversion*'))):
+        if '~' in os.path.basename(fname) or not os.path.isfile(fname):
+            continue
+        with open(fname, 'r') as f:
+            res += f.read().rstrip('\n')
+    return res
+
+
+def kernelrelease(srctree='.'):
+    """Return the kernel release without the SCM suffix.
+
+    Computed from the Makefile, the localversion* files and the
+    LOCALVERSION environment variable, as 'make kernelrelease' does
+    for a defconfig without CONFIG_LOCALVERSION.
+    """
+    with open(os.path.join(srctree, 'Makefile'), 'r') as f:
+        values = parse_makefile(f.read())
+    return (kernelversion(values) + read_localversion(srctree) +
+            os.environ.get('LOCALVERSION', ''))
+
+
+def make_kernelrelease():
+    tmp = tempfile.mkdtemp()
+    try:
+        cmd(['make', 'O=%s' % tmp, 'defconfig'])
+        line = cmd(['make', '-s', 'O=%s' % tmp, 'kernelrelease'])
+    finally:
+        shutil.rmtree(tmp)
+    # strip the SCM suffix ('+')
+    return line.strip()[:-1]
+
+
+def get_kernel_version():
+    try:
+        return kernelrelease()
+    except (OSError, UnsupportedMakefile) as e:
+        debug('falling back to make kernelrelease: {0}'.format(e))
+    return make_kernelrelease()
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import json
+import os
+import re
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from email.utils import (formataddr, formatdate, getaddresses, make_msgid,
+                         parseaddr)
+from logging import debug
+from subprocess import CalledProcessError
+
+from stable_rt_tools.srt_util import cmd, get_config_bool
+
+# headers set by the sender
+own_headers = ['from', 'to', 'cc', 'date', 'message-id', 'in-reply-to',
+               'references']
+cc_trailer_re = re.compile(rb'^(Signed-off-by|Cc): (.*)$', re.MULTILINE)
+
+
+class Mail:
+    """A mail from git format-patch, parsed once."""
+
+    def __init__(self, filename):
+        self.filename = os.path.basename(filename)
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if data.startswith(b'From '):
+            data = data.split(b'\n', 1)[1]
+        self.header, _, self.body = data.partition(b'\n\n')
+        self.headers = BytesHeaderParser().parsebytes(self.header + b'\n\n')
+        self.author = decode_header_value(self.headers.get('From', ''))
+        self.subject = self.headers.get('Subject', '')
+
+    def cc(self):
+        """Return the addresses git send-email would Cc by default."""
+        cc = [self.author] + self.headers.get_all('Cc', [])
+        cc += [m.group(2).decode('utf-8', 'replace')
+               for m in cc_trailer_re.finditer(self.body)]
+        return [a for a in getaddresses(cc) if a[1]]
+
+    def render(self, sender, to, cc, date, msgid, reply_to=None):
+        """Return the mail as sent, with CRLF line endings."""
+        header = []
+        skip = False
+        for line in self.header.split(b'\n'):
+            if line[:1] in (b' ', b'\t'):
+                if not skip:
+                    header.append(line)
+                continue
+            name = line.split(b':', 1)[0].decode('ascii', 'replace')
+            skip = name.lower() in own_headers
+            if not skip:
+                header.append(line)
+
+        new = ['From: ' + encode_addresses([sender]),
+               'To: ' + encode_addresses(to),
+               'Date: ' + date,
+               'Message-ID: ' + msgid]
+        if cc:
+            new.append('Cc: ' + encode_addresses(cc))
+        if reply_to:
+            new += ['In-Reply-To: ' + reply_to, 'References: ' + reply_to]
+
+        body = self.body
+        if parseaddr(self.author)[1] != parseaddr(sender)[1]:
+            body = b'From: ' + self.author.encode('utf-8') + b'\n\n' + body
+        data = b'\n'.join([h.encode('utf-8') for h in new] + header)
+        data = data + b'\n\n' + body
+        return re.sub(rb'\r?\n', b'\r\n', data)
+
+
+def decode_header_value(value):
+    """Return an RFC 2047 encoded header value as text."""
+    try:
+        return str(make_header(decode_header(str(value))))
+    except (LookupError, ValueError):
+        return str(value)
+
+
+def encode_addresses(addrs):
+    """Return addrs as an address list header value, non-ASCII names are
+    RFC 2047 encoded."""
+    return ', '.join(formataddr(a, charset='utf-8')
+                     for a in getaddresses(addrs) if a[1])
+
+
+def read_series(dirname):
+    """Parse the mails in dirname, cover letter first."""
+    return [Mail(os.path.join(dirname, f))
+            for f in sorted(os.listdir(dirname)) if f.endswith('.patch')]
+
+
+class Journal:
+    """Records the Message-IDs of a series and which mails went out.
+
+    The Message-IDs are assigned once, so a resumed send threads the
+    remaining mails to the already sent cover letter.
+    """
+
+    def __init__(self, dirname):
+        self.path = os.path.join(dirname, '.srt-sent.json')
+        self.ids = {}
+        self.sent = []
+        if os.path.isfile(self.path):
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.ids, self.sent = data['ids'], data['sent']
+
+    def msgid(self, mail, domain):
+        if mail.filename not in self.ids:
+            self.ids[mail.filename] = make_msgid(domain=domain)
+        return self.ids[mail.filename]
+
+    def is_sent(self, mail):
+        return mail.filename in self.sent
+
+    def mark_sent(self, mail):
+        self.sent.append(mail.filename)
+        self.write()
+
+    def write(self):
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump({'ids': self.ids, 'sent': self.sent}, f, indent=1)
+        os.replace(self.path + '.tmp', self.path)
+
+
+def get_smtp_config(config):
+    """Return the SMTP settings from srt.conf, falling back to git's
+    sendemail.* configuration."""
+    def git_config(key):
+        try:
+            return cmd(['git', 'config', '--get', 'sendemail.' + key])
+        except CalledProcessError:
+            return None
+
+    smtp = {}
+    for key, git_key, default in [
+            ('SMTP_SERVER', 'smtpServer', 'localhost'),
+            ('SMTP_PORT', 'smtpServerPort', None),
+            ('SMTP_USER', 'smtpUser', None),
+            ('SMTP_PASSWORD', 'smtpPass', None),
+            ('SMTP_ENCRYPTION', 'smtpEncryption', None)]:
+        smtp[key] = config.get(key) or git_config(git_key) or default
+    if smtp['SMTP_PORT']:
+        smtp['SMTP_PORT'] = int(smtp['SMTP_PORT'])
+    else:
+        smtp['SMTP_PORT'] = 465 if smtp['SMTP_ENCRYPTION'] == 'ssl' else 25
+    smtp['SMTP_PIPELINING'] = get_config_bool(config, 'SMTP_PIPELINING')
+    return smtp
+
+
+def prepare_series(config, mails, journal, suppress_cc=False):
+    """Return [(mail, envelope recipients, data)] for the series.
+
+    All patches are threaded as replies to the first mail, like git
+    send-email does by default.
+    """
+    sender = config['SENDER']
+    domain = parseaddr(sender)[1].split('@')[-1] or None
+    to = [t.strip() for t in config['MAIL_TO'].split(',') if t.strip()]
+    now = time.time() - len(mails)
+
+    series = []
+    first = None
+    for i, mail in enumerate(mails):
+        msgid = journal.msgid(mail, domain)
+        cc = []
+        if not suppress_cc:
+            seen = set()
+            for n, a in mail.cc():
+                if a not in seen:
+                    seen.add(a)
+                    cc.append(formataddr((n, a)))
+        rcpts = []
+        for _, a in getaddresses(to + cc):
+            if a and a not in rcpts:
+                rcpts.append(a)
+        data = mail.render(sender, to, cc, formatdate(now + i, True),
+                           msgid, first)
+        series.append((mail, rcpts, data))
+        first = first or msgid
+    journal.write()
+    return series
+
+
+def smtp_connect(smtp):
+    if smtp['SMTP_ENCRYPTION'] == 'ssl':
+        conn = smtplib.SMTP_SSL(smtp['SMTP_SERVER'], smtp['SMTP_PORT'])
+    else:
+        conn = smtplib.SMTP(smtp['SMTP_SERVER'], smtp['SMTP_PORT'])
+        if smtp['SMTP_ENCRYPTION'] == 'tls':
+            conn.starttls()
+    conn.ehlo_or_helo_if_needed()
+    if smtp['SMTP_USER']:
+        conn.login(smtp['SMTP_USER'], smtp['SMTP_PASSWORD'] or '')
+    return conn
+
+
+def smtp_check(smtp, conn):
+    """Return conn if the server still talks to us, else a new connection.
+
+    Servers drop idle connections, one opened before the operator
+    confirmed may have timed out since.
+    """
+    if conn:
+        try:
+            if conn.noop()[0] == 250:
+                return conn
+        except (smtplib.SMTPException, OSError) as e:
+            debug('SMTP connection check failed: {0}'.format(e))
+        conn.close()
+        debug('SMTP connection lost, reconnecting')
+    return smtp_connect(smtp)
+
+
+def send_pipelined(conn, sender, rcpts, data, options):
+    """Send MAIL, RCPT and DATA in one round trip (RFC 2920)."""
+    cmds = ['MAIL FROM:<{0}>{1}'.format(
+        sender, ''.join(' ' + o for o in options))]
+    cmds += ['RCPT TO:<{0}>'.format(r) for r in rcpts]
+    cmds += ['DATA']
+    conn.send(''.join(c + '\r\n' for c in cmds))
+    replies = [conn.getreply() for c in cmds]
+    accepted = replies[0][0] == 250 and \
+        any(code in (250, 251) for code, _ in replies[1:-1])
+    if not accepted or replies[-1][0] != 354:
+        if replies[-1][0] == 354:
+            # the server waits for the message, a RSET would become part
+            # of it
+            conn.close()
+        else:
+            conn.rset()
+        code, msg = next((r for r in replies if r[0] >= 400), replies[-1])
+        raise smtplib.SMTPResponseException(code, msg)
+    q = re.sub(rb'(?m)^\.', b'..', data)
+    if not q.endswith(b'\r\n'):
+        q += b'\r\n'
+    conn.send(q + b'.\r\n')
+    code, msg = conn.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, msg)
+
+
+def send_series(smtp, sender, series, journal, conn=None):
+    """Send the series over a single SMTP connection.
+
+    conn is an already established connection, if None a new one is
+    opened. Mails recorded as sent in the journal are skipped.
+    """
+    conn = smtp_check(smtp, conn)
+    try:
+        options = []
+        if conn.has_extn('8bitmime'):
+            options.append('BODY=8BITMIME')
+        pipelining = smtp['SMTP_PIPELINING'] and conn.has_extn('pipelining')
+        for mail, rcpts, data in series:
+            if journal.is_sent(mail):
+                debug('skip {0}, already sent'.format(mail.filename))
+                continue
+            print('Sending {0}'.format(mail.subject))
+            if pipelining:
+                send_pipelined(conn, sender, rcpts, data, options)
+            else:
+                conn.sendmail(sender, rcpts, data, mail_options=options)
+            journal.mark_sent(mail)
+    finally:
+        try:
+            conn.quit()
+        except smtplib.SMTPServerDisconnected:
+            pass
+
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def data(self, envelope):
+        # like a lax server, DATA is accepted without valid recipients
+        self.reply('354 End data with <CR><LF>.<CR><LF>')
+        data = []
+        for line in iter(self.rfile.readline, b'.\r\n'):
+            if not line:
+                return
+            data.append(line[1:] if line.startswith(b'..') else line)
+        if envelope and envelope[1]:
+            self.server.messages.append(envelope + (b''.join(data),))
+            self.reply('250 OK')
+        else:
+            self.reply('554 No valid recipients')
+
+    def handle(self):
+        self.reply('220 srt smtp sink')
+        envelope = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.strip().split(b' ', 1)[0].upper()
+            if verb == b'EHLO':
+                self.reply('250-srt smtp sink')
+                self.reply('250-8BITMIME')
+                self.reply('250 PIPELINING')
+            elif verb in (b'HELO', b'NOOP', b'RSET'):
+                envelope = None
+                self.reply('250 OK')
+            elif verb == b'MAIL':
+                envelope = (line[10:].split()[0].decode(), [])
+                self.reply('250 OK')
+            elif verb == b'RCPT':
+                rcpt = line[8:].split()[0].decode()
+                if rcpt in self.server.reject:
+                    self.reply('550 No such user')
+                    continue
+                envelope[1].append(rcpt)
+                self.reply('250 OK')
+            elif verb == b'DATA':
+                self.data(envelope)
+            elif verb == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """A local SMTP server which records all mails it receives.
+
+    Meant for tests and for rehearsing 'srt announce --smtp' with
+    SMTP_SERVER = localhost and SMTP_PORT pointing at the sink.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port=0):
+        super().__init__(('localhost', port), SmtpSinkHandler)
+        self.messages = []
+        self.connections = 0
+        # recipients refused with 550
+        self.reject = set()
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    # Debug server: python3 -m stable_rt_tools.srt_util_mail [PORT]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8025
+    sink = SmtpSink(port)
+    print('SMTP sink listening on localhost:{0}'.format(sink.port))
+    sink.start()
+    seen = 0
+    try:
+        while True:
+            time.sleep(0.5)
+            for sender, rcpts, data in sink.messages[seen:]:
+                print('=' * 72)
+                print('MAIL FROM: {0}\nRCPT TO: {1}\n'.format(
+                    sender, ', '.join(rcpts)))
+                print(data.decode('utf-8', 'replace'))
+            seen = len(sink.messages)
+    except KeyboardInterrupt:
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import os
+from logging import debug
+from subprocess import DEVNULL, PIPE, run
+
+from stable_rt_tools.srt_util import cmd, get_gnupghome
+
+
+class TagBatchError(Exception):
+    pass
+
+
+def update_refs(lines):
+    """Run lines as one 'git update-ref --stdin' transaction."""
+    debug('update-ref: ' + ' | '.join(lines))
+    p = run(['git', 'update-ref', '--stdin'],
+            input='\n'.join(lines + ['']).encode(), stdout=PIPE,
+            stderr=PIPE)
+    if p.returncode:
+        raise TagBatchError(p.stderr.decode('utf-8').strip())
+
+
+def journal_path():
+    gitdir = cmd(['git', 'rev-parse', '--git-common-dir'])
+    return os.path.join(gitdir, 'srt-tag-batch')
+
+
+class TagBatch:
+    """Create several signed tags as one all-or-nothing operation.
+
+    The tag objects are built and signed first, without touching any
+    ref. All signatures are created through the same gpg-agent, so the
+    passphrase is asked for at most once. The refs are then created in
+    a single 'git update-ref --stdin' transaction: either all tags
+    exist afterwards or none of them. The applied batch is recorded in
+    the git directory and can be rolled back with rollback().
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.tags = []
+        self.objects = {}
+
+    def add(self, name, target, msg):
+        self.tags.append((name, target, msg))
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __str__(self):
+        return '\n'.join("{0} -> {1} '{2}'".format(n, t, m)
+                         for n, t, m in self.tags)
+
+    def _gpg(self, interactive):
+        gpg = ['gpg2',
+               '--homedir', os.path.expanduser(get_gnupghome(self.config)),
+               '--local-user', self.config['GPG_KEY_ID'],
+               '--armor', '--detach-sign']
+        if not interactive:
+            gpg += ['--batch', '--pinentry-mode', 'error']
+        return gpg
+
+    def _payload(self, name, target, msg, tagger):
+        sha = cmd(['git', 'rev-parse', '--verify', target + '^{commit}'])
+        return ('object {0}\ntype commit\ntag {1}\ntagger {2}\n\n{3}\n'
+                .format(sha, name, tagger, msg.rstrip('\n')))
+
+    def sign(self, interactive=True):
+        """Create the signed tag objects. No ref is changed.
+
+        If not interactive, gpg fails instead of asking for a
+        passphrase.
+        """
+        tagger = cmd(['git', 'var', 'GIT_COMMITTER_IDENT'])
+        for name, target, msg in self.tags:
+            payload = self._payload(name, target, msg, tagger).encode()
+            debug('sign tag {0}'.format(name))
+            p = run(self._gpg(interactive), input=payload, stdout=PIPE,
+                    stderr=None if interactive else DEVNULL, check=True)
+            p = run(['git', 'mktag'], input=payload + p.stdout,
+                    stdout=PIPE, check=True)
+            self.objects[name] = p.stdout.decode('utf-8').strip()
+
+    def apply(self):
+        """Create all tag refs in one transaction."""
+        if len(self.objects) != len(self.tags):
+            self.sign()
+        update_refs(['create refs/tags/{0} {1}'.format(
+            n, self.objects[n]) for n, _, _ in self.tags])
+        with open(journal_path(), 'w') as f:
+            for n, _, _ in self.tags:
+                f.write('{0} {1}\n'.format(n, self.objects[n]))
+
+
+def rollback():
+    """Delete the tags created by the last applied batch.
+
+    A tag is only deleted if it still points to the object created by
+    the batch. Returns the names of the deleted tags.
+    """
+    path = journal_path()
+    if not os.path.isfile(path):
+        return []
+    with open(path, 'r') as f:
+        tags = [line.split() for line in f if line.strip()]
+    update_refs(['delete refs/tags/{0} {1}'.format(n, sha)
+                 for n, sha in tags])
+    os.unlink(path)
+    return [n for n, _ in tags]
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import hashlib
+import json
+import os
+import re
+from logging import debug
+from subprocess import CalledProcessError
+
+from stable_rt_tools.srt_util import cmd, get_cache_dir
+
+version_re = re.compile(r'^v(\d+)\.(\d+)(?:\.(\d+))?$')
+
+
+def get_git_dir(tree_dir):
+    git_dir = cmd(['git', '-C', tree_dir, 'rev-parse', '--git-common-dir'])
+    return os.path.abspath(os.path.join(tree_dir, git_dir))
+
+
+def get_tag_index_path(git_dir):
+    key = hashlib.sha1(git_dir.encode()).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), 'tag-index-{0}.json'.format(key))
+
+
+def stat_key(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+def read_packed_refs(git_dir):
+    """Return {tag: commit} of the packed tags.
+
+    Returns None if packed-refs is not fully peeled.
+    """
+    path = os.path.join(git_dir, 'packed-refs')
+    tags = {}
+    if not os.path.isfile(path):
+        return tags
+    peeled = False
+    last = None
+    with open(path, 'r') as f:
+        for line in f:
+            if line.startswith('#'):
+                peeled = peeled or 'fully-peeled' in line.split()
+            elif line.startswith('^'):
+                if last:
+                    tags[last] = line[1:].strip()
+            else:
+                sha, ref = line.split()
+                last = ref[len('refs/tags/'):] \
+                    if ref.startswith('refs/tags/') else None
+                if last:
+                    tags[last] = sha
+    return tags if peeled else None
+
+
+def scan_loose_tags(git_dir):
+    """Return {tag: mtime} of the loose tag refs."""
+    base = os.path.join(git_dir, 'refs', 'tags')
+    tags = {}
+    for root, _, files in os.walk(base):
+        for f in files:
+            path = os.path.join(root, f)
+            name = os.path.relpath(path, base).replace(os.sep, '/')
+            tags[name] = os.stat(path).st_mtime_ns
+    return tags
+
+
+def peel_tags(tree_dir, names):
+    """Return {tag: commit} for the tags in names."""
+    out = cmd(['git', '-C', tree_dir, 'for-each-ref',
+               '--format=%(refname) %(objectname) %(*objectname)'] +
+              ['refs/tags/' + n for n in names])
+    tags = {}
+    for line in out.splitlines():
+        ref, sha, peeled = (line.split() + [''])[:3]
+        tags[ref[len('refs/tags/'):]] = peeled or sha
+    return tags
+
+
+def newest_per_series(tags):
+    """Return {'X.Y': [tag, commit]} of the newest release per series."""
+    series = {}
+    for name, commit in tags.items():
+        m = version_re.match(name)
+        if not m:
+            continue
+        key = '{0}.{1}'.format(m.group(1), m.group(2))
+        sub = int(m.group(3) or 0)
+        if key not in series or sub > series[key][2]:
+            series[key] = [name, commit, sub]
+    return {k: v[:2] for k, v in series.items()}
+
+
+def read_tag_index(path):
+    if not os.path.isfile(path):
+        return {'packed_stat': None, 'packed': {}, 'loose_stat': {},
+                'loose': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_tag_index(path, index):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(index, f)
+    os.replace(path + '.tmp', path)
+
+
+def update_tag_index(tree_dir):
+    """Update and return the tag index of the repository in tree_dir.
+
+    Only a changed packed-refs file is parsed again and only new or
+    changed loose tags are resolved. Returns None for repositories the
+    index can't follow (reftable, packed-refs without peeled tags).
+    """
+    git_dir = get_git_dir(tree_dir)
+    if os.path.isdir(os.path.join(git_dir, 'reftable')):
+        return None
+    path = get_tag_index_path(git_dir)
+    index = read_tag_index(path)
+    changed = False
+
+    packed_stat = stat_key(os.path.join(git_dir, 'packed-refs'))
+    if index['packed_stat'] != packed_stat:
+        packed = read_packed_refs(git_dir)
+        if packed is None:
+            return None
+        index['packed'], index['packed_stat'] = packed, packed_stat
+        changed = True
+
+    loose_stat = scan_loose_tags(git_dir)
+    modified = [n for n, m in loose_stat.items()
+                if index['loose_stat'].get(n) != m]
+    if modified or len(loose_stat) != len(index['loose_stat']):
+        loose = {n: c for n, c in index['loose'].items() if n in loose_stat}
+        if modified:
+            loose.update(peel_tags(tree_dir, modified))
+        index['loose'], index['loose_stat'] = loose, loose_stat
+        changed = True
+
+    if changed:
+        debug('tag index of {0} updated'.format(git_dir))
+        index['series'] = newest_per_series(dict(index['packed'],
+                                                 **index['loose']))
+        write_tag_index(path, index)
+    return index
+
+
+def find_newest_tag(tree_dir, series):
+    """Return the newest release tag of series ('X.Y') which is merged
+    into HEAD of tree_dir, or None if the index can't tell."""
+    try:
+        index = update_tag_index(tree_dir)
+        if not index or series not in index.get('series', {}):
+            return None
+        tag, commit = index['series'][series]
+        head = cmd(['git', '-C', tree_dir, 'rev-parse', 'HEAD'])
+        if commit != head:
+            cmd(['git', '-C', tree_dir, 'merge-base', '--is-ancestor',
+                 commit, head])
+    except (CalledProcessError, OSError, ValueError, KeyError) as e:
+        debug('tag index lookup failed: {0}'.format(e))
+        return None
+    return tag
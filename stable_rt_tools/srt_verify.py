@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import os
+import re
+import sys
+from logging import debug
+from subprocess import PIPE, run
+
+from stable_rt_tools.srt_util import (cmd, get_cache_dir, get_config,
+                                      get_gnupghome, get_last_tag,
+                                      get_remote_branch_name,
+                                      read_json_cache, update_json_cache)
+from stable_rt_tools.srt_util_tag import Tag
+
+
+def get_stable_tree_dir():
+    """Return the stable tree next to the current -rt tree."""
+    current_dir = os.path.basename(os.getcwd())
+    return os.path.abspath(os.path.join('..', current_dir.split('-rt')[0]))
+
+
+def get_verify_cache_path():
+    return os.path.join(get_cache_dir(), 'verified-tags.json')
+
+
+def read_verify_cache():
+    """Return {tag object sha: tag name} of the verified tags."""
+    return read_json_cache(get_verify_cache_path())
+
+
+def write_verify_cache(cache):
+    update_json_cache(get_verify_cache_path(), cache)
+
+
+def get_tag_objects(tree_dir, tags):
+    """Return {tag: tag object sha} for the annotated tags."""
+    out = cmd(['git', '-C', tree_dir, 'for-each-ref',
+               '--format=%(objecttype) %(objectname) %(refname:short)'] +
+              ['refs/tags/' + t for t in tags])
+    objects = {}
+    for line in out.splitlines():
+        objtype, sha, name = line.split(' ', 2)
+        if objtype == 'tag':
+            objects[name] = sha
+    return objects
+
+
+def verify_tags(config, tree_dir, tags):
+    """Verify the signatures of tags and return {tag: verdict}.
+
+    Tag objects are immutable, so a good signature is cached by the
+    object sha and never checked again on this host. Bad or missing
+    signatures are not cached, they might become good once the
+    signing key is imported. All tags not found in the cache are
+    checked with a single 'git verify-tag' call.
+    """
+    objects = get_tag_objects(tree_dir, tags)
+    cache = read_verify_cache()
+    verdicts = {t: objects.get(t) in cache for t in tags}
+
+    todo = [t for t in tags if t in objects and not verdicts[t]]
+    if not todo:
+        return verdicts
+
+    env = os.environ.copy()
+    env['GNUPGHOME'] = os.path.expanduser(get_gnupghome(config))
+    args = ['git', '-C', tree_dir, 'verify-tag',
+            '--format=%(objectname) %(refname)'] + todo
+    debug('run: ' + ' '.join(args))
+    p = run(args, stdout=PIPE, stderr=PIPE, env=env)
+    for line in p.stdout.decode('utf-8').splitlines():
+        sha, name = line.split(' ', 1)
+        if objects.get(name) == sha:
+            verdicts[name] = True
+            cache[sha] = name
+    write_verify_cache(cache)
+    return verdicts
+
+
+def get_candidate_tags(tree_dir, base):
+    """Return the stable tags of the series of base which are newer."""
+    tags = cmd(['git', '-C', tree_dir, 'tag', '-l',
+                'v{0}.{1}.*'.format(base.major, base.minor)]).splitlines()
+    candidates = []
+    for t in tags:
+        m = re.match(r'^v[0-9]+\.[0-9]+\.([0-9]+)$', t)
+        if m and int(m.group(1)) > base.patch:
+            candidates.append(t)
+    return candidates
+
+
+def verify_upstream(config, tags=None, tree_dir=None):
+    tree_dir = tree_dir or get_stable_tree_dir()
+    if not tags:
+        base = Tag(get_last_tag(get_remote_branch_name()))
+        tags = get_candidate_tags(tree_dir, base)
+
+    verdicts = verify_tags(config, tree_dir, tags)
+    for t in tags:
+        print('{0}: {1}'.format(t, 'good' if verdicts[t] else 'BAD'))
+    return all(verdicts.values())
+
+
+def add_argparser(parser):
+    prs = parser.add_parser('verify-upstream')
+    prs.add_argument('TAG', nargs='*',
+                     help='Stable tags to verify (default: all newer '
+                     'stable tags)')
+    prs.add_argument('--tree', default=None,
+                     help='Stable tree (default: ../<dir without -rt>)')
+    return prs
+
+
+def execute(args):
+    if not verify_upstream(get_config(), args.TAG, args.tree):
+        sys.exit(1)
@@ -34,6 +34,7 @@ import unittest
 from logging import debug
 from pprint import pformat
 from shutil import rmtree
+from unittest.mock import patch
 
 from stable_rt_tools.srt_announce import announce
 from stable_rt_tools.srt_commit import commit
@@ -254,6 +255,14 @@ class TestSrtBase(unittest.TestCase):
 
 
 class TestRelease(TestSrtBase):
+    def step0_commit_abort(self):
+        head = cmd(['git', 'rev-parse', 'HEAD'])
+        stub_stdin(self, 'n')
+        stub_stdouts(self)
+        commit(self.config, rc=False)
+        self.assertEqual(cmd(['git', 'rev-parse', 'HEAD']), head)
+        self.assertEqual(cmd(['git', 'status', '--short']), '')
+
     def step1_commit(self):
         stub_stdin(self, 'y')
         stub_stdouts(self)
@@ -701,6 +710,32 @@ class TestNoTagsManyMergesCanditate(TestSrtBase):
 
         # XXX check if missing intermedeate tags are pushed as well
 
+    def step12_bundle(self):
+        create(self.config, self.ctx, bundle=True)
+
+        path = self.work_tree + '/patches/v4.4.15-rt5/'
+        bundle = path + 'bundle-4.4.15-rt5.bundle.xz'
+        self.assertEqual(self.ctx.get_files()[-1], bundle)
+
+        cmd(['xz', '-dk', bundle])
+        heads = cmd(['git', 'bundle', 'list-heads', bundle[:-3]])
+        self.assertIn('refs/tags/v4.4.15-rt5', heads)
+        self.assertIn('refs/tags/v4.4.15-rt5-rebase', heads)
+        cmd(['git', 'bundle', 'verify', bundle[:-3]])
+
+    def step13_lint_gate(self):
+        config = dict(self.config, CREATE_LINT='yes', LINT_CHECKERS='from')
+        with patch.dict(os.environ, {'XDG_CACHE_HOME': self.tdir + '/cache'}):
+            stub_stdouts(self)
+            create(config, self.ctx)
+            self.assertIn('0 with problems', sys.stdout.getvalue())
+
+            config['LINT_CHECKERS'] = 'from, upstream'
+            self.assertRaises(SystemExit, create, config, self.ctx)
+        self.assertIn('upstream: missing upstream status',
+                      sys.stdout.getvalue())
+        self.assertIn('Lint failed', sys.stderr.getvalue())
+
 
 class TestReleaseCanditateNewProcess(TestSrtBase):
     def setUp(self):
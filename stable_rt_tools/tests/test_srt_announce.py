@@ -22,10 +22,24 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE
 
+import io
+import lzma
+import os
+import sys
+import tempfile
 import unittest
+from shutil import rmtree
 from unittest.mock import patch
-from stable_rt_tools.srt_announce import announce
+from stable_rt_tools.srt_announce import (announce, announce_all,
+                                          create_rc_patches,
+                                          find_starting_ref, print_diff,
+                                          print_stripped,
+                                          resolve_starting_ref, start_queries,
+                                          stop_queries, stream_query,
+                                          write_incr_diff)
+from stable_rt_tools.srt_util import cmd
 from argparse import Namespace
+from configparser import ConfigParser
 
 
 class DummyCtx:
@@ -63,5 +77,297 @@ class TestAnnounceQuiltWorkflow(unittest.TestCase):
                 mock_print.assert_any_call('Hello RT-list!\n...enjoy!')
 
 
+class DummyRcCtx:
+    def __init__(self, tdir):
+        self.is_rc = True
+        self.new_tag = 'v6.12.39-rt11-rc1'
+        self.old_tag = 'v6.12.39-rt10'
+        self.old_short_tag = '6.12.39-rt10'
+        self.new_dir_mails = tdir + '/mails'
+
+
+class TestCreateRcPatches(unittest.TestCase):
+    object_format = 'sha1'
+
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.repo = self.tdir + '/repo'
+        cmd(['git', 'init', '--initial-branch=v6.12-rt-next',
+             '--object-format=' + self.object_format, self.repo])
+        os.chdir(self.repo)
+        cmd(['git', 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', 'config', 'user.email', 'me@incredible.com'])
+        cmd(['git', 'commit', '--allow-empty', '-m', 'Linux 6.12.38'])
+        cmd(['git', 'branch', 'stable'])
+        cmd(['git', 'commit', '--allow-empty', '-m', 'Linux 6.12.38-rt10'])
+        cmd(['git', 'checkout', 'stable'])
+        cmd(['git', 'commit', '--allow-empty', '-m', 'Linux 6.12.39'])
+        cmd(['git', 'checkout', 'v6.12-rt-next'])
+        cmd(['git', 'merge', '--no-ff', '-m', 'Merge v6.12.39', 'stable'])
+        cmd(['git', 'tag', '-a', '-m', 'v6.12.39-rt10', 'v6.12.39-rt10'])
+        for n in range(1, 3):
+            with open('file{}.txt'.format(n), 'w') as f:
+                f.write('file{}\n'.format(n))
+            cmd(['git', 'add', 'file{}.txt'.format(n)])
+            cmd(['git', 'commit', '-m', 'Add file{}\n\nSome text'.format(n)])
+
+    def tearDown(self):
+        os.chdir(os.path.dirname(self.tdir))
+        rmtree(self.tdir)
+
+    def test_create_rc_patches(self):
+        refs = cmd(['git', 'show-ref', '--head'])
+        objects = cmd(['git', 'count-objects', '-v'])
+        mtimes = [os.stat(f).st_mtime_ns
+                  for f in ['file1.txt', 'file2.txt']]
+
+        ctx = DummyRcCtx(self.tdir)
+        create_rc_patches({}, ctx)
+
+        self.assertEqual(sorted(os.listdir(ctx.new_dir_mails)),
+                         ['0000-cover-letter.patch',
+                          '0001-Add-file1.patch',
+                          '0002-Add-file2.patch'])
+        with open(ctx.new_dir_mails + '/0002-Add-file2.patch') as f:
+            mail = f.read()
+        self.assertIn('Subject: [PATCH RT 2/2] Add file2\n\n'
+                      'v6.12.39-rt11-rc1 stable review patch.\n'
+                      'If anyone has any objections, please let me know.\n'
+                      '\n-----------\n\n\nSome text\n', mail)
+
+        # neither refs nor the object store have been touched
+        self.assertEqual(cmd(['git', 'show-ref', '--head']), refs)
+        self.assertEqual(cmd(['git', 'count-objects', '-v']), objects)
+        self.assertEqual(cmd(['git', 'status', '--short']), '')
+        self.assertEqual([os.stat(f).st_mtime_ns
+                          for f in ['file1.txt', 'file2.txt']],
+                         mtimes)
+
+    def test_write_incr_diff(self):
+        ctx = DummyRcCtx(self.tdir)
+        ctx.new_tag = 'HEAD'
+        ctx.new_fln_incr = self.tdir + '/incr.patch.xz'
+        resolve_starting_ref.cache_clear()
+        diff = cmd(['git', 'diff', 'HEAD~2..HEAD'])
+
+        self.assertTrue(write_incr_diff({'ANNOUNCE_DIFF_LIMIT': '10'}, ctx))
+        with lzma.open(ctx.new_fln_incr, 'rt') as f:
+            self.assertEqual(f.read().strip(), diff)
+
+        self.assertFalse(write_incr_diff({'ANNOUNCE_DIFF_LIMIT': '1M'}, ctx))
+        self.assertFalse(os.path.exists(ctx.new_fln_incr))
+
+    def test_find_starting_ref(self):
+        merge = cmd(['git', 'rev-parse', 'HEAD~2'])
+        ctx = DummyRcCtx(self.tdir)
+        resolve_starting_ref.cache_clear()
+        self.assertEqual(find_starting_ref(ctx), merge)
+        self.assertEqual(find_starting_ref(ctx), merge)
+        self.assertEqual(resolve_starting_ref.cache_info().hits, 1)
+
+        # patches on top of the old tag start at the old tag
+        cmd(['git', 'tag', 'v6.12.39-rt11', 'HEAD~1'])
+        ctx.old_tag = 'v6.12.39-rt11'
+        self.assertEqual(find_starting_ref(ctx), 'v6.12.39-rt11')
+
+        # a tag which is not part of the branch is ignored
+        cmd(['git', 'tag', 'v6.12.39', 'stable'])
+        ctx.old_tag = 'v6.12.39'
+        self.assertEqual(find_starting_ref(ctx), merge)
+
+
+class TestCreateRcPatchesSha256(TestCreateRcPatches):
+    object_format = 'sha256'
+
+
+class TestAnnounceQueries(unittest.TestCase):
+    def test_print_stripped(self):
+        for chunks in [['  \n a ', ' b\n\n', '\n'], ['', '\n', 'x'],
+                       ['\n\n'], []]:
+            with patch('sys.stdout', new_callable=io.StringIO) as out:
+                print_stripped(chunks)
+            self.assertEqual(out.getvalue(), ''.join(chunks).strip() + '\n')
+
+    def test_queries_in_order(self):
+        script = 'import sys, time; time.sleep({0}); print("{1}" * {2})'
+        queries = start_queries([
+            [sys.executable, '-c', script.format(0.2, 'a', 10)],
+            [sys.executable, '-c', script.format(0, 'b', 100000)]])
+        out = [''.join(stream_query(*q)) for q in queries]
+        self.assertEqual(out, ['a' * 10 + '\n', 'b' * 100000 + '\n'])
+
+    def test_stop_queries(self):
+        queries = start_queries([[sys.executable, '-c',
+                                  'import time; time.sleep(30)']])
+        stop_queries(queries)
+        proc, f, _ = queries[0]
+        self.assertIsNotNone(proc.returncode)
+        self.assertTrue(f.closed)
+
+    def test_announce_error_stops_queries(self):
+        started = []
+
+        def start(cmds):
+            started.extend(start_queries(
+                [[sys.executable, '-c', 'import time; time.sleep(30)']] *
+                len(cmds)))
+            return started
+
+        ctx = DummyCtx('v6.12.39-rt11')
+        with patch('stable_rt_tools.srt_announce.start_queries', start), \
+                patch('stable_rt_tools.srt_announce.find_starting_ref',
+                      return_value='v6.12.38-rt10'), \
+                patch('stable_rt_tools.srt_announce.read_template',
+                      return_value=''), \
+                patch('stable_rt_tools.srt_announce.cover_letter_replacements',
+                      side_effect=KeyError('GPG_KEY_ID')):
+            self.assertRaises(KeyError, announce, {}, ctx, None,
+                              ('v6.12-rt', 'HEAD'))
+        self.assertEqual(len(started), 3)
+        for proc, f, _ in started:
+            self.assertIsNotNone(proc.returncode)
+            self.assertTrue(f.closed)
+
+
+class TestAnnounceDiffLimit(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.ctx = DummyRcCtx(self.tdir)
+        self.ctx.new_fln_incr = self.tdir + '/incr-6.12.39-rt10-rt11.patch.xz'
+        self.diff = ['diff --git a/f b/f\n', '+' * 3000 + '\n', '-x\n']
+
+    def tearDown(self):
+        rmtree(self.tdir)
+
+    def run_diff(self, limit, **kwargs):
+        config = {'PRJ_DIR': '/pub/linux/kernel/projects/rt/6.12',
+                  'ANNOUNCE_DIFF_LIMIT': limit, **kwargs}
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            with patch('sys.stderr', new_callable=io.StringIO) as err:
+                print_diff(config, self.ctx, iter(self.diff))
+        self.err = err.getvalue()
+        return out.getvalue()
+
+    def test_inline(self):
+        for limit in ['', '4k']:
+            self.assertEqual(self.run_diff(limit), ''.join(self.diff))
+        self.assertFalse(os.path.exists(self.ctx.new_fln_incr))
+
+    def test_externalized(self):
+        out = self.run_diff('1k')
+        self.assertNotIn('+++', out)
+        self.assertIn('https://www.kernel.org/pub/linux/kernel/projects/rt/'
+                      '6.12/older/incr-6.12.39-rt10-rt11.patch.xz', out)
+        with lzma.open(self.ctx.new_fln_incr, 'rt') as f:
+            self.assertEqual(f.read(), ''.join(self.diff))
+        self.assertIn('sign and upload it as well', self.err)
+
+    def test_prj_url(self):
+        out = self.run_diff('1k', PRJ_URL='https://mirror.example.org')
+        self.assertIn('https://mirror.example.org/pub/linux/kernel/projects/'
+                      'rt/6.12/older/incr-6.12.39-rt10-rt11.patch.xz', out)
+
+    def test_created_by_create(self):
+        with lzma.open(self.ctx.new_fln_incr, 'wt') as f:
+            f.write('written by srt create')
+        out = self.run_diff('1k')
+        self.assertIn('/older/incr-6.12.39-rt10-rt11.patch.xz', out)
+        self.assertEqual(self.err, '')
+        with lzma.open(self.ctx.new_fln_incr, 'rt') as f:
+            self.assertEqual(f.read(), 'written by srt create')
+
+    def test_inline_removes_stale(self):
+        self.run_diff('1k')
+        self.assertTrue(os.path.exists(self.ctx.new_fln_incr))
+        self.assertEqual(self.run_diff('4k'), ''.join(self.diff))
+        self.assertFalse(os.path.exists(self.ctx.new_fln_incr))
+
+
+class TestAnnounceAll(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.repo = self.tdir + '/repo'
+        cmd(['git', 'init', '--initial-branch=v6.12-rt', self.repo])
+        os.chdir(self.repo)
+        cmd(['git', 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', 'config', 'user.email', 'me@incredible.com'])
+        cmd(['git', 'config', 'remote.origin.url',
+             'https://example.org/linux-stable-rt.git'])
+        self.commit('Linux 6.12.38', 'v6.12.38')
+        cmd(['git', 'branch', 'linux-6.12.y'])
+        self.commit('Linux 6.12.38-rt10', 'v6.12.38-rt10')
+        cmd(['git', 'branch', 'v6.6-rt'])
+        cmd(['git', 'branch', 'v6.1-rt'])
+        # the merged stable tag is closer to the release than the
+        # previous -rt tag
+        cmd(['git', 'checkout', '-q', 'linux-6.12.y'])
+        for n in range(3):
+            self.commit('stable fix {0}'.format(n), None)
+        self.commit('Linux 6.12.39', 'v6.12.39')
+        cmd(['git', 'checkout', '-q', 'v6.12-rt'])
+        cmd(['git', 'merge', '-q', '--no-ff', '-X', 'ours',
+             '-m', 'Merge v6.12.39', 'linux-6.12.y'])
+        self.commit('Linux 6.12.39-rt11', 'v6.12.39-rt11')
+        cmd(['git', 'checkout', '-q', '--orphan', 'v5.10-rt'])
+        self.commit('Linux 5.10.240', None)
+        cmd(['git', 'checkout', '-q', 'v6.6-rt'])
+        self.commit('Linux 6.6.99-rt58', 'v6.6.99-rt58')
+        cmd(['git', 'checkout', '-q', 'v6.1-rt'])
+        self.commit('Linux 6.1.140-rt51-rc1', 'v6.1.140-rt51-rc1')
+        # the main checkout must not be touched
+        cmd(['git', 'checkout', '-q', 'v6.12-rt'])
+
+        self.config = ConfigParser()
+        self.config['DEFAULT'] = {
+            'MAIL_TO': 'rt-users@example.org', 'SENDER': 'Me <me@e.org>',
+            'NAME': 'Me', 'PRJ_DIR': '/pub/rt', 'GPG_KEY_ID': '1234'}
+        for b in ['v6.12-rt', 'v6.6-rt', 'v6.1-rt', 'v5.10-rt', 'v5.4-rt']:
+            self.config['linux-stable-rt/origin/' + b] = {}
+        self.config['other/origin/v6.12-rt'] = {}
+
+    def tearDown(self):
+        os.chdir(os.path.dirname(self.tdir))
+        rmtree(self.tdir)
+
+    def commit(self, msg, tag):
+        with open('version', 'w') as f:
+            f.write(msg + '\n')
+        cmd(['git', 'add', 'version'])
+        cmd(['git', 'commit', '-m', msg])
+        if tag:
+            cmd(['git', 'tag', '-a', '-m', tag, tag])
+
+    def test_announce_all(self):
+        outdir = self.tdir + '/out'
+        status = cmd(['git', 'status', '--short', '--branch'])
+        with patch('stable_rt_tools.srt_announce.get_gpg_fingerprint',
+                   return_value='AAAA BBBB') as gpg:
+            with patch('sys.stdout', new_callable=io.StringIO) as out:
+                rows = announce_all(self.config, outdir)
+        self.assertEqual(gpg.call_count, 1)
+        self.assertEqual(cmd(['git', 'status', '--short', '--branch']),
+                         status)
+
+        self.assertEqual(sorted(rows), [
+            ('v5.10-rt', '-', '-', 'skipped, no release tag'),
+            ('v6.1-rt', 'v6.12.38-rt10', 'v6.1.140-rt51-rc1',
+             'skipped, release candidate'),
+            ('v6.12-rt', 'v6.12.38-rt10', 'v6.12.39-rt11',
+             outdir + '/announce-6.12.39-rt11.txt'),
+            ('v6.6-rt', 'v6.12.38-rt10', 'v6.6.99-rt58',
+             outdir + '/announce-6.6.99-rt58.txt')])
+        with open(outdir + '/summary.txt') as f:
+            self.assertEqual(f.read(), out.getvalue())
+        self.assertEqual(out.getvalue().splitlines()[0].split(),
+                         ['branch', 'old', 'new', 'announcement'])
+
+        with open(outdir + '/announce-6.6.99-rt58.txt') as f:
+            text = f.read()
+        self.assertIn('Subject: [ANNOUNCE] 6.6.99-rt58\n', text)
+        self.assertIn('  branch: v6.6-rt\n', text)
+        self.assertIn('AAAA BBBB', text)
+        self.assertIn('+Linux 6.6.99-rt58\n', text)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import difflib
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from shutil import rmtree
+
+from stable_rt_tools.srt_check import check_series, read_series
+from stable_rt_tools.srt_util import cmd
+
+BASE = ['L{0}\n'.format(i) for i in range(1, 21)]
+
+
+def make_patch(fname, old, new):
+    with open(fname, 'w') as f:
+        f.writelines(difflib.unified_diff(old, new, 'a/file.c', 'b/file.c'))
+
+
+def replace(lines, **kwargs):
+    lines = list(lines)
+    for k, v in kwargs.items():
+        lines[int(k[1:]) - 1] = v + '\n'
+    return lines
+
+
+class TestCheckSeries(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.repo = self.tdir + '/linux-rt'
+        cmd(['git', 'init', self.repo])
+        cmd(['git', '-C', self.repo, 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', '-C', self.repo, 'config', 'user.email',
+             'me@incredible.com'])
+        with open(self.repo + '/file.c', 'w') as f:
+            f.writelines(BASE)
+        cmd(['git', '-C', self.repo, 'add', 'file.c'])
+        cmd(['git', '-C', self.repo, 'commit', '-m', 'v6.12.1'])
+        cmd(['git', '-C', self.repo, 'tag', 'v6.12.1'])
+
+        self.patches = self.tdir + '/patches'
+        os.mkdir(self.patches)
+        clean = replace(BASE, l3='clean')
+        make_patch(self.patches + '/clean.patch', BASE, clean)
+        # made against a tree where line 8 differs, needs fuzz 1
+        fuzzy = replace(clean, l8='X8')
+        make_patch(self.patches + '/fuzz.patch', fuzzy,
+                   replace(fuzzy, l11='fuzz'))
+        make_patch(self.patches + '/broken.patch', replace(BASE, l15='X15'),
+                   replace(BASE, l15='broken'))
+        make_patch(self.patches + '/unreached.patch', BASE,
+                   replace(BASE, l19='unreached'))
+        with open(self.patches + '/series', 'w') as f:
+            f.write('# rt series\n'
+                    'clean.patch\n'
+                    'fuzz.patch -p1\n'
+                    '\n'
+                    'broken.patch # needs refresh\n'
+                    'unreached.patch\n')
+        os.chdir(self.repo)
+
+    def tearDown(self):
+        os.chdir(os.path.dirname(self.tdir))
+        rmtree(self.tdir)
+
+    def check(self, tag='v6.12.1'):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            ret = check_series(self.patches, tag)
+        return ret, out.getvalue()
+
+    def test_read_series(self):
+        self.assertEqual(read_series(self.patches),
+                         [('clean.patch', 1), ('fuzz.patch', 1),
+                          ('broken.patch', 1), ('unreached.patch', 1)])
+
+    def test_stops_at_failure(self):
+        ret, out = self.check()
+        self.assertIsNone(ret)
+        self.assertNotIn('clean.patch', out)
+        self.assertIn('fuzz.patch applies with fuzz 1', out)
+        self.assertIn('broken.patch does not apply', out)
+        self.assertIn('error: patch failed: file.c:', out)
+        self.assertNotIn('unreached.patch', out)
+        self.assertIn('2 of 4 patches applied to v6.12.1', out)
+
+    def test_applies(self):
+        with open(self.patches + '/series', 'w') as f:
+            f.write('clean.patch\nfuzz.patch\nunreached.patch\n')
+        ret, out = self.check()
+        self.assertEqual(ret, 3)
+        self.assertIn('All 3 patches apply to v6.12.1', out)
+
+    def test_repository_untouched(self):
+        def state():
+            with open('.git/index', 'rb') as f:
+                index = f.read()
+            return (index, cmd(['git', 'status', '--porcelain']),
+                    cmd(['git', 'count-objects', '-v']))
+
+        before = state()
+        self.check()
+        self.assertEqual(before, state())
+        with open('file.c') as f:
+            self.assertEqual(f.readlines(), BASE)
+
+
+if __name__ == '__main__':
+    unittest.main()
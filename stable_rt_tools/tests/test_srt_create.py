@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import argparse
+import filecmp
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+from unittest.mock import patch
+
+from stable_rt_tools import srt_create
+from stable_rt_tools.srt_create import (create_series, get_linear_commits,
+                                        has_series_config)
+from stable_rt_tools.srt_util import cmd
+
+SUBJECTS = [
+    'sched: Add lazy preemption',
+    'printk: Make the console flushing of the legacy consoles happen in '
+    'a dedicated kthread on PREEMPT_RT',
+    'locking/rtmutex: Füge Unterstützung hinzu',
+]
+
+
+class TestCreateSeries(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.repo = self.tdir + '/linux'
+        cmd(['git', 'init', self.repo])
+        os.chdir(self.repo)
+        cmd(['git', 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', 'config', 'user.email', 'me@incredible.com'])
+        self.commit('base', 'v6.12.1')
+        cmd(['git', 'tag', 'v6.12.1'])
+        for i in range(11):
+            self.commit('{0} {1}'.format(SUBJECTS[i % 3], i), str(i))
+        cmd(['git', 'tag', 'v6.12.1-rt1-rebase'])
+
+    def tearDown(self):
+        os.chdir(os.path.dirname(self.tdir))
+        rmtree(self.tdir)
+
+    def commit(self, subject, text):
+        with open('file', 'a') as f:
+            f.write(text + '\n')
+        cmd(['git', 'add', 'file'])
+        cmd(['git', 'commit', '-m', subject, '-m', 'Body of ' + subject])
+
+    def assert_same_series(self, jobs):
+        seq = self.tdir + '/seq'
+        par = self.tdir + '/par'
+        for d in [seq, par]:
+            os.makedirs(d)
+        create_series('v6.12.1', 'v6.12.1-rt1-rebase', seq, jobs=1)
+        create_series('v6.12.1', 'v6.12.1-rt1-rebase', par, jobs=jobs)
+        files = sorted(os.listdir(seq))
+        self.assertEqual(files, sorted(os.listdir(par)))
+        match, mismatch, errors = filecmp.cmpfiles(seq, par, files,
+                                                   shallow=False)
+        self.assertEqual((mismatch, errors), ([], []))
+        return seq, files
+
+    def test_parallel(self):
+        seq, files = self.assert_same_series(jobs=4)
+        self.assertEqual(len(files), 12)
+        with open(os.path.join(seq, files[0]), 'r') as f:
+            self.assertIn('Subject: [PATCH 01/11] sched: Add lazy',
+                          f.read())
+
+    def test_merge_falls_back(self):
+        cmd(['git', 'checkout', '-q', '-b', 'side', 'HEAD~2'])
+        self.commit('side', 'side')
+        cmd(['git', 'checkout', '-q', '-'])
+        cmd(['git', 'merge', '-q', '--no-edit', '-s', 'ours', 'side'])
+        cmd(['git', 'tag', '-f', 'v6.12.1-rt1-rebase'])
+        self.assertIsNone(get_linear_commits('v6.12.1',
+                                             'v6.12.1-rt1-rebase'))
+        self.assert_same_series(jobs=4)
+
+    def test_series_config(self):
+        self.assertFalse(has_series_config())
+        cmd(['git', 'config', 'format.signOff', 'true'])
+        self.assertFalse(has_series_config())
+        cmd(['git', 'config', 'format.coverLetter', 'auto'])
+        self.assertTrue(has_series_config())
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser()
+    srt_create.add_argparser(parser.add_subparsers())
+    return parser.parse_args(argv)
+
+
+class TestCreateArgs(unittest.TestCase):
+    def test_jobs(self):
+        self.assertIsNone(parse_args(['create']).jobs)
+        self.assertEqual(parse_args(['create', '-j', '4']).jobs, 4)
+
+    @patch('stable_rt_tools.srt_create.create')
+    @patch('stable_rt_tools.srt_create.get_config', return_value={})
+    @patch('stable_rt_tools.srt_create.check_context')
+    @patch('stable_rt_tools.srt_create.SrtContext')
+    def test_execute(self, ctx, check_context, get_config, create):
+        srt_create.execute(parse_args(['create', '--jobs', '2', '--lint']))
+        create.assert_called_once_with({}, ctx.return_value, False, 2, True)
+
+    def test_lint(self):
+        self.assertFalse(parse_args(['create']).lint)
+        self.assertTrue(parse_args(['create', '--lint']).lint)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from shutil import rmtree
+
+from stable_rt_tools.srt_import import import_patches
+from stable_rt_tools.srt_util import cmd
+
+
+def write(fname, text):
+    with open(fname, 'w') as f:
+        f.write(text)
+
+
+class TestImportPatches(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.repo = self.tdir + '/v6.12-rt'
+        cmd(['git', 'init', '--initial-branch=v6.12-rt', self.repo])
+        cmd(['git', '-C', self.repo, 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', '-C', self.repo, 'config', 'user.email',
+             'me@incredible.com'])
+        write(self.repo + '/localversion-rt', '-rt1\n')
+        cmd(['git', '-C', self.repo, 'add', 'localversion-rt'])
+        cmd(['git', '-C', self.repo, 'commit', '-m', 'v6.12.1-rt1'])
+
+        self.wt = self.tdir + '/v6.12-rt-patches'
+        cmd(['git', '-C', self.repo, 'worktree', 'add', '-b',
+             'v6.12-rt-patches', self.wt])
+        self.patches = self.wt + '/patches'
+        os.mkdir(self.patches)
+        write(self.patches + '/series', 'a.patch\nb.patch\n')
+        write(self.patches + '/a.patch', 'a\n')
+        write(self.patches + '/b.patch', 'b\n')
+        cmd(['git', '-C', self.wt, 'add', 'patches'])
+        cmd(['git', '-C', self.wt, 'commit', '-m', 'v6.12.1-rt1-patches'])
+        os.chdir(self.repo)
+
+    def tearDown(self):
+        os.chdir(os.path.dirname(self.tdir))
+        rmtree(self.tdir)
+
+    def run_import(self, branch='v6.12-rt-patches'):
+        with redirect_stdout(io.StringIO()):
+            return import_patches(self.patches, branch, 'v6.12.2-rt2')
+
+    def test_import(self):
+        old = cmd(['git', 'rev-parse', 'v6.12-rt-patches'])
+        write(self.patches + '/series', 'a.patch\nc.patch\n')
+        write(self.patches + '/a.patch', 'a2\n')
+        write(self.patches + '/c.patch', 'c\n')
+        os.remove(self.patches + '/b.patch')
+
+        new = self.run_import()
+        self.assertEqual(new, cmd(['git', 'rev-parse', 'v6.12-rt-patches']))
+        self.assertEqual(cmd(['git', 'rev-parse', new + '^']), old)
+        self.assertEqual(cmd(['git', 'log', '-1', '--format=%s', new]),
+                         'v6.12.2-rt2')
+        self.assertEqual(
+            cmd(['git', 'diff-tree', '--name-status', '-r', old, new]),
+            'M\tpatches/a.patch\nD\tpatches/b.patch\n'
+            'A\tpatches/c.patch\nM\tpatches/series')
+        self.assertEqual(cmd(['git', 'show', new + ':patches/c.patch']), 'c')
+
+        # the current branch and the patches worktree are in sync
+        self.assertEqual(cmd(['git', 'log', '-1', '--format=%s']),
+                         'v6.12.1-rt1')
+        self.assertEqual(cmd(['git', '-C', self.wt, 'status',
+                              '--porcelain']), '')
+
+    def test_unchanged(self):
+        old = cmd(['git', 'rev-parse', 'v6.12-rt-patches'])
+        self.assertIsNone(self.run_import())
+        self.assertEqual(cmd(['git', 'rev-parse', 'v6.12-rt-patches']), old)
+
+    def test_new_branch(self):
+        new = self.run_import('v6.12-rt-next-patches')
+        self.assertEqual(cmd(['git', 'rev-list', '--count', new]), '1')
+        self.assertEqual(cmd(['git', 'ls-tree', '-r', '--name-only', new]),
+                         'patches/a.patch\npatches/b.patch\npatches/series')
+
+
+if __name__ == '__main__':
+    unittest.main()
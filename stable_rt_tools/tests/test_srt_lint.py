@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from shutil import rmtree
+from unittest.mock import patch
+
+from stable_rt_tools.srt_lint import get_checkers, lint_series
+
+PATCH = """From 1234 Mon Sep 17 00:00:00 2001
+From: Mighty Eagle <me@incredible.com>
+Date: Mon, 19 Oct 2026 10:00:00 +0200
+Subject: [PATCH] {subject}
+
+{body}
+---
+ file | 1 +
+ 1 file changed, 1 insertion(+)
+
+diff --git a/file b/file
+--- a/file
++++ b/file
+@@ -1 +1,2 @@
+ a
++{line}
+"""
+
+
+def write_patch(fname, subject='sched: Fix', body=None, line='b'):
+    if body is None:
+        body = ('Link: https://lore.kernel.org/r/1\n'
+                'Signed-off-by: Mighty Eagle <me@incredible.com>')
+    with open(fname, 'w') as f:
+        f.write(PATCH.format(subject=subject, body=body, line=line))
+
+
+class TestLintSeries(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        env = patch.dict(os.environ, {'XDG_CACHE_HOME': self.tdir + '/cache'})
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.patches = self.tdir + '/patches'
+        os.mkdir(self.patches)
+        write_patch(self.patches + '/good.patch')
+        write_patch(self.patches + '/nosob.patch', body='Link: x')
+        write_patch(self.patches + '/todo.patch', line='XXX')
+        with open(self.patches + '/series', 'w') as f:
+            f.write('good.patch\nnosob.patch\ntodo.patch\n')
+
+        self.log = self.tdir + '/calls'
+        self.config = {
+            'LINT_CHECKERS': 'from, signoff, upstream, todo',
+            'LINT_TODO': "sh -c 'echo >> {0}; ! grep -n XXX \"$0\"'".format(
+                self.log),
+        }
+
+    def tearDown(self):
+        rmtree(self.tdir)
+
+    def lint(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            failed = lint_series(self.config, self.patches, jobs=2)
+        return failed, out.getvalue()
+
+    def calls(self):
+        with open(self.log) as f:
+            return len(f.readlines())
+
+    def test_get_checkers(self):
+        self.assertEqual(get_checkers({}), [('from', ''), ('signoff', '')])
+        self.assertEqual(get_checkers(self.config)[2:],
+                         [('upstream', 'Link,Upstream-Status'),
+                          ('todo', self.config['LINT_TODO'])])
+        with patch('sys.stderr', new_callable=io.StringIO) as err:
+            with self.assertRaises(SystemExit) as e:
+                get_checkers({'LINT_CHECKERS': 'checkpatch'})
+        self.assertEqual(e.exception.code, 1)
+        self.assertIn('set LINT_CHECKPATCH', err.getvalue())
+
+    def test_lint(self):
+        failed, out = self.lint()
+        self.assertEqual(failed, 2)
+        self.assertNotIn('good.patch', out)
+        self.assertIn('nosob.patch:\n    signoff: missing Signed-off-by:\n',
+                      out)
+        self.assertIn('todo.patch:\n    todo: 17:+XXX\n', out)
+        self.assertIn('3 patches, 3 checked, 2 with problems', out)
+        self.assertEqual(self.calls(), 3)
+
+    def test_cache(self):
+        self.lint()
+        failed, out = self.lint()
+        self.assertEqual(failed, 2)
+        self.assertIn('todo: 17:+XXX', out)
+        self.assertIn('3 patches, 0 checked, 2 with problems', out)
+        self.assertEqual(self.calls(), 3)
+
+        write_patch(self.patches + '/todo.patch', line='c')
+        failed, out = self.lint()
+        self.assertEqual(failed, 1)
+        self.assertIn('3 patches, 1 checked, 1 with problems', out)
+        self.assertEqual(self.calls(), 4)
+
+        # a changed checker invalidates its results only
+        self.config['LINT_UPSTREAM_TAGS'] = 'Upstream-Status'
+        failed, out = self.lint()
+        self.assertEqual(failed, 3)
+        self.assertIn('upstream: missing upstream status (Upstream-Status)',
+                      out)
+        self.assertEqual(self.calls(), 4)
+
+        # so does a new version of the checkers
+        with patch('stable_rt_tools.srt_lint.CHECKER_VERSION', 2):
+            failed, out = self.lint()
+        self.assertIn('3 patches, 3 checked, 3 with problems', out)
+
+    def test_missing_checker(self):
+        self.config = {'LINT_CHECKERS': 'from, nope',
+                       'LINT_NOPE': self.tdir + '/no-such-checker'}
+        failed, out = self.lint()
+        self.assertEqual(failed, 3)
+        self.assertIn('nope: failed to run:', out)
+        # not cached, a fixed installation is picked up
+        failed, out = self.lint()
+        self.assertIn('3 patches, 3 checked, 3 with problems', out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import io
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+from unittest.mock import patch
+
+from stable_rt_tools import srt_prep
+from stable_rt_tools.srt_prep import prep, prep_workspace
+from stable_rt_tools.srt_util import cmd
+
+
+def git_init(path, branch):
+    cmd(['git', 'init', '--initial-branch=' + branch, path])
+    cmd(['git', '-C', path, 'config', 'user.name', 'Mighty Eagle'])
+    cmd(['git', '-C', path, 'config', 'user.email', 'me@incredible.com'])
+
+
+def release(path, tag):
+    cmd(['git', '-C', path, 'commit', '--allow-empty', '-m', tag])
+    cmd(['git', '-C', path, 'tag', '-a', '-m', tag, tag])
+
+
+def make_trees(tdir, stable, rt, series, stable_tags, rt_tag):
+    """Create the stable and -rt trees and the -rt remote in tdir."""
+    git_init(os.path.join(tdir, stable), 'linux-{0}.y'.format(series))
+    for t in stable_tags:
+        release(os.path.join(tdir, stable), t)
+
+    remote = os.path.join(tdir, rt + '.git')
+    cmd(['git', 'init', '--bare', remote])
+    path = os.path.join(tdir, rt)
+    git_init(path, 'v{0}-rt'.format(series))
+    release(path, rt_tag)
+    cmd(['git', '-C', path, 'remote', 'add', 'origin', remote])
+    cmd(['git', '-C', path, 'push', '-u', '--follow-tags', 'origin',
+         'v{0}-rt'.format(series)])
+
+
+class TestPrepCache(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        env = patch.dict(os.environ, {'XDG_CACHE_HOME': self.tdir + '/cache'})
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.stable = self.tdir + '/linux'
+        self.rt = self.tdir + '/linux-rt'
+        make_trees(self.tdir, 'linux', 'linux-rt', '6.12',
+                   ['v6.12.1', 'v6.12.2'], 'v6.12.1-rt1')
+        os.chdir(self.rt)
+        self.config = {'VERIFY_UPSTREAM': 'no'}
+
+    def tearDown(self):
+        os.chdir(os.path.dirname(self.tdir))
+        rmtree(self.tdir)
+
+    def prep(self, refresh=False):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            with patch.object(srt_prep, 'compute_exports',
+                              wraps=srt_prep.compute_exports) as compute:
+                prep(self.config, refresh)
+        return out.getvalue().splitlines()[1:], compute.call_count
+
+    def test_prep_cache(self):
+        exports = ['export OLD_TAG=v6.12.1-rt1', 'export NEW_TAG=v6.12.2-rt2']
+        self.assertEqual(self.prep(), (exports, 1))
+        self.assertEqual(self.prep(), (exports, 0))
+        self.assertEqual(self.prep(refresh=True), (exports, 1))
+
+        # new stable release
+        release(self.stable, 'v6.12.3')
+        exports[1] = 'export NEW_TAG=v6.12.3-rt2'
+        self.assertEqual(self.prep(), (exports, 1))
+        self.assertEqual(self.prep(), (exports, 0))
+
+        # a release pushed from another tree is seen once the remote
+        # listing expires
+        other = self.tdir + '/other'
+        cmd(['git', 'clone', '-q', self.tdir + '/linux-rt.git', other])
+        cmd(['git', '-C', other, 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', '-C', other, 'config', 'user.email', 'me@incredible.com'])
+        release(other, 'v6.12.3-rt2')
+        cmd(['git', '-C', other, 'push', '--tags'])
+        self.assertEqual(self.prep(), (exports, 0))
+        self.config['PREP_REMOTE_TTL'] = '0'
+        exports[0] = 'export OLD_TAG=v6.12.3-rt2'
+        self.assertEqual(self.prep(), (exports, 1))
+
+    def test_corrupt_cache(self):
+        exports = ['export OLD_TAG=v6.12.1-rt1', 'export NEW_TAG=v6.12.2-rt2']
+        self.assertEqual(self.prep(), (exports, 1))
+        path = srt_prep.get_prep_cache_path()
+        for data in ['{"fingerprint": "tru', '[]', '{"exports": 1}']:
+            with open(path, 'w') as f:
+                f.write(data)
+            self.assertEqual(self.prep(), (exports, 1))
+            self.assertEqual(self.prep(), (exports, 0))
+
+    def test_no_stable_tag(self):
+        self.config['VERIFY_UPSTREAM'] = 'yes'
+        with patch.object(srt_prep, 'get_next_stable_version',
+                          return_value=None), \
+                patch.object(srt_prep, 'verify_tags') as verify, \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            with self.assertRaises(SystemExit) as e:
+                self.prep()
+        self.assertEqual(e.exception.code, 1)
+        self.assertIn('No stable tag found in', err.getvalue())
+        verify.assert_not_called()
+
+
+class TestPrepWorkspace(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.workspace = self.tdir + '/work'
+        os.makedirs(self.workspace + '/orphan-rt/.git')
+        make_trees(self.workspace, 'v6.12', 'v6.12-rt', '6.12',
+                   ['v6.12.1', 'v6.12.2'], 'v6.12.1-rt1')
+        make_trees(self.workspace, 'v6.6', 'v6.6-rt', '6.6',
+                   ['v6.6.98', 'v6.6.99'], 'v6.6.98-rt57')
+        # not configured in srt.conf
+        make_trees(self.workspace, 'v6.1', 'v6.1-rt', '6.1',
+                   ['v6.1.140'], 'v6.1.140-rt51')
+        with open(self.tdir + '/srt.conf', 'w') as f:
+            f.write('[DEFAULT]\nVERIFY_UPSTREAM = no\n'
+                    '[v6.12-rt/origin/v6.12-rt]\n'
+                    '[v6.6-rt/origin/v6.6-rt]\n')
+        env = patch.dict(os.environ, {'XDG_CACHE_HOME': self.tdir + '/cache',
+                                      'SRT_CONF': self.tdir})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def tearDown(self):
+        rmtree(self.tdir)
+
+    def test_prep_workspace(self):
+        env_dir = self.tdir + '/env'
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            results = prep_workspace(self.workspace, env_dir=env_dir)
+        self.assertIn('missing configuration', results[0])
+        self.assertEqual([(r['OLD_TAG'], r['NEW_TAG']) for r in results[1:]],
+                         [('v6.12.1-rt1', 'v6.12.2-rt2'),
+                          ('v6.6.98-rt57', 'v6.6.99-rt58')])
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0].split(),
+                         ['Tree', 'OLD_TAG', 'NEW_TAG', 'QUILT_PATCHES'])
+        self.assertEqual(lines[1].split()[:4],
+                         ['v6.1-rt', '-', '-', 'failed'])
+        self.assertEqual(lines[3].split()[:3],
+                         ['v6.6-rt', 'v6.6.98-rt57', 'v6.6.99-rt58'])
+
+        self.assertEqual(sorted(os.listdir(env_dir)),
+                         ['v6.12-rt.env', 'v6.6-rt.env'])
+        with open(env_dir + '/v6.6-rt.env') as f:
+            self.assertEqual(f.read().splitlines()[1:],
+                             ['export OLD_TAG=v6.6.98-rt57',
+                              'export NEW_TAG=v6.6.99-rt58'])
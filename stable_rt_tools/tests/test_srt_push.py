@@ -22,9 +22,16 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE
 
+import os
+import tempfile
 import unittest
+from shutil import rmtree
+from subprocess import CalledProcessError
 from unittest.mock import patch
-from stable_rt_tools.srt_push import push
+from stable_rt_tools import srt_push
+from stable_rt_tools.srt_push import (parse_refspecs, plan_push, push,
+                                      read_push_cache)
+from stable_rt_tools.srt_util import cmd
 
 
 class DummyCtx:
@@ -62,6 +69,7 @@ def test_push_quilt_workflow():
 
             def fake_cmd(args, verbose=False):
                 calls.append(args)
+                return ''
 
             with patch('stable_rt_tools.srt_push.cmd', side_effect=fake_cmd):
                 push(config, ctx)
@@ -78,5 +86,147 @@ def test_push_quilt_workflow():
             assert found_tag, 'Did not push -patches tag'
 
 
+class TestPushMirrors(unittest.TestCase):
+
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.repo = os.path.join(self.tdir, 'repo')
+        self.mirrors = [os.path.join(self.tdir, m)
+                        for m in ['origin.git', 'mirror1.git', 'mirror2.git']]
+        for m in self.mirrors:
+            cmd(['git', 'init', '--bare', m])
+
+        cmd(['git', 'init', '--initial-branch=v6.12-rt', self.repo])
+        cmd(['git', '-C', self.repo, 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', '-C', self.repo, 'config', 'user.email',
+             'me@incredible.com'])
+        cmd(['git', '-C', self.repo, 'commit', '--allow-empty', '-m',
+             'Linux 6.12.39-rt11-rc1'])
+        cmd(['git', '-C', self.repo, 'tag', '-a', '-m', 'v6.12.39-rt11-rc1',
+             'v6.12.39-rt11-rc1'])
+        os.chdir(self.repo)
+
+    def tearDown(self):
+        os.chdir(os.path.dirname(self.tdir))
+        rmtree(self.tdir)
+
+    def test_push_mirrors(self):
+        config = {'PRJ_GIT_TREE': self.mirrors[0],
+                  'PUSH_MIRRORS': ','.join(self.mirrors[1:])}
+        ctx = DummyCtx('v6.12.39-rt11-rc1', is_rc=True)
+
+        with patch('stable_rt_tools.srt_push.get_remote_branch_name',
+                   return_value='v6.12-rt'):
+            with patch('stable_rt_tools.srt_push.confirm',
+                       return_value=True) as mock_confirm:
+                with patch('builtins.print'):
+                    push(config, ctx)
+        mock_confirm.assert_called_once()
+
+        head = cmd(['git', 'rev-parse', 'HEAD'])
+        for m in self.mirrors:
+            self.assertEqual(cmd(['git', '-C', m, 'rev-parse', 'v6.12-rt']),
+                             head)
+            self.assertEqual(cmd(['git', '-C', m, 'tag']),
+                             'v6.12.39-rt11-rc1')
+
+    def test_push_cached_plan(self):
+        config = {'PRJ_GIT_TREE': self.mirrors[0]}
+        ctx = DummyCtx('v6.12.39-rt11-rc1', is_rc=True)
+
+        def do_push():
+            with patch('stable_rt_tools.srt_push.get_remote_branch_name',
+                       return_value='v6.12-rt'):
+                with patch('stable_rt_tools.srt_push.confirm',
+                           return_value=True):
+                    with patch('builtins.print'):
+                        push(config, ctx)
+
+        do_push()
+
+        # Someone else updates the remote behind our back, the cached
+        # plan is stale and the lease must protect the remote.
+        other = os.path.join(self.tdir, 'other')
+        cmd(['git', 'clone', '-q', '-b', 'v6.12-rt', self.mirrors[0], other])
+        cmd(['git', '-C', other, '-c', 'user.name=Other', '-c',
+             'user.email=o@example.com', 'commit', '--allow-empty', '-m',
+             'other'])
+        cmd(['git', '-C', other, 'push', '-q', 'origin', 'HEAD:v6.12-rt'])
+        remote_head = cmd(['git', '-C', other, 'rev-parse', 'HEAD'])
+
+        cmd(['git', 'tag', '-d', 'v6.12.39-rt11-rc1'])
+        cmd(['git', 'commit', '--allow-empty', '-m', 'Linux 6.12.39-rt11-rc1'])
+        cmd(['git', 'tag', '-a', '-m', 'rc1', 'v6.12.39-rt11-rc1'])
+        with patch('stable_rt_tools.srt_push.ls_remote',
+                   wraps=srt_push.ls_remote) as mock_ls_remote:
+            do_push()
+            self.assertEqual(mock_ls_remote.call_count, 1)
+        self.assertEqual(
+            cmd(['git', '-C', self.mirrors[0], 'rev-parse', 'v6.12-rt']),
+            remote_head)
+
+        # The failed push refreshed the cache, the next attempt succeeds
+        do_push()
+        self.assertEqual(
+            cmd(['git', '-C', self.mirrors[0], 'rev-parse', 'v6.12-rt']),
+            cmd(['git', 'rev-parse', 'HEAD']))
+
+    def test_push_failed_refresh_failed(self):
+        config = {'PRJ_GIT_TREE': self.mirrors[0]}
+        ctx = DummyCtx('v6.12.39-rt11-rc1', is_rc=True)
+
+        def do_push():
+            with patch('stable_rt_tools.srt_push.get_remote_branch_name',
+                       return_value='v6.12-rt'):
+                with patch('stable_rt_tools.srt_push.confirm',
+                           return_value=True):
+                    with patch('builtins.print'):
+                        push(config, ctx)
+
+        do_push()
+
+        other = os.path.join(self.tdir, 'other')
+        cmd(['git', 'clone', '-q', '-b', 'v6.12-rt', self.mirrors[0], other])
+        cmd(['git', '-C', other, '-c', 'user.name=Other', '-c',
+             'user.email=o@example.com', 'commit', '--allow-empty', '-m',
+             'other'])
+        cmd(['git', '-C', other, 'push', '-q', 'origin', 'HEAD:v6.12-rt'])
+
+        cmd(['git', 'tag', '-d', 'v6.12.39-rt11-rc1'])
+        cmd(['git', 'commit', '--allow-empty', '-m', 'Linux 6.12.39-rt11-rc1'])
+        cmd(['git', 'tag', '-a', '-m', 'rc1', 'v6.12.39-rt11-rc1'])
+
+        # The remote goes away between the push and the refresh, the
+        # failed push is reported and the remote dropped from the cache
+        error = CalledProcessError(128, ['git', 'ls-remote'])
+        with patch('stable_rt_tools.srt_push.ls_remote', side_effect=error):
+            do_push()
+        self.assertNotIn(self.mirrors[0], read_push_cache())
+
+        do_push()
+        self.assertEqual(
+            cmd(['git', '-C', self.mirrors[0], 'rev-parse', 'v6.12-rt']),
+            cmd(['git', 'rev-parse', 'HEAD']))
+
+
+def test_plan_push():
+    entries = parse_refspecs(['a^{}:refs/heads/b', '+c:refs/heads/d',
+                              'e', 'tag', 't1', 'tag', 't2'])
+    assert entries == [('a^{}', 'refs/heads/b', False),
+                       ('c', 'refs/heads/d', True),
+                       ('e', 'refs/heads/e', False),
+                       ('refs/tags/t1', 'refs/tags/t1', False),
+                       ('refs/tags/t2', 'refs/tags/t2', False)]
+
+    local = {'a^{}': '1', 'c': '2', 'e': '3',
+             'refs/tags/t1': '4', 'refs/tags/t2': '5'}
+    remote = {'refs/heads/b': '0', 'refs/heads/d': '0', 'refs/heads/e': '3',
+              'refs/tags/t1': None}
+    with patch('stable_rt_tools.srt_push.is_ancestor', return_value=False):
+        plan = plan_push(entries, local, remote)
+    assert [p[3] for p in plan] == ['rejected', 'forced update',
+                                    'up to date', 'new', 'new']
+
+
 if __name__ == '__main__':
     unittest.main()
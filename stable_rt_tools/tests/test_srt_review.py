@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+
+from stable_rt_tools.srt_review import ReviewIndex, parse_message
+from stable_rt_tools.srt_util import cmd
+
+TAG = 'v6.12.39-rt11-rc1'
+
+
+def mail(msgid, subject, sender='Me <me@example.org>', parent=None,
+         refs=None, body='text'):
+    lines = ['From {0} Mon Sep 17 00:00:00 2001'.format(sender),
+             'From: ' + sender,
+             'Subject: ' + subject,
+             'Message-ID: <{0}>'.format(msgid)]
+    if parent:
+        lines.append('In-Reply-To: <{0}>'.format(parent))
+        lines.append('References: ' + ' '.join(
+            '<{0}>'.format(r) for r in (refs or [parent])))
+    return '\n'.join(lines) + '\n\n' + body + '\n'
+
+
+SERIES = [
+    mail('cover@me', '[PATCH RT 0/2] Linux ' + TAG),
+    mail('p1@me', '[PATCH RT 1/2] sched: fix', parent='cover@me',
+         body='Acked-by: Not An Ack <x@example.org>\n'),
+    mail('p2@me', '[PATCH RT 2/2] Linux ' + TAG, parent='cover@me'),
+    mail('other@me', '[PATCH] unrelated'),
+]
+
+REPLIES = [
+    mail('r1@x', 'Re: [PATCH RT 1/2] sched: fix', 'A <a@example.org>',
+         'p1@me', ['cover@me', 'p1@me'],
+         '> quoted\n\nReviewed-by: A <a@example.org>\n'),
+    mail('r2@x', 'Re: [PATCH RT 1/2] sched: fix', 'B <b@example.org>',
+         'r1@x', ['cover@me', 'p1@me', 'r1@x'],
+         'NAK, this breaks arm64\n'),
+    mail('r3@x', 'Re: [PATCH RT 2/2] Linux', 'C <c@example.org>',
+         'p2@me', ['cover@me', 'p2@me'],
+         '> Acked-by: Quoted <q@example.org>\nLooks odd to me\n'),
+    mail('r4@x', 'Re: [PATCH] unrelated', 'D <d@example.org>',
+         'other@me', body='Acked-by: D <d@example.org>\n'),
+]
+
+
+class TestReviewIndex(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.index = ReviewIndex(self.tdir + '/index.sqlite')
+
+    def tearDown(self):
+        self.index.close()
+        rmtree(self.tdir)
+
+    def check_replies(self):
+        series = self.index.find_series(TAG)
+        self.assertEqual(series, ['<cover@me>', '<p1@me>', '<p2@me>'])
+        replies = self.index.replies(series)
+        self.assertEqual(replies['<cover@me>'], [])
+        p1 = sorted(replies['<p1@me>'])
+        self.assertEqual([r[0] for r in p1], ['<r1@x>', '<r2@x>'])
+        self.assertEqual(p1[0][4], '["Reviewed-by: A <a@example.org>"]')
+        self.assertEqual(p1[1][5], 1)
+        p2 = replies['<p2@me>']
+        self.assertEqual([(r[0], r[4], r[5]) for r in p2],
+                         [('<r3@x>', '[]', 0)])
+
+    def test_parse_message(self):
+        row = parse_message(REPLIES[1].encode())
+        self.assertEqual(row[0], '<r2@x>')
+        self.assertEqual(row[1], '<cover@me> <p1@me> <r1@x>')
+        self.assertEqual(row[2], 'B <b@example.org>')
+        self.assertEqual(row[5], 1)
+        self.assertIsNone(parse_message(b'Subject: no id\n\nbody\n'))
+
+    def test_objection(self):
+        def objection(body):
+            return parse_message(mail('r@x', 'Re: x', 'A <a@example.org>',
+                                      'p1@me', body=body).encode())[5]
+
+        self.assertEqual(objection('No objections from me.\n'), 0)
+        self.assertEqual(objection('no objection,\nAcked-by: A <a@x>\n'),
+                         0)
+        self.assertEqual(objection('> NACK\nSure, fixed.\n'), 0)
+        self.assertEqual(objection('Nacked-by: A <a@example.org>\n'), 1)
+        self.assertEqual(objection('Nack, see above\n'), 1)
+
+    def test_mbox(self):
+        mbox = self.tdir + '/list.mbox'
+        with open(mbox, 'w') as f:
+            f.write(''.join(SERIES))
+        self.assertEqual(self.index.update(mbox), 4)
+        self.assertEqual(self.index.update(mbox), 0)
+
+        with open(mbox, 'a') as f:
+            f.write(''.join(REPLIES))
+        self.assertEqual(self.index.update(mbox), 4)
+        self.check_replies()
+
+        # a rewritten archive is indexed again
+        with open(mbox, 'w') as f:
+            f.write(''.join(REPLIES + SERIES))
+        self.assertEqual(self.index.update(mbox), 8)
+        self.check_replies()
+
+    def test_public_inbox(self):
+        inbox = self.tdir + '/inbox'
+        repo = inbox + '/git/0.git'
+        work = self.tdir + '/work'
+        os.makedirs(work)
+        cmd(['git', 'init', '--bare', repo])
+        git = ['git', '--git-dir', repo, '--work-tree', work,
+               '-c', 'user.name=pi', '-c', 'user.email=pi@example.org']
+
+        def deliver(mails):
+            for m in mails:
+                with open(work + '/m', 'w') as f:
+                    f.write(m.split('\n', 1)[1])
+                cmd(git + ['add', 'm'])
+                cmd(git + ['commit', '-q', '-m', 'm'])
+
+        deliver(SERIES)
+        self.assertEqual(self.index.update(inbox), 4)
+        deliver(REPLIES)
+        self.assertEqual(self.index.update(inbox), 4)
+        self.assertEqual(self.index.update(inbox), 0)
+        self.check_replies()
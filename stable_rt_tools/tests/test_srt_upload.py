@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import io
+import lzma
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+from subprocess import CalledProcessError
+from unittest.mock import patch
+
+from stable_rt_tools.srt_upload import (KupBackend, LocalBackend,
+                                        RsyncBackend, create_deltas,
+                                        get_backends, upload, upload_ops)
+
+
+class DummyCtx:
+
+    def __init__(self, files, old_files):
+        self.files = files
+        self.old_files = old_files
+
+    def get_files(self):
+        return self.files
+
+    def get_old_files(self):
+        return self.old_files
+
+
+class TestUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tdir, 'src')
+        os.mkdir(self.src)
+
+        files = []
+        for name in ['patch-4.4.14-rt4.patch', 'patches-4.4.14-rt4.tar']:
+            for ext in ['.xz', '.sign']:
+                with open(os.path.join(self.src, name + ext), 'w') as f:
+                    f.write(name + ext)
+            files.append(os.path.join(self.src, name + '.xz'))
+        old_files = [os.path.join(self.src, 'patch-4.4.13-rt3.patch.xz'),
+                     os.path.join(self.src, 'patches-4.4.13-rt3.tar.xz')]
+
+        self.ctx = DummyCtx(files, old_files)
+        self.config = {'PRJ_DIR': '/pub/rt/4.4'}
+
+    def tearDown(self):
+        rmtree(self.tdir)
+
+    def mirror(self, name):
+        path = os.path.join(self.tdir, name)
+        prj = os.path.join(path, 'pub/rt/4.4')
+        os.makedirs(prj)
+        for f in ['patch-4.4.13-rt3.patch.xz', 'patch-4.4.13-rt3.patch.sign']:
+            with open(os.path.join(prj, f), 'w') as fp:
+                fp.write(f)
+        return path
+
+    def test_get_backends(self):
+        config = {'UPLOAD_TARGETS': 'kup, local:/srv/a, rsync:h:/srv/b'}
+        b = get_backends(config)
+        self.assertIsInstance(b[0], KupBackend)
+        self.assertIsInstance(b[1], LocalBackend)
+        self.assertEqual(b[1].location, '/srv/a')
+        self.assertIsInstance(b[2], RsyncBackend)
+        self.assertEqual((b[2].host, b[2].root), ('h', '/srv/b'))
+        self.assertIsInstance(get_backends({})[0], KupBackend)
+
+    def test_get_backends_invalid(self):
+        for targets in ['rsync', 'local', 'local:', 'rsync:/srv/b', 'ftp']:
+            with patch('sys.stderr', new_callable=io.StringIO) as err:
+                with self.assertRaises(SystemExit) as e:
+                    get_backends({'UPLOAD_TARGETS': targets})
+            self.assertEqual(e.exception.code, 1)
+            self.assertIn(targets, err.getvalue())
+
+    def test_local_backend(self):
+        mirror = self.mirror('mirror')
+        LocalBackend(mirror).run(upload_ops(self.config, self.ctx))
+
+        prj = os.path.join(mirror, 'pub/rt/4.4')
+        self.assertEqual(sorted(os.listdir(prj)),
+                         ['older',
+                          'patch-4.4.14-rt4.patch.sign',
+                          'patch-4.4.14-rt4.patch.xz',
+                          'patches-4.4.14-rt4.tar.sign',
+                          'patches-4.4.14-rt4.tar.xz'])
+        link = os.path.join(prj, 'patch-4.4.14-rt4.patch.xz')
+        self.assertEqual(os.readlink(link), 'older/patch-4.4.14-rt4.patch.xz')
+        with open(link) as f:
+            self.assertEqual(f.read(), 'patch-4.4.14-rt4.patch.xz')
+        self.assertEqual(len(os.listdir(os.path.join(prj, 'older'))), 4)
+
+    def test_local_backend_delta(self):
+        old = ''.join('+line {0}\n'.format(i) for i in range(5000))
+        new = old.replace('+line 42\n', '+line 42 fixed\n')
+        mirror = self.mirror('mirror')
+        older = os.path.join(mirror, 'pub/rt/4.4/older')
+        os.makedirs(older)
+        name = 'patch-4.4.13-rt3.patch.xz'
+        for fln, data in [(self.ctx.files[0], new),
+                          (self.ctx.old_files[0], old),
+                          (os.path.join(older, name), old)]:
+            with lzma.open(fln, 'wt') as f:
+                f.write(data)
+
+        with patch('builtins.print'):
+            deltas = create_deltas(self.ctx)
+        self.assertEqual(list(deltas), [self.ctx.files[0]])
+        ops = upload_ops(self.config, self.ctx, deltas)
+        self.assertEqual(ops[0][0], 'patch')
+        self.assertEqual(KupBackend().command(ops)[1], 'put')
+
+        LocalBackend(mirror).run(ops)
+        with lzma.open(os.path.join(older, 'patch-4.4.14-rt4.patch.xz'),
+                       'rt') as f:
+            self.assertEqual(f.read(), new)
+
+    def write_delta_files(self, mirror_base=True):
+        old = ''.join('+line {0}\n'.format(i) for i in range(5000))
+        new = old.replace('+line 42\n', '+line 42 fixed\n')
+        mirror = self.mirror('mirror')
+        older = os.path.join(mirror, 'pub/rt/4.4/older')
+        os.makedirs(older)
+        files = [(self.ctx.files[0], new), (self.ctx.old_files[0], old)]
+        if mirror_base:
+            files.append((os.path.join(older, 'patch-4.4.13-rt3.patch.xz'),
+                          old))
+        for fln, data in files:
+            with lzma.open(fln, 'wt') as f:
+                f.write(data)
+        return mirror, new
+
+    def test_local_backend_delta_fallback(self):
+        mirror, new = self.write_delta_files(mirror_base=False)
+        with patch('builtins.print'):
+            deltas = create_deltas(self.ctx)
+        ops = upload_ops(self.config, self.ctx, deltas)
+        self.assertEqual(ops[0][0], 'patch')
+
+        with patch('sys.stderr', new_callable=io.StringIO) as err:
+            LocalBackend(mirror).run(ops)
+        self.assertIn('uploading it in full', err.getvalue())
+        older = os.path.join(mirror, 'pub/rt/4.4/older')
+        with lzma.open(os.path.join(older, 'patch-4.4.14-rt4.patch.xz'),
+                       'rt') as f:
+            self.assertEqual(f.read(), new)
+        self.assertTrue(os.path.isfile(
+            os.path.join(older, 'patch-4.4.14-rt4.patch.sign')))
+
+    def test_rsync_backend_delta_fallback(self):
+        files = [self.ctx.files[0], self.ctx.files[0][:-3] + '.sign']
+        ops = [('patch', files, '/pub/rt/4.4/older/', 'x.delta',
+                '/pub/rt/4.4/older/patch-4.4.13-rt3.patch.xz')]
+        calls = []
+
+        def fake_cmd(args):
+            calls.append(args)
+            if 'srt_util_delta' in args[-1]:
+                raise CalledProcessError(1, args)
+            return ''
+
+        with patch('stable_rt_tools.srt_upload.cmd', fake_cmd), \
+                patch('sys.stderr', new_callable=io.StringIO):
+            RsyncBackend('h:/srv').run(ops)
+        self.assertEqual(calls[-1], ['rsync', '-a', '--'] + files +
+                         ['h:/srv/pub/rt/4.4/older/'])
+
+    def test_upload_delta_cleanup(self):
+        mirror, new = self.write_delta_files()
+        config = dict(self.config)
+        config['UPLOAD_TARGETS'] = 'local:' + mirror
+
+        with patch('stable_rt_tools.srt_upload.confirm', return_value=True):
+            with patch('builtins.print'):
+                upload(config, self.ctx, delta=True)
+        self.assertEqual([f for f in os.listdir(self.src)
+                          if f.endswith('.delta')], [])
+
+    def test_create_deltas_by_kind(self):
+        src = self.src + '/'
+        ctx = DummyCtx(self.ctx.files + [src + 'bundle-4.4.14-rt4.bundle.xz'],
+                       self.ctx.old_files[::-1] +
+                       [src + 'incr-4.4.12-rt2-4.4.13-rt3.patch.xz'])
+        for fln in ctx.files + ctx.old_files:
+            with open(fln, 'w') as f:
+                f.write(fln)
+
+        pairs = []
+
+        def delta(old, new, fname):
+            pairs.append((os.path.basename(old), os.path.basename(new)))
+            return 0
+
+        with patch('stable_rt_tools.srt_upload.create_delta_file', delta), \
+                patch('builtins.print'):
+            deltas = create_deltas(ctx)
+        self.assertEqual(pairs, [
+            ('patch-4.4.13-rt3.patch.xz', 'patch-4.4.14-rt4.patch.xz'),
+            ('patches-4.4.13-rt3.tar.xz', 'patches-4.4.14-rt4.tar.xz')])
+        self.assertEqual(list(deltas), self.ctx.files)
+
+    def test_upload_parallel_local(self):
+        mirrors = [self.mirror('m1'), self.mirror('m2')]
+        config = dict(self.config)
+        config['UPLOAD_TARGETS'] = ','.join('local:' + m for m in mirrors)
+
+        with patch('stable_rt_tools.srt_upload.confirm', return_value=True):
+            with patch('builtins.print'):
+                upload(config, self.ctx)
+
+        for m in mirrors:
+            older = os.path.join(m, 'pub/rt/4.4/older')
+            self.assertEqual(len(os.listdir(older)), 4)
+
+    def test_upload_failed_target(self):
+        mirror = self.mirror('m1')
+        broken = os.path.join(self.tdir, 'broken')
+        with open(broken, 'w'):
+            pass
+        config = dict(self.config)
+        config['UPLOAD_TARGETS'] = 'local:{0},local:{1}'.format(broken, mirror)
+
+        with patch('stable_rt_tools.srt_upload.confirm', return_value=True):
+            with patch('builtins.print'):
+                with self.assertRaises(SystemExit) as e:
+                    upload(config, self.ctx)
+        self.assertEqual(e.exception.code, 1)
+        older = os.path.join(mirror, 'pub/rt/4.4/older')
+        self.assertEqual(len(os.listdir(older)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
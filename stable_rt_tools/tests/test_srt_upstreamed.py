@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from shutil import rmtree
+from unittest.mock import patch
+
+from stable_rt_tools.srt_upstreamed import (UpstreamIndex, classify,
+                                            normalize_subject, upstreamed)
+from stable_rt_tools.srt_util import cmd
+
+
+def git_init(path):
+    cmd(['git', 'init', path])
+    cmd(['git', '-C', path, 'config', 'user.name', 'Mighty Eagle'])
+    cmd(['git', '-C', path, 'config', 'user.email', 'me@incredible.com'])
+
+
+def commit(path, fname, text, subject):
+    with open(os.path.join(path, fname), 'a') as f:
+        f.write(text + '\n')
+    cmd(['git', '-C', path, 'add', fname])
+    cmd(['git', '-C', path, 'commit', '-m', subject])
+    return cmd(['git', '-C', path, 'rev-parse', 'HEAD'])
+
+
+class TestUpstreamed(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        env = patch.dict(os.environ, {'XDG_CACHE_HOME': self.tdir + '/cache'})
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.mainline = self.tdir + '/linux'
+        git_init(self.mainline)
+        for f in ['a', 'b', 'c']:
+            commit(self.mainline, f, 'base', 'Add ' + f)
+        cmd(['git', '-C', self.mainline, 'tag', 'v6.12'])
+
+        self.rt = self.tdir + '/linux-rt'
+        cmd(['git', 'clone', '-q', self.mainline, self.rt])
+        cmd(['git', '-C', self.rt, 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', '-C', self.rt, 'config', 'user.email',
+             'me@incredible.com'])
+        commit(self.rt, 'a', 'lazy', 'sched: Add lazy preemption')
+        commit(self.rt, 'b', 'nbcon', 'printk: Add nbcon consoles')
+        commit(self.rt, 'c', 'rt', 'rtmutex: Add rt support')
+
+        # merged with a different message, merged after modification
+        self.merged = commit(self.mainline, 'a', 'lazy',
+                             'sched: Lazy preemption')
+        self.likely = commit(self.mainline, 'b', 'nbcon v2',
+                             '[PATCH] printk:  Add NBCON consoles.')
+        commit(self.mainline, 'README', 'unrelated', 'Update README')
+        os.chdir(self.rt)
+
+    def tearDown(self):
+        os.chdir(os.path.dirname(self.tdir))
+        rmtree(self.tdir)
+
+    def test_normalize_subject(self):
+        self.assertEqual(normalize_subject('[PATCH RT 1/3] [RFC] Foo  bar.'),
+                         'foo bar')
+
+    def test_classify(self):
+        index = UpstreamIndex(self.tdir + '/index.sqlite')
+        self.assertEqual(index.update(self.mainline, since='v6.12'), 3)
+        rows = classify(index, 'v6.12..HEAD')
+        self.assertEqual([r[1:] for r in rows], [
+            ('merged', self.merged, 'sched: Add lazy preemption'),
+            ('likely merged', self.likely, 'printk: Add nbcon consoles'),
+            ('out of tree', None, 'rtmutex: Add rt support')])
+
+    def test_incremental(self):
+        index = UpstreamIndex(self.tdir + '/index.sqlite')
+        self.assertEqual(index.update(self.mainline), 6)
+        self.assertEqual(index.update(self.mainline), 0)
+        rt = commit(self.mainline, 'c', 'rt', 'locking: RT support')
+        self.assertEqual(index.update(self.mainline), 1)
+        self.assertEqual(classify(index, 'v6.12..HEAD')[-1][1:3],
+                         ('merged', rt))
+
+    def test_upstreamed(self):
+        out = io.StringIO()
+        with redirect_stdout(out), redirect_stderr(io.StringIO()):
+            upstreamed({'MAINLINE_SINCE': 'v6.12'}, self.mainline,
+                       'v6.12..HEAD')
+        self.assertIn(self.likely[:12], out.getvalue())
+        self.assertIn('1 merged, 1 likely merged, 1 out of tree',
+                      out.getvalue())
+        self.assertTrue(os.path.isfile(self.tdir +
+                                       '/cache/srt/upstream-index.sqlite'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -24,11 +24,15 @@
 
 import os
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from logging import debug
 from shutil import rmtree
 from unittest import TestCase
+from unittest.mock import patch
 
-from stable_rt_tools.srt_util import cmd, get_gpg_fingerprint
+from stable_rt_tools.srt_util import (Speculation, cmd, confirm,
+                                      get_config_size, get_gpg_fingerprint,
+                                      read_json_cache, update_json_cache)
 
 gnupg_config = """
 Key-Type: DSA
@@ -101,6 +105,49 @@ class TestUtil(TestCase):
             fingerprint.replace(' ', '') == self.config['GPG_KEY_ID']
         )
 
+    def test_speculation(self):
+        discarded = []
+        spec = Speculation(lambda a, b: a + b, 1, 2,
+                           discard=discarded.append)
+        with patch('builtins.input', return_value='y'):
+            self.assertTrue(confirm('OK?', spec))
+        self.assertTrue(spec.result())
+        self.assertEqual(spec.value, 3)
+        self.assertEqual(discarded, [])
+
+        spec = Speculation(lambda: 'conn', discard=discarded.append)
+        with patch('builtins.input', side_effect=['maybe', 'n']):
+            self.assertFalse(confirm('OK?', spec))
+        spec.result()
+        self.assertEqual(discarded, ['conn'])
+
+        spec = Speculation(int, 'x')
+        self.assertFalse(spec.result())
+        self.assertIsInstance(spec.error, ValueError)
+
+    def test_json_cache(self):
+        path = self.tdir + '/cache.json'
+        self.assertEqual(read_json_cache(path), {})
+        with open(path, 'w') as f:
+            f.write('{"trunc')
+        self.assertEqual(read_json_cache(path), {})
+
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            list(pool.map(update_json_cache, [path] * 16,
+                          [{str(i): i} for i in range(16)]))
+        self.assertEqual(read_json_cache(path),
+                         {str(i): i for i in range(16)})
+        self.assertEqual(sorted(os.listdir(self.tdir)),
+                         ['cache.json', 'cache.json.lock'])
+
+    def test_get_config_size(self):
+        config = {'A': '1000', 'B': '2k', 'C': '10M', 'D': ''}
+        self.assertEqual(get_config_size(config, 'A'), 1000)
+        self.assertEqual(get_config_size(config, 'B'), 2048)
+        self.assertEqual(get_config_size(config, 'C'), 10 * 1024 * 1024)
+        self.assertEqual(get_config_size(config, 'D', 5), 5)
+        self.assertEqual(get_config_size(config, 'E'), 0)
+
     def test_quilt_workflow_flag(self):
         from configparser import ConfigParser
         from stable_rt_tools.srt_util import get_config, is_quilt_workflow
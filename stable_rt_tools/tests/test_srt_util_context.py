@@ -61,3 +61,5 @@ class TestSrtContext(TestCase):
         files = [path + 'patch-4.4.115-rt39.patch.xz',
                  path + 'patches-4.4.115-rt39.tar.xz']
         self.assertEqual(ctx.get_files(), files)
+        self.assertEqual(ctx.new_fln_incr,
+                         path + 'incr-4.4.115-rt38-4.4.115-rt39.patch.xz')
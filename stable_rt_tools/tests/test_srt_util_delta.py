@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import lzma
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+
+from stable_rt_tools.srt_util_delta import (DeltaError, apply_delta,
+                                            apply_delta_file,
+                                            create_delta_file, make_delta)
+
+
+def make_series(n, changed=()):
+    out = []
+    for i in range(n):
+        if i in changed:
+            out.append('+changed line {0}\n'.format(i))
+        else:
+            out.append('+line {0} of the rt patch queue\n'.format(i))
+    return ''.join(out).encode()
+
+
+class TestDelta(unittest.TestCase):
+
+    def test_roundtrip(self):
+        old = make_series(20000)
+        new = b'inserted\n' + make_series(20000, changed=(5, 7000, 19999))
+        delta = make_delta(old, new)
+        self.assertEqual(apply_delta(old, delta), new)
+        self.assertLess(len(delta) * 10, len(lzma.compress(new)))
+
+    def test_wrong_base(self):
+        old = make_series(100)
+        delta = make_delta(old, make_series(100, changed=(1,)))
+        with self.assertRaises(DeltaError):
+            apply_delta(make_series(101), delta)
+
+    def test_empty(self):
+        self.assertEqual(apply_delta(b'', make_delta(b'', b'abc')), b'abc')
+        self.assertEqual(apply_delta(b'abc', make_delta(b'abc', b'')), b'')
+
+    def test_files(self):
+        tdir = tempfile.mkdtemp()
+        self.addCleanup(rmtree, tdir)
+        old, new, delta, out = [os.path.join(tdir, f)
+                                for f in ['old.xz', 'new.xz', 'd', 'out.xz']]
+        for fln, data in [(old, make_series(1000)),
+                          (new, make_series(1000, changed=(3,)))]:
+            with lzma.open(fln, 'wb') as f:
+                f.write(data)
+
+        create_delta_file(old, new, delta)
+        apply_delta_file(old, delta, out)
+        with lzma.open(out) as f:
+            self.assertEqual(f.read(), make_series(1000, changed=(3,)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+from unittest.mock import patch
+
+from stable_rt_tools.srt_util_kernel import (UnsupportedMakefile,
+                                             get_kernel_version,
+                                             kernelrelease, parse_makefile)
+
+# top of the Makefile of v6.12.39
+makefile_6_12 = """\
+# SPDX-License-Identifier: GPL-2.0
+VERSION = 6
+PATCHLEVEL = 12
+SUBLEVEL = 39
+EXTRAVERSION =
+NAME = Baby Opossum Posse
+
+# *DOCUMENTATION*
+# To see a list of typical targets execute "make help"
+# More info can be located in ./README
+# Comments in this file are targeted only to the developer, do not
+# expect to learn how to build the kernel reading this file.
+
+ifeq ($(filter output-sync,$(.FEATURES)),)
+$(error GNU Make >= 4.0 is required. Your Make version is $(MAKE_VERSION))
+endif
+
+KERNELRELEASE = $(call read-file, include/config/kernel.release)
+KERNELVERSION = $(VERSION)$(if $(PATCHLEVEL),.$(PATCHLEVEL)$(if $(SUBLEVEL),\\
+.$(SUBLEVEL)))$(EXTRAVERSION)
+"""
+
+# top of the Makefile of v4.4.14
+makefile_4_4 = """\
+VERSION = 4
+PATCHLEVEL = 4
+SUBLEVEL = 14
+EXTRAVERSION =
+NAME = Blurry Fish Butt
+
+# *DOCUMENTATION*
+"""
+
+# top of the Makefile of v6.17-rc1
+makefile_rc = """\
+# SPDX-License-Identifier: GPL-2.0
+VERSION = 6
+PATCHLEVEL = 17
+SUBLEVEL = 0
+EXTRAVERSION = -rc1
+NAME = Baby Opossum Posse
+"""
+
+
+class TestKernelRelease(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.tdir)
+
+    def write(self, name, text):
+        with open(os.path.join(self.tdir, name), 'w') as f:
+            f.write(text)
+
+    def release(self):
+        with patch.dict(os.environ):
+            os.environ.pop('LOCALVERSION', None)
+            return kernelrelease(self.tdir)
+
+    def test_makefiles(self):
+        for text, release in [(makefile_6_12, '6.12.39'),
+                              (makefile_4_4, '4.4.14'),
+                              (makefile_rc, '6.17.0-rc1')]:
+            self.write('Makefile', text)
+            self.assertEqual(self.release(), release)
+
+    def test_localversion(self):
+        self.write('Makefile', makefile_6_12)
+        self.write('localversion-rt', '-rt11\n')
+        self.write('localversion-a', '-a\n\n')
+        self.write('localversion-rt~', '-rt10\n')
+        self.assertEqual(self.release(), '6.12.39-a-rt11')
+
+        with patch.dict(os.environ, {'LOCALVERSION': '-local'}):
+            self.assertEqual(kernelrelease(self.tdir), '6.12.39-a-rt11-local')
+
+    def test_unsupported(self):
+        for text in ['NAME = no version\n',
+                     makefile_4_4.replace('SUBLEVEL = 14',
+                                          'SUBLEVEL = $(shell cat sub)'),
+                     makefile_4_4 + 'EXTRAVERSION += -foo\n',
+                     makefile_4_4 + 'EXTRAVERSION = -foo\n']:
+            with self.assertRaises(UnsupportedMakefile):
+                parse_makefile(text)
+
+    def test_fallback(self):
+        self.write('Makefile', 'NAME = no version\n')
+        os.chdir(self.tdir)
+        try:
+            with patch('stable_rt_tools.srt_util_kernel.make_kernelrelease',
+                       return_value='4.4.14-rt4') as make:
+                self.assertEqual(get_kernel_version(), '4.4.14-rt4')
+            make.assert_called_once_with()
+        finally:
+            os.chdir(os.path.dirname(self.tdir))
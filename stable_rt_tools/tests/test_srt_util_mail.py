@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import email
+import os
+import smtplib
+import tempfile
+import unittest
+from email.header import decode_header, make_header
+from shutil import rmtree
+from unittest.mock import patch
+
+from stable_rt_tools.srt_util_mail import (Journal, SmtpSink, prepare_series,
+                                           read_series, send_series,
+                                           smtp_check, smtp_connect)
+
+PATCH = '''From 1234567890abcdef Mon Sep 17 00:00:00 2001
+From: {author}
+Date: Mon, 1 Jan 2024 00:00:00 +0000
+Subject: [PATCH RT {n}/2] {subject}
+MIME-Version: 1.0
+Content-Type: text/plain; charset=UTF-8
+Content-Transfer-Encoding: 8bit
+
+{subject} body
+.leading dot
+
+Signed-off-by: {author}
+---
+ file | 1 +
+'''
+
+
+class TestSmtpSender(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        mails = [('Me <me@example.org>', 'Cover letter'),
+                 ('Thomas Gleixner <tglx@example.org>', 'sched: fix'),
+                 ('Me <me@example.org>', 'Linux 4.4.1-rt1-rc1')]
+        for n, (author, subject) in enumerate(mails):
+            fname = '{0:04d}-patch.patch'.format(n)
+            with open(os.path.join(self.tdir, fname), 'w') as f:
+                f.write(PATCH.format(author=author, n=n, subject=subject))
+        self.config = {'SENDER': 'Me <me@example.org>',
+                       'MAIL_TO': 'a@example.org,b@example.org'}
+        self.sink = SmtpSink().start()
+        self.smtp = {'SMTP_SERVER': 'localhost',
+                     'SMTP_PORT': self.sink.port,
+                     'SMTP_USER': None, 'SMTP_PASSWORD': None,
+                     'SMTP_ENCRYPTION': None, 'SMTP_PIPELINING': False}
+
+    def tearDown(self):
+        self.sink.stop()
+        rmtree(self.tdir)
+
+    def send(self, suppress_cc=False):
+        journal = Journal(self.tdir)
+        series = prepare_series(self.config, read_series(self.tdir),
+                                journal, suppress_cc)
+        send_series(self.smtp, 'me@example.org', series, journal)
+
+    def check_series(self):
+        msgs = [email.message_from_bytes(m[2]) for m in self.sink.messages]
+        self.assertEqual(len(msgs), 3)
+        cover = msgs[0]['Message-ID']
+        self.assertIsNone(msgs[0]['In-Reply-To'])
+        for m in msgs[1:]:
+            self.assertEqual(m['In-Reply-To'], cover)
+            self.assertEqual(m['References'], cover)
+        for m in msgs:
+            self.assertEqual(m['From'], 'Me <me@example.org>')
+            self.assertEqual(m['To'], 'a@example.org, b@example.org')
+        return msgs
+
+    def test_send(self):
+        self.send(suppress_cc=True)
+        self.assertEqual(self.sink.connections, 1)
+        msgs = self.check_series()
+        self.assertIsNone(msgs[1]['Cc'])
+        body = msgs[1].get_payload()
+        self.assertTrue(body.startswith(
+            'From: Thomas Gleixner <tglx@example.org>\r\n\r\n'))
+        self.assertIn('\r\n.leading dot\r\n', body)
+        for sender, rcpts, _ in self.sink.messages:
+            self.assertEqual(sender, '<me@example.org>')
+            self.assertEqual(rcpts, ['<a@example.org>', '<b@example.org>'])
+
+    def test_send_cc(self):
+        self.smtp['SMTP_PIPELINING'] = True
+        self.send()
+        self.assertEqual(self.sink.connections, 1)
+        msgs = self.check_series()
+        self.assertIn('tglx@example.org', msgs[1]['Cc'])
+        self.assertIn('<tglx@example.org>', self.sink.messages[1][1])
+
+    def test_send_utf8_names(self):
+        with open(os.path.join(self.tdir, '0001-patch.patch'), 'w') as f:
+            f.write(PATCH.format(author='Jürgen Groß <jgross@example.org>',
+                                 n=1, subject='sched: fix').replace(
+                'From: Jürgen Groß',
+                'From: =?UTF-8?q?J=C3=BCrgen=20Gro=C3=9F?=', 1))
+        self.config['MAIL_TO'] = 'Zoë <zoe@example.org>'
+        self.send()
+        header = self.sink.messages[1][2].split(b'\r\n\r\n')[0]
+        header.decode('ascii')
+        msg = email.message_from_bytes(self.sink.messages[1][2])
+        self.assertEqual(str(make_header(decode_header(msg['To']))),
+                         'Zoë <zoe@example.org>')
+        self.assertEqual(str(make_header(decode_header(msg['Cc']))),
+                         'Jürgen Groß <jgross@example.org>')
+        self.assertTrue(msg.get_payload(decode=True).decode().startswith(
+            'From: Jürgen Groß <jgross@example.org>\r\n\r\n'))
+
+    def test_pipelined_refused(self):
+        self.smtp['SMTP_PIPELINING'] = True
+        self.sink.reject = {'<a@example.org>', '<b@example.org>'}
+        with self.assertRaises(smtplib.SMTPResponseException) as e:
+            self.send(suppress_cc=True)
+        self.assertEqual(e.exception.smtp_code, 550)
+        self.assertEqual(self.sink.messages, [])
+        self.assertEqual(Journal(self.tdir).sent, [])
+
+    def test_send_reconnect(self):
+        journal = Journal(self.tdir)
+        series = prepare_series(self.config, read_series(self.tdir),
+                                journal, True)
+        conn = smtp_connect(self.smtp)
+        self.assertIs(smtp_check(self.smtp, conn), conn)
+        # the server dropped the idle connection meanwhile
+        conn.close()
+        send_series(self.smtp, 'me@example.org', series, journal, conn)
+        self.assertEqual(self.sink.connections, 2)
+        self.check_series()
+
+    def test_check_broken_pipe(self):
+        for error in [BrokenPipeError(32, 'Broken pipe'),
+                      ConnectionResetError(104, 'Connection reset'),
+                      smtplib.SMTPResponseException(421, b'Timeout')]:
+            conn = smtp_connect(self.smtp)
+            with patch.object(conn, 'noop', side_effect=error):
+                new = smtp_check(self.smtp, conn)
+            self.assertIsNot(new, conn)
+            self.assertEqual(new.noop()[0], 250)
+            new.quit()
+
+    def test_resume(self):
+        journal = Journal(self.tdir)
+        series = prepare_series(self.config, read_series(self.tdir),
+                                journal, True)
+        journal.mark_sent(series[0][0])
+        cover = journal.ids[series[0][0].filename]
+
+        self.send(suppress_cc=True)
+        self.assertEqual(len(self.sink.messages), 2)
+        for _, _, data in self.sink.messages:
+            self.assertEqual(email.message_from_bytes(data)['In-Reply-To'],
+                             cover)
+
+        self.send(suppress_cc=True)
+        self.assertEqual(len(self.sink.messages), 2)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+from unittest.mock import patch
+
+from stable_rt_tools.srt_tag import apply_tags, release_tags
+from stable_rt_tools.srt_util import cmd, tag_exists
+from stable_rt_tools.srt_util_tag_batch import (TagBatch, TagBatchError,
+                                                rollback)
+
+gnupg_config = """
+Key-Type: DSA
+Key-Length: 1024
+Subkey-Type: ELG-E
+Subkey-Length: 1024
+Name-Real: Mighty Eagle
+Name-Email: me@incredible.com
+Expire-Date: 0
+%no-protection
+%commit
+%echo done
+"""
+
+
+class TestTagBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.gnupghome = tempfile.mkdtemp()
+        os.chmod(self.gnupghome, 0o700)
+
+        cfg_file = self.gnupghome + '/gpg.batch'
+        with open(cfg_file, 'w') as f:
+            f.write(gnupg_config)
+        cmd(['gpg2', '--batch', '--generate-key', cfg_file],
+            env={'GNUPGHOME': self.gnupghome})
+        lines = cmd(['gpg2', '--list-secret-keys', '--with-colons'],
+                    env={'GNUPGHOME': self.gnupghome})
+        key = [line.split(':')[-2] for line in lines.splitlines()
+               if line.startswith('fpr:')][0]
+        self.config = {'GPG_KEY_ID': key, 'GNUPGHOME': self.gnupghome}
+
+        os.chdir(self.tdir)
+        cmd(['git', 'init', '--initial-branch=v6.12-rt'])
+        cmd(['git', 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', 'config', 'user.email', 'me@incredible.com'])
+        cmd(['git', 'commit', '--allow-empty', '-m', 'v6.12.39-rt11'])
+
+    def tearDown(self):
+        os.chdir(os.path.dirname(self.tdir))
+        rmtree(self.tdir)
+        rmtree(self.gnupghome)
+
+    def make_batch(self):
+        batch = TagBatch(self.config)
+        batch.add('v6.12.39-rt11', 'HEAD', 'v6.12.39-rt11')
+        batch.add('v6.12.39-rt11-rebase', 'HEAD', 'v6.12.39-rt11-rebase')
+        batch.add('v6.12.39-rt11-patches', 'HEAD',
+                  'Patch queue for v6.12.39-rt11')
+        return batch
+
+    def test_apply_and_rollback(self):
+        self.make_batch().apply()
+        for t in ['v6.12.39-rt11', 'v6.12.39-rt11-rebase',
+                  'v6.12.39-rt11-patches']:
+            self.assertTrue(tag_exists(t))
+        msg = cmd(['git', 'cat-file', 'tag', 'v6.12.39-rt11-patches'])
+        self.assertIn('Patch queue for v6.12.39-rt11', msg)
+        self.assertIn('-----BEGIN PGP SIGNATURE-----', msg)
+        cmd(['git', 'verify-tag', 'v6.12.39-rt11'],
+            env={'GNUPGHOME': self.gnupghome})
+
+        self.assertEqual(len(rollback()), 3)
+        self.assertEqual(cmd(['git', 'tag']), '')
+
+    def test_all_or_nothing(self):
+        cmd(['git', 'tag', 'v6.12.39-rt11-rebase'])
+        with self.assertRaises(TagBatchError):
+            self.make_batch().apply()
+        self.assertEqual(cmd(['git', 'tag']), 'v6.12.39-rt11-rebase')
+
+    def test_apply_tags(self):
+        batch = self.make_batch()
+        with patch('builtins.input', return_value='n'):
+            with patch('builtins.print'):
+                self.assertFalse(apply_tags(batch))
+        self.assertEqual(cmd(['git', 'tag']), '')
+
+        batch = self.make_batch()
+        with patch('builtins.input', return_value='y'):
+            with patch('builtins.print'):
+                with patch.object(batch, 'sign', wraps=batch.sign) as sign:
+                    self.assertTrue(apply_tags(batch))
+        # signed in the background without a passphrase prompt
+        sign.assert_called_once_with(False)
+        self.assertEqual(len(cmd(['git', 'tag']).split()), 3)
+
+    def test_release_tags(self):
+        cmd(['git', 'branch', 'v6.12-rt-rebase'])
+        cmd(['git', 'branch', 'v6.12-rt-patches'])
+        config = dict(self.config, quilt_workflow='yes')
+
+        with patch('stable_rt_tools.srt_tag.get_remote_branch_name',
+                   return_value='v6.12-rt-patches'):
+            batch = release_tags(config, None)
+        self.assertEqual(batch.tags, [
+            ('v6.12.39-rt11', 'v6.12-rt', 'v6.12.39-rt11'),
+            ('v6.12.39-rt11-rebase', 'v6.12-rt-rebase',
+             'v6.12.39-rt11-rebase'),
+            ('v6.12.39-rt11-patches', 'v6.12-rt-patches',
+             'Patch queue for v6.12.39-rt11')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+from unittest.mock import patch
+
+from stable_rt_tools import srt_util_tag_index
+from stable_rt_tools.srt_prep import get_next_stable_version
+from stable_rt_tools.srt_util import cmd
+from stable_rt_tools.srt_util_tag_index import (find_newest_tag,
+                                                update_tag_index)
+
+
+class TestTagIndex(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        env = patch.dict(os.environ, {'XDG_CACHE_HOME': self.tdir + '/cache'})
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.tree = self.tdir + '/linux-stable'
+        cmd(['git', 'init', '--initial-branch=linux-6.12.y', self.tree])
+        self.git(['config', 'user.name', 'Mighty Eagle'])
+        self.git(['config', 'user.email', 'me@incredible.com'])
+        for t in ['v6.11', 'v6.12', 'v6.12.1', 'v6.12.2']:
+            self.release(t)
+        self.git(['tag', 'v6.12.2-rt1'])
+        self.git(['pack-refs', '--all'])
+        self.release('v6.12.10')
+
+    def tearDown(self):
+        rmtree(self.tdir)
+
+    def git(self, args):
+        return cmd(['git', '-C', self.tree] + args)
+
+    def release(self, tag):
+        self.git(['commit', '--allow-empty', '-m', 'Linux ' + tag[1:]])
+        self.git(['tag', '-a', '-m', tag, tag])
+
+    def test_index(self):
+        index = update_tag_index(self.tree)
+        head = self.git(['rev-parse', 'HEAD'])
+        self.assertEqual(index['series']['6.12'], ['v6.12.10', head])
+        self.assertEqual(index['series']['6.11'][0], 'v6.11')
+        self.assertEqual(sorted(index['loose']), ['v6.12.10'])
+        self.assertEqual(find_newest_tag(self.tree, '6.12'), 'v6.12.10')
+        self.assertEqual(get_next_stable_version('v6.12-rt', self.tree),
+                         'v6.12.10')
+
+    def test_incremental(self):
+        update_tag_index(self.tree)
+        with patch.object(srt_util_tag_index, 'read_packed_refs') as packed:
+            with patch.object(srt_util_tag_index, 'peel_tags',
+                              wraps=srt_util_tag_index.peel_tags) as peel:
+                self.release('v6.12.11')
+                self.assertEqual(find_newest_tag(self.tree, '6.12'),
+                                 'v6.12.11')
+                peel.assert_called_once_with(self.tree, ['v6.12.11'])
+                self.assertEqual(find_newest_tag(self.tree, '6.12'),
+                                 'v6.12.11')
+                self.assertEqual(peel.call_count, 1)
+        packed.assert_not_called()
+
+        self.git(['tag', '-d', 'v6.12.11'])
+        self.assertEqual(find_newest_tag(self.tree, '6.12'), 'v6.12.10')
+        self.git(['pack-refs', '--all'])
+        self.assertEqual(find_newest_tag(self.tree, '6.12'), 'v6.12.10')
+        self.assertEqual(update_tag_index(self.tree)['loose'], {})
+
+    def test_not_merged(self):
+        self.git(['reset', '-q', '--hard', 'v6.12.2'])
+        self.assertIsNone(find_newest_tag(self.tree, '6.12'))
+        self.assertIsNone(find_newest_tag(self.tree, '6.13'))
+        self.assertEqual(get_next_stable_version('v6.12-rt', self.tree),
+                         'v6.12.2')
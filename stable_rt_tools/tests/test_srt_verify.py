@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#
+# srt - stable rt tooling
+#
+# Copyright (c) Daniel Wagner, 2026
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+from unittest.mock import patch
+
+from stable_rt_tools import srt_verify
+from stable_rt_tools.srt_util import cmd
+from stable_rt_tools.srt_util_tag import Tag
+from stable_rt_tools.srt_verify import get_candidate_tags, verify_tags
+
+gnupg_config = """
+Key-Type: DSA
+Key-Length: 1024
+Subkey-Type: ELG-E
+Subkey-Length: 1024
+Name-Real: Mighty Eagle
+Name-Email: me@incredible.com
+Expire-Date: 0
+%no-protection
+%commit
+%echo done
+"""
+
+
+class TestVerifyUpstream(unittest.TestCase):
+
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.gnupghome = tempfile.mkdtemp()
+        os.chmod(self.gnupghome, 0o700)
+
+        cfg_file = self.gnupghome + '/gpg.batch'
+        with open(cfg_file, 'w') as f:
+            f.write(gnupg_config)
+        cmd(['gpg2', '--batch', '--generate-key', cfg_file],
+            env={'GNUPGHOME': self.gnupghome})
+        self.config = {'GNUPGHOME': self.gnupghome}
+
+        env = patch.dict(os.environ, {'XDG_CACHE_HOME': self.tdir + '/cache',
+                                      'GNUPGHOME': self.gnupghome})
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.tree = self.tdir + '/stable'
+        cmd(['git', 'init', self.tree])
+        cmd(['git', '-C', self.tree, 'config', 'user.name', 'Mighty Eagle'])
+        cmd(['git', '-C', self.tree, 'config', 'user.email',
+             'me@incredible.com'])
+        cmd(['git', '-C', self.tree, 'commit', '--allow-empty', '-m', 'x'])
+        for t in ['v6.1.1', 'v6.1.2', 'v6.1.3']:
+            cmd(['git', '-C', self.tree, 'tag', '-s', '-m', t, t],
+                env={'GNUPGHOME': self.gnupghome})
+        cmd(['git', '-C', self.tree, 'tag', '-a', '-m', 'v6.1.4', 'v6.1.4'])
+        cmd(['git', '-C', self.tree, 'tag', 'v6.1.5'])
+        cmd(['git', '-C', self.tree, 'tag', '-a', '-m', 'rt', 'v6.1.3-rt1'])
+
+    def tearDown(self):
+        rmtree(self.tdir)
+        rmtree(self.gnupghome)
+
+    def test_candidates(self):
+        self.assertEqual(get_candidate_tags(self.tree, Tag('v6.1.2-rt3')),
+                         ['v6.1.3', 'v6.1.4', 'v6.1.5'])
+
+    def test_verify_cached(self):
+        tags = ['v6.1.2', 'v6.1.3', 'v6.1.4', 'v6.1.5']
+        verdicts = verify_tags(self.config, self.tree, tags)
+        self.assertEqual(verdicts, {'v6.1.2': True, 'v6.1.3': True,
+                                    'v6.1.4': False, 'v6.1.5': False})
+
+        with patch('stable_rt_tools.srt_verify.run',
+                   wraps=srt_verify.run) as mock_run:
+            verdicts = verify_tags(self.config, self.tree, tags[:2])
+            mock_run.assert_not_called()
+        self.assertEqual(verdicts, {'v6.1.2': True, 'v6.1.3': True})
+
+
+if __name__ == '__main__':
+    unittest.main()